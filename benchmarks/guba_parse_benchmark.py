@@ -0,0 +1,93 @@
+"""
+股吧列表页解析基准测试：对比 BeautifulSoup 解析与流式解析，并检查两者得到的 DataFrame 一致
+
+用法：python benchmarks/guba_parse_benchmark.py --pages 200
+      python benchmarks/guba_parse_benchmark.py --pages-dir <保存的页面目录>
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_tools.fake_guba import render_list_page, synthetic_posts
+from stock_tools.news_crawler import NEWS_COLUMNS, parse_post_columns, parse_post_list_soup
+
+# 结构不规范的行：缺少字段、链接没有 href、多余的嵌套和实体、第一个 .title 中没有链接等
+EDGE_CASE_PAGE = '''<html><body>
+<tbody class="listbody">
+<tr class="listitem"><td><div class="title"><a href="/news,1.html">标题 &amp; <b>加粗</b></a></div></td>
+<td><div class="author"><a href="//i/1">作者<br/>一</a></div></td><td><div class="update">01-02 03:04</div></td></tr>
+<tr class="listitem"><td><div class="title"><a href="/news,2.html">没有作者</a></div></td>
+<td><div class="update">01-02 03:05</div></td></tr>
+<tr class="listitem"><td><div class="title"><a>没有链接</a></div></td>
+<td><div class="author"><a>作者</a></div></td><td><div class="update">01-02 03:06</div></td></tr>
+<tr class="listitem other"><td><span class="title">置顶</span><div class="title x"><a href="/news,4.html">第二个标题</a></div></td>
+<td class="author"><span><a href="//i/4">嵌套作者</a></span></td><td><div class="update">01-02 <i>03:07</i></div></td></tr>
+<tr class="ad"><td><div class="title"><a href="/ad.html">广告</a></div></td></tr>
+<tr class="listitem"><td><img src="x.png"><div class="update">01-02 03:08</div>
+<div class="title"><a href="/news,6.html">图片在前</a></div><div class="author"><a href="//i/6">作者六</a></div></td></tr>
+</tbody>
+</body></html>'''
+
+
+def soup_frame(html: str) -> pd.DataFrame:
+    return pd.DataFrame(parse_post_list_soup(html), columns=NEWS_COLUMNS)
+
+
+def stream_frame(html: str) -> pd.DataFrame:
+    return pd.DataFrame(parse_post_columns(html), columns=NEWS_COLUMNS)
+
+
+def load_pages(args):
+    if args.pages_dir:
+        pages = []
+        for path in sorted(glob.glob(os.path.join(args.pages_dir, '*.html'))):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+        return pages
+    return [render_list_page(synthetic_posts(f'{600000 + i % 50}', i // 50 + 1, args.posts))
+            for i in range(args.pages)]
+
+
+def timed(func, pages, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='股吧列表页解析基准测试')
+    parser.add_argument('--pages-dir', help='保存的页面目录（*.html），默认使用合成页面')
+    parser.add_argument('--pages', type=int, default=200, help='合成页面数量')
+    parser.add_argument('--posts', type=int, default=80, help='每个合成页面的帖子数')
+    parser.add_argument('--repeat', type=int, default=3, help='重复次数，取最快的一次')
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        print('没有找到页面')
+        return
+    print(f'页面数: {len(pages)}')
+
+    for html in pages + [EDGE_CASE_PAGE]:
+        pd.testing.assert_frame_equal(stream_frame(html), soup_frame(html))
+    print('解析结果一致')
+
+    soup_time = timed(soup_frame, pages, args.repeat)
+    stream_time = timed(stream_frame, pages, args.repeat)
+    print(f'BeautifulSoup: {soup_time:.3f}s（{soup_time / len(pages) * 1000:.1f}ms/页）')
+    print(f'流式解析:      {stream_time:.3f}s（{stream_time / len(pages) * 1000:.1f}ms/页）')
+    print(f'加速比:        {soup_time / stream_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+参数扫描基准测试：对比共用中间结果的 ParameterSweep 与每个参数组合从头计算，并检查两者的回测结果一致
+
+用法：python benchmarks/parameter_sweep_benchmark.py --symbols 500 --days 2520
+      python benchmarks/parameter_sweep_benchmark.py --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_tools.parameter_sweep import ParameterSweep, SharedIntermediates, evaluate_combinations
+
+# 扫描范围：DEFAULT_SPACE 之外再扫描 CCI 和 DMI 的周期
+SPACE = {'cci': (10, 14, 20), 'dmi': (10, 14, 20)}
+
+
+def synthetic_panel(days: int, symbols: int, seed: int = 0):
+    """随机游走的 (日期 × 股票) 行情，包括晚上市和停牌的股票"""
+    rng = np.random.default_rng(seed)
+    close = np.round(10 * np.exp(np.cumsum(rng.normal(0, 0.025, (days, symbols)), axis=0)), 2)
+    open_ = np.round(np.vstack([close[:1], close[:-1]]) * (1 + rng.normal(0, 0.01, (days, symbols))), 2)
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, (days, symbols)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, (days, symbols)))
+    volume = rng.uniform(1e5, 1e6, (days, symbols))
+    for column in range(0, symbols, 10):
+        listed = rng.integers(0, days // 2)
+        for values in (open_, high, low, close, volume):
+            values[:listed, column] = np.nan
+    for column in range(5, symbols, 10):
+        start = rng.integers(0, days - 20)
+        for values in (open_, high, low, close):
+            values[start:start + 10, column] = np.nan
+        volume[start:start + 10, column] = 0
+    return open_, high, low, close, volume
+
+
+def main():
+    parser = argparse.ArgumentParser(description='参数扫描基准测试')
+    parser.add_argument('--symbols', type=int, default=500, help='股票数')
+    parser.add_argument('--days', type=int, default=2520, help='交易日数')
+    parser.add_argument('--workers', type=int, default=1, help='ParameterSweep 的进程数')
+    parser.add_argument('--naive', type=int, default=4, help='从头计算的组合数，总耗时按比例估算')
+    args = parser.parse_args()
+
+    panel = synthetic_panel(args.days, args.symbols)
+    sweep = ParameterSweep(*panel, workers=args.workers)
+    combinations = sweep.grid(SPACE)
+    print(f'股票数: {args.symbols}，交易日数: {args.days}，参数组合数: {len(combinations)}')
+
+    # 信号状态：共用中间结果 vs 每个组合从头计算指标
+    start = time.perf_counter()
+    shared = SharedIntermediates(*panel[1:])
+    for combination in combinations:
+        shared.strategy_state('COMBINED', combination)
+    shared_states = time.perf_counter() - start
+    start = time.perf_counter()
+    for combination in combinations[:args.naive]:
+        SharedIntermediates(*panel[1:]).strategy_state('COMBINED', combination)
+    naive_states = (time.perf_counter() - start) / args.naive * len(combinations)
+    print(f'信号状态  共用中间结果: {shared_states:.2f}s，从头计算（估算）: {naive_states:.2f}s，'
+          f'加速比: {naive_states / shared_states:.0f}x')
+
+    # 完整回测：ParameterSweep vs 每个组合单独回测
+    start = time.perf_counter()
+    sweep.run(combinations)
+    sweep_time = time.perf_counter() - start
+    start = time.perf_counter()
+    naive = [evaluate_combinations(*panel, 'COMBINED', [combination], batch_size=1)
+             for combination in sweep.combinations[:args.naive]]
+    naive_time = (time.perf_counter() - start) / args.naive * len(combinations)
+    np.testing.assert_array_equal(np.concatenate(naive), sweep.stats[:args.naive])
+    print('回测结果一致')
+    print(f'完整回测  ParameterSweep: {sweep_time:.2f}s（{sweep_time / len(combinations) * 1000:.0f}ms/组合），'
+          f'逐个组合（估算）: {naive_time:.2f}s，加速比: {naive_time / sweep_time:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,40 +1,129 @@
-from stock_tools.data_fetcher import StockDataFetcher
-from stock_tools.technical_analyzer import TechnicalAnalyzer
-from stock_tools.fundamental_analyzer import FundamentalAnalyzer
-from stock_tools.sentiment_analyzer import SentimentAnalyzer
-from langchain.agents import Tool, initialize_agent
-# from langchain_community.llms import ZhipuAI
-from langchain_community.chat_models import ChatZhipuAI
+# 模块级只导入标准库：数据获取（baostock、pandas）、技术分析（talib）、langchain、jieba、dotenv
+# 等依赖在实际用到时才导入，--help、--import-report、--build-jieba-cache 不需要加载它们
 import os
-from dotenv import load_dotenv
+import argparse
+import json
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import warnings
 
-# 加载环境变量
-load_dotenv()
+_env_loaded = False
+
+# 股票代码确定后在后台预取的工具
+PREFETCH_TOOLS = ('get_stock_data', 'analyze_technical', 'analyze_fundamental')
+
+
+def load_env():
+    """加载 .env 中的环境变量（只加载一次，已有的环境变量不会被覆盖）"""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def create_llm(backend="zhipuai"):
+    """
+    创建大模型
+    :param backend: zhipuai 为智谱AI；fake 为本地的确定性替身，不需要密钥，
+                    每次调用的模拟耗时由 FAKE_LLM_LATENCY（秒，默认1）设置
+    """
+    load_env()
+    if backend == "fake":
+        from stock_tools.fake_llm import FakeChatModel
+
+        return FakeChatModel(latency=float(os.getenv("FAKE_LLM_LATENCY", "1")))
+
+    # from langchain_community.llms import ZhipuAI
+    from langchain_community.chat_models import ChatZhipuAI
+
+    return ChatZhipuAI(
+        model="glm-4-flash",
+        temperature=0.1,
+        zhipuai_api_key=os.getenv("ZHIPUAI_API_KEY")
+    )
+
+
+def create_data_fetcher():
+    """创建数据获取器"""
+    from stock_tools.data_fetcher import StockDataFetcher
+    from stock_tools.fundamental_store import FundamentalStore
+    from stock_tools.query_cache import QueryCache
+
+    load_env()
+    # K线数据缓存在本地，只增量获取缺失的日期；基本面数据已批量保存的报告期从本地读取；
+    # 同一会话内相同参数的查询（如多个工具、Agent重复调用）只请求一次
+    data_dir = os.getenv("STOCK_DATA_DIR", "data")
+    return StockDataFetcher(
+        store_dir=data_dir,
+        query_cache=QueryCache(ttl=600),
+        fundamental_store=FundamentalStore(os.path.join(data_dir, "fundamentals"))
+    )
+
+
+def load_fundamentals(args):
+    """批量获取最近一个报告期全部A股（或自选股）的基本面数据，保存到本地"""
+    from stock_tools.batch_runner import read_watchlist
+    from stock_tools.fundamental_store import latest_report_quarter, latest_report_year
+
+    fetcher = create_data_fetcher()
+    codes = read_watchlist(args.watchlist) if args.watchlist else None
+    year, quarter = latest_report_quarter()
+    annual_year = latest_report_year()
+    store = fetcher.fundamental_store
+    store.load_quarter(fetcher, year, quarter, codes, datasets=('profit', 'growth'), max_workers=args.io_workers)
+    store.load_quarter(fetcher, annual_year, 4, codes, datasets=('profit', 'growth', 'dividend'),
+                       max_workers=args.io_workers)
+    store.load_industry(fetcher)
+    print(f"基本面数据已保存到{store.root}（{year}年第{quarter}季度及{annual_year}年年报）")
+
+def create_response_cache():
+    """创建大模型回答缓存，LLM_CACHE_PATH 设为空时不缓存"""
+    from stock_tools.llm_cache import LLMCache
+
+    load_env()
+    path = os.getenv("LLM_CACHE_PATH", os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "llm_cache.sqlite"))
+    return LLMCache(path) if path else None
+
+
+def create_news_index():
+    """创建帖子索引，NEWS_INDEX_PATH 设为空时不使用索引"""
+    from stock_tools.news_index import NewsIndex
+
+    load_env()
+    path = os.getenv("NEWS_INDEX_PATH", os.path.join(os.getenv("STOCK_DATA_DIR", "data"), "news_index.sqlite"))
+    return NewsIndex(path) if path else None
+
+
 class StockAnalysisAgent:
-    def __init__(self, start_date, end_date):
+    def __init__(self, start_date, end_date, llm=None, response_cache=None):
+        """
+        :param start_date: K线开始日期
+        :param end_date: K线结束日期
+        :param llm: 大模型，默认为智谱AI，测试时可以传入本地的替身（见 stock_tools.fake_llm）
+        :param response_cache: 回答缓存，数据没有变化时相同的分析直接返回上次的结果，为None时不缓存
+        """
+        from langchain.agents import Tool, initialize_agent
+
         # 初始化数据获取器
-        self.data_fetcher = StockDataFetcher()
+        self.data_fetcher = create_data_fetcher()
         
         # 初始化智谱AI模型
-        self.llm = ChatZhipuAI(
-            model="glm-4-flash",
-            temperature=0.1,
-            zhipuai_api_key=os.getenv("ZHIPUAI_API_KEY")
-        )
+        self.llm = llm if llm is not None else create_llm()
+        self.response_cache = response_cache
         
         # 定义工具
         self.tools = [
             Tool(
                 name="get_stock_data",
                 func=self.get_stock_data,
-                description="获取股票历史数据，包括开盘价、收盘价、最高价、最低价、成交量等。股票代码格式示例：sh.600000"
+                description="获取股票行情摘要，包括最新K线、近期涨跌幅、最高最低价、成交量等。股票代码格式示例：sh.600000"
             ),
             Tool(
                 name="analyze_technical",
                 func=self.analyze_technical,
-                description="分析股票技术指标，包括移动平均线、MACD、RSI、布林带、KDJ、CCI、DMI、OBV、VR、威廉指标等"
+                description="分析股票技术指标，返回移动平均线、MACD、RSI、布林带、KDJ、CCI、DMI、VR、威廉指标等的最新值和买卖信号"
             ),
             Tool(
                 name="analyze_fundamental",
@@ -58,20 +147,65 @@ class StockAnalysisAgent:
         
         self.start_date = start_date
         self.end_date = end_date
-    
+
+        # 预取：股票代码确定后立即在后台执行各个工具，Agent 调用工具时直接读取结果
+        self.executor = ThreadPoolExecutor(max_workers=3)
+        self.prefetched = {}  # (工具名, 股票代码) -> Future
+
+    def prefetch(self, code):
+        """
+        在后台并发执行获取行情、技术分析和基本面分析，与大模型的推理时间重叠
+        :param code: 股票代码
+        """
+        code = self.data_fetcher._format_stock_code(code)
+        for name, func in zip(PREFETCH_TOOLS, (self._get_stock_data, self._analyze_technical,
+                                               self._analyze_fundamental)):
+            if (name, code) not in self.prefetched:
+                self.prefetched[(name, code)] = self.executor.submit(func, code)
+
+    def _prefetched_result(self, name, code, func):
+        """优先读取预取的结果，没有预取时同步执行"""
+        # Agent 传入的参数可能带引号或空白
+        code = self.data_fetcher._format_stock_code(code.strip().strip('\'"'))
+        future = self.prefetched.get((name, code))
+        if future is not None:
+            return future.result()
+        return func(code)
+
     def get_stock_data(self, code):
         """获取股票数据"""
-        return self.data_fetcher.get_stock_data(code, self.start_date, self.end_date)
-    
-    
+        return self._prefetched_result('get_stock_data', code, self._get_stock_data)
+
     def analyze_technical(self, code):
         """分析技术指标"""
+        return self._prefetched_result('analyze_technical', code, self._analyze_technical)
+
+    def analyze_fundamental(self, code):
+        """分析基本面"""
+        return self._prefetched_result('analyze_fundamental', code, self._analyze_fundamental)
+
+    # 工具返回给大模型的是固定大小的摘要，而不是整张表，避免上下文随历史长度膨胀
+    def _get_stock_data(self, code):
+        from stock_tools.technical_analyzer import summarize_prices
+
         stock_data = self.data_fetcher.get_stock_data(code, self.start_date, self.end_date)
+        if stock_data.empty:
+            return f"没有获取到{code}的行情数据"
+        return json.dumps(summarize_prices(stock_data), ensure_ascii=False)
+
+    def _analyze_technical(self, code):
+        from stock_tools.technical_analyzer import TechnicalAnalyzer
+
+        # 与 get_stock_data 同时执行时，查询缓存保证只请求一次
+        stock_data = self.data_fetcher.get_stock_data(code, self.start_date, self.end_date)
+        if len(stock_data) < 2:
+            return f"{code}的行情数据不足，无法进行技术分析"
         analyzer = TechnicalAnalyzer(stock_data)
-        return analyzer.calculate_all_indicators()
+        return json.dumps(analyzer.get_summary(), ensure_ascii=False)
     
-    def analyze_fundamental(self, code):
-        """分析基本面"""
+    def _analyze_fundamental(self, code):
+        from stock_tools.fundamental_analyzer import FundamentalAnalyzer
+
         financial_data = self.data_fetcher.get_financial_data(code)
         growth_data = self.data_fetcher.get_growth_data(code)
         industry_data = self.data_fetcher.get_stock_industry_data(code)
@@ -81,7 +215,9 @@ class StockAnalysisAgent:
     
     def analyze_sentiment(self, code):
         """分析舆情"""
-        analyzer = SentimentAnalyzer()
+        from stock_tools.sentiment_analyzer import SentimentAnalyzer
+
+        analyzer = SentimentAnalyzer(index=create_news_index())
         return analyzer.get_sentiment_summary(code)
     
     def analyze_stock(self, code, query):
@@ -94,7 +230,21 @@ class StockAnalysisAgent:
         # 确保股票代码格式正确
         if not code.startswith(('sh.', 'sz.')):
             code = 'sh.' + code
-            
+        self.prefetch(code)
+        try:
+            return self._analyze_prefetched(code, query)
+        finally:
+            # 预取的结果只用于这一次分析，再次分析同一只股票时重新获取（由查询缓存和本地存储决定是否访问网络）
+            self.discard_prefetched(code)
+
+    def discard_prefetched(self, code):
+        """丢弃该股票的预取结果"""
+        code = self.data_fetcher._format_stock_code(code)
+        for name in PREFETCH_TOOLS:
+            self.prefetched.pop((name, code), None)
+
+    def _analyze_prefetched(self, code, query):
+        """在预取已经开始后执行分析"""
         prompt = f"""
         请分析股票代码为{code}的股票。
         用户需求：{query}
@@ -108,18 +258,130 @@ class StockAnalysisAgent:
         
         请用专业、客观的语言进行分析，并给出具体的长短线投资建议（做多、做空、持有）。
         """
-        
-        return self.agent.run(prompt)
+
+        if self.response_cache is None:
+            return self.agent.run(prompt)
+
+        # 预取的工具结果都已就绪且没有变化时，相同的提示词直接返回缓存的回答；
+        # 还没有就绪时不等待数据获取，直接开始推理，让大模型的推理时间与数据获取重叠
+        if self._prefetch_done(code):
+            key = self._response_key(code, prompt)
+            if key is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    return cached
+        result = self.agent.run(prompt)
+        # Agent 调用工具时已经等到了全部预取结果，这里计算键不会再等待
+        key = self._response_key(code, prompt)
+        if key is not None:
+            self.response_cache.put(key, result, model=self._model_name())
+        return result
+
+    def _prefetch_done(self, code):
+        """该股票的预取是否都已完成"""
+        code = self.data_fetcher._format_stock_code(code)
+        futures = [self.prefetched.get((name, code)) for name in PREFETCH_TOOLS]
+        return all(future is not None and future.done() for future in futures)
+
+    def _model_name(self):
+        return str(getattr(self.llm, 'model_name', type(self.llm).__name__))
+
+    def _response_key(self, code, prompt):
+        """
+        计算回答缓存的键，工具执行失败时返回None（不缓存）
+        """
+        from stock_tools.llm_cache import LLMCache, digest_observations
+
+        code = self.data_fetcher._format_stock_code(code)
+        try:
+            observations = [self.prefetched[(name, code)].result() for name in PREFETCH_TOOLS]
+        except Exception:
+            return None
+        return LLMCache.make_key(
+            self._model_name(),
+            getattr(self.llm, 'temperature', None),
+            prompt,
+            digest_observations(observations)
+        )
+
+def run_batch(args):
+    """批量分析自选股，结果写入 JSONL 文件"""
+    from stock_tools.batch_runner import BatchRunner, read_watchlist
+
+    llm = create_llm(args.llm_backend) if args.llm else None
+
+    def narrate_with_llm(code, record):
+        prompt = (f"以下是股票{code}的技术面和基本面分析数据：\n"
+                  f"{json.dumps(record, ensure_ascii=False)}\n"
+                  f"请用专业、客观的语言给出简短点评和长短线投资建议（做多、做空、持有）。")
+        return llm.predict(prompt)
+
+    narrate = narrate_with_llm if llm is not None else None
+
+    codes = read_watchlist(args.watchlist)
+    runner = BatchRunner(
+        create_data_fetcher(),
+        args.start_date,
+        args.end_date,
+        io_workers=args.io_workers,
+        cpu_workers=args.cpu_workers,
+        narrate=narrate,
+        llm_calls_per_minute=args.llm_rpm
+    )
+    succeeded = runner.run(codes, args.output)
+    print(f"完成{len(codes)}只股票的分析，其中{succeeded}只成功，结果已写入{args.output}")
+
 
 def main():
-    # 初始化分析Agent
+    parser = argparse.ArgumentParser(description="股票分析")
+    parser.add_argument("--watchlist", help="自选股文件，每行一个股票代码；指定时以批量模式运行")
+    parser.add_argument("--output", default="results.jsonl", help="批量模式的结果文件")
+    parser.add_argument("--start-date", default="2024-5-1", help="K线开始日期")
+    parser.add_argument("--end-date", default=datetime.now().strftime("%Y-%m-%d"), help="K线结束日期")
+    parser.add_argument("--io-workers", type=int, default=10, help="批量模式并发的 baostock 会话数")
+    parser.add_argument("--cpu-workers", type=int, default=None, help="批量模式技术分析进程数，默认为CPU核数")
+    parser.add_argument("--llm", action="store_true", help="批量模式下由大模型为每只股票生成点评")
+    parser.add_argument("--llm-backend", choices=("zhipuai", "fake"), default="zhipuai",
+                        help="大模型：zhipuai 为智谱AI，fake 为本地的确定性替身（测试用，不需要密钥）")
+    parser.add_argument("--llm-rpm", type=float, default=30, help="大模型每分钟最多调用次数")
+    parser.add_argument("--load-fundamentals", action="store_true",
+                        help="批量获取最近报告期的基本面数据保存到本地（指定 --watchlist 时只获取自选股）")
+    parser.add_argument("--build-jieba-cache", action="store_true",
+                        help="预先构建分词词典缓存（保存在 JIEBA_CACHE_DIR，默认为 $STOCK_DATA_DIR/jieba）")
+    parser.add_argument("--import-report", nargs="?", const="", metavar="PATH",
+                        help="输出各子系统的导入耗时，指定 PATH 时同时追加到该 JSONL 文件")
+    args = parser.parse_args()
+
+    if args.import_report is not None:
+        from stock_tools.import_report import import_report, write_report
+
+        write_report(import_report(), args.import_report)
+        return
+    if args.build_jieba_cache:
+        from stock_tools.sentiment_analyzer import init_jieba
+
+        # 缓存目录可能在 .env 中设置
+        load_env()
+        jieba = init_jieba()
+        print(f"分词词典缓存已保存到{jieba.dt.tmp_dir}")
+        return
+
     # 忽略警告信息
     warnings.filterwarnings('ignore')
+    if args.load_fundamentals:
+        load_fundamentals(args)
+        return
+    if args.watchlist:
+        run_batch(args)
+        return
+
+    # 初始化分析Agent
     code = input("请输入股票代码（如：sh.600000）：")
-    start_date = "2024-5-1"
+    start_date = args.start_date
 
-    end_date = datetime.now().strftime("%Y-%m-%d")
-    agent = StockAnalysisAgent(start_date, end_date)
+    end_date = args.end_date
+    agent = StockAnalysisAgent(start_date, end_date, llm=create_llm(args.llm_backend),
+                               response_cache=create_response_cache())
     
     
     # code = "sz.000063" 
@@ -131,4 +393,4 @@ def main():
     print(result)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
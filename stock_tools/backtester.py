@@ -0,0 +1,322 @@
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from stock_tools import indicators
+from stock_tools.signals import SIGNAL_LABELS, signal_states
+
+# 每年交易日数，用于年化
+TRADING_DAYS = 242
+
+# 可回测的策略：各条信号规则，以及按各规则投票的组合策略
+STRATEGIES = tuple(SIGNAL_LABELS) + ('COMBINED',)
+
+
+def signal_indicators(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+    """计算信号规则用到的指标（(日期 × 股票) 二维数组）"""
+    result = {}
+    result['MACD'], result['MACD_SIGNAL'], _ = indicators.macd(close)
+    result['RSI14'] = indicators.rsi(close, 14)
+    result['BB_UPPER'], _, result['BB_LOWER'] = indicators.bbands(close, 5)
+    result['K'], result['D'] = indicators.stoch(high, low, close)
+    result['CCI'] = indicators.cci(high, low, close, 14)
+    result['PLUS_DI'], result['MINUS_DI'], result['ADX'] = indicators.dmi(high, low, close, 14)
+    return result
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    """沿时间向前填充 NaN"""
+    rows = np.arange(len(x))[:, None]
+    last = np.where(np.isnan(x), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.take_along_axis(x, last, axis=0)
+
+
+class BacktestResult:
+    """
+    一个策略的回测结果
+    - positions：(日期 × 股票) bool 数组，当天开盘调仓后是否持有
+    - returns：(日期 × 股票) 扣除交易成本后的日收益率
+    - stats：DataFrame，每只股票的总收益、年化收益、最大回撤、换手率、交易次数、持仓时间占比
+    - portfolio：Series，所有股票等权组合的日收益率
+    """
+
+    def __init__(self, name, positions, returns, stats, portfolio):
+        self.name = name
+        self.positions = positions
+        self.returns = returns
+        self.stats = stats
+        self.portfolio = portfolio
+
+    @property
+    def equity(self) -> pd.Series:
+        """组合净值"""
+        return (1 + self.portfolio).cumprod()
+
+    @property
+    def drawdown(self) -> pd.Series:
+        """组合回撤"""
+        equity = self.equity
+        return equity / equity.cummax() - 1
+
+    def summary(self) -> Dict:
+        """组合的汇总指标"""
+        returns = self.portfolio.to_numpy()
+        years = len(returns) / TRADING_DAYS
+        total = float(np.prod(1 + returns) - 1) if len(returns) else 0.0
+        std = float(np.std(returns)) if len(returns) else 0.0
+        return {
+            'total_return': total,
+            'annual_return': (1 + total) ** (1 / years) - 1 if years > 0 and total > -1 else np.nan,
+            'sharpe': float(np.mean(returns) / std * np.sqrt(TRADING_DAYS)) if std > 0 else np.nan,
+            'max_drawdown': float(self.drawdown.min()) if len(returns) else 0.0,
+            'turnover': float(self.stats['turnover'].mean()),
+            'trades': int(self.stats['trades'].sum()),
+            'exposure': float(self.stats['exposure'].mean()),
+        }
+
+
+class SignalBacktester:
+    """
+    按 get_technical_signals 的规则回测（只做多），所有股票、全部历史按数组一次计算
+
+    成交规则：
+    - T+1：信号在收盘后产生，次日开盘成交；每天只在开盘调仓一次，当日买入的股票最早次日卖出
+    - 停牌（开盘价缺失或成交量为0）不能成交，保持原仓位
+    - 开盘涨停不能买入、开盘跌停不能卖出（limit 为涨跌停幅度，None 表示不限制）
+    - 交易成本：买卖双向佣金和滑点，卖出另收印花税
+    收益：持有的股票当天买入时按 开盘→收盘 计算，卖出时按 前收盘→开盘 计算，其余按 前收盘→收盘 计算。
+    """
+
+    def __init__(self, open, high, low, close, volume, dates=None, symbols=None,
+                 commission: float = 0.0003, stamp_duty: float = 0.0005, slippage: float = 0.0,
+                 limit: Optional[float] = 0.1, chunk_size: int = 1000):
+        """
+        :param open: 开盘价，(日期 × 股票) 二维数组，缺失为 NaN
+        :param high: 最高价
+        :param low: 最低价
+        :param close: 收盘价
+        :param volume: 成交量
+        :param dates: 日期，长度等于行数
+        :param symbols: 股票代码，长度等于列数
+        :param commission: 佣金费率（买卖双向）
+        :param stamp_duty: 印花税率（卖出）
+        :param slippage: 滑点（买卖双向，按成交金额的比例）
+        :param limit: 涨跌停幅度
+        :param chunk_size: 每次计算的股票数，控制中间结果的内存占用
+        """
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.float64)
+        if self.close.ndim != 2:
+            raise ValueError("面板数据必须是 (日期 × 股票) 的二维数组")
+        rows, columns = self.close.shape
+        self.dates = dates if dates is not None else np.arange(rows)
+        self.symbols = symbols if symbols is not None else np.arange(columns)
+        self.commission = commission
+        self.stamp_duty = stamp_duty
+        self.slippage = slippage
+        self.limit = limit
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, **kwargs):
+        """
+        由多只股票的长表构造
+        :param data: DataFrame，包含 date、code、open、high、low、close、volume 列
+        :param kwargs: 其他参数，见 __init__
+        """
+        panel = data.pivot_table(index='date', columns='code',
+                                 values=['open', 'high', 'low', 'close', 'volume'], aggfunc='last')
+        panel = panel.sort_index()
+        return cls(
+            panel['open'].to_numpy(),
+            panel['high'].to_numpy(),
+            panel['low'].to_numpy(),
+            panel['close'].to_numpy(),
+            panel['volume'].to_numpy(),
+            dates=panel.index.to_numpy(),
+            symbols=panel['close'].columns.to_numpy(),
+            **kwargs
+        )
+
+    def run(self, strategies: Optional[Iterable[str]] = None) -> Dict[str, BacktestResult]:
+        """
+        回测
+        :param strategies: 策略名列表，默认为全部（STRATEGIES）
+        :return: dict，策略名 -> BacktestResult
+        """
+        strategies = list(strategies or STRATEGIES)
+        unknown = [name for name in strategies if name not in STRATEGIES]
+        if unknown:
+            raise ValueError(f"不支持的策略: {unknown}")
+
+        rows, columns = self.close.shape
+        positions = {name: np.zeros((rows, columns), dtype=bool) for name in strategies}
+        returns = {name: np.zeros((rows, columns), dtype=np.float32) for name in strategies}
+        stats = {name: [] for name in strategies}
+        # 组合收益：每天所有已上市股票的收益之和 / 股票数
+        portfolio_sum = {name: np.zeros(rows) for name in strategies}
+        listed = np.zeros(rows)
+
+        for start in range(0, columns, self.chunk_size):
+            stop = min(start + self.chunk_size, columns)
+            chunk = self._run_chunk(slice(start, stop), strategies)
+            listed += chunk['listed'].sum(axis=1)
+            for name in strategies:
+                held, net = chunk['positions'][name], chunk['returns'][name]
+                positions[name][:, start:stop] = held
+                returns[name][:, start:stop] = net
+                portfolio_sum[name] += net.sum(axis=1)
+                stats[name].append(chunk['stats'][name])
+
+        results = {}
+        index = pd.Index(self.dates, name='date')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name in strategies:
+                portfolio = pd.Series(np.where(listed > 0, portfolio_sum[name] / listed, 0.0), index=index)
+                frame = pd.concat(stats[name], ignore_index=True)
+                frame.index = pd.Index(self.symbols, name='code')
+                results[name] = BacktestResult(name, positions[name], returns[name], frame, portfolio)
+        return results
+
+    def _run_chunk(self, columns: slice, strategies) -> Dict:
+        """回测一部分股票"""
+        market = self._market(columns)
+        states = signal_states(signal_indicators(market['high'], market['low'], market['close']),
+                               market['close'])
+        if 'COMBINED' in strategies:
+            # 各规则投票，多数看多时持有、多数看空时空仓
+            states['COMBINED'] = np.sign(sum(states[name].astype(np.int16) for name in SIGNAL_LABELS))
+
+        # 所有策略沿股票维拼接后一起计算，(日期 × (策略数 × 股票数))
+        held, net = self._simulate(np.concatenate([states[name] for name in strategies], axis=1), market)
+        stats = self._stats(held, net, market['listed'])
+
+        width = market['close'].shape[1]
+        result = {'listed': market['listed'], 'positions': {}, 'returns': {}, 'stats': {}}
+        for i, name in enumerate(strategies):
+            columns = slice(i * width, (i + 1) * width)
+            result['positions'][name] = held[:, columns]
+            result['returns'][name] = net[:, columns]
+            result['stats'][name] = stats.iloc[columns].reset_index(drop=True)
+        return result
+
+    def _market(self, columns: slice) -> Dict[str, np.ndarray]:
+        """
+        一部分股票与策略无关的行情数据：价格、能否成交、三种情况下的收益
+        :return: dict，(日期 × 股票) 数组
+        """
+        open_, high, low, close, volume = (x[:, columns] for x in
+                                           (self.open, self.high, self.low, self.close, self.volume))
+        # 停牌日沿用最近的收盘价，收益为0
+        close_filled = _ffill(close)
+        prev_close = np.empty_like(close_filled)
+        prev_close[0] = np.nan
+        prev_close[1:] = close_filled[:-1]
+        open_filled = np.where(np.isnan(open_), close_filled, open_)
+        if self.limit is not None:
+            up_limit = np.round(prev_close * (1 + self.limit), 2)
+            down_limit = np.round(prev_close * (1 - self.limit), 2)
+            with np.errstate(invalid='ignore'):
+                buy_blocked = open_ >= up_limit - 1e-9
+                sell_blocked = open_ <= down_limit + 1e-9
+        else:
+            buy_blocked = sell_blocked = np.zeros(close.shape, dtype=bool)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return {
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume,
+                'listed': ~np.isnan(close_filled),
+                'tradable': ~np.isnan(open_) & (volume > 0),
+                'buy_blocked': buy_blocked,
+                'sell_blocked': sell_blocked,
+                'hold_return': np.nan_to_num(close_filled / prev_close - 1),
+                'buy_return': np.nan_to_num(close_filled / open_filled - 1),
+                'sell_return': np.nan_to_num(open_filled / prev_close - 1),
+            }
+
+    def _simulate(self, states: np.ndarray, market: Dict[str, np.ndarray]):
+        """
+        由信号状态得到实际仓位（只做多）并计算扣除成本后的收益
+        看多时目标为持有，看空时为空仓，中性时保持之前的目标
+        :param states: int 状态数组，列数可以是股票数的整数倍（多个策略沿列拼接，共用同一份行情）
+        :param market: _market 的结果
+        :return: (实际仓位, 日收益率)，形状与 states 相同
+        """
+        rows, width = market['close'].shape
+        count = states.shape[1] // width
+        # 视为 (日期 × 策略 × 股票)，行情按策略维广播，不需要复制
+        held = self._execute(states.reshape(rows, count, width), market['tradable'][:, None],
+                             market['buy_blocked'][:, None], market['sell_blocked'][:, None])
+        buy_cost = self.commission + self.slippage
+        sell_cost = self.commission + self.slippage + self.stamp_duty
+        # 持有的日子按 前收盘→收盘 计算，再改写买入日和卖出日
+        net = np.where(held, market['hold_return'][:, None], 0.0)
+        np.copyto(net[1:], (market['buy_return'] - buy_cost)[1:, None], where=held[1:] & ~held[:-1])
+        np.copyto(net[1:], (market['sell_return'] - sell_cost)[1:, None], where=held[:-1] & ~held[1:])
+        return held.reshape(rows, -1), net.reshape(rows, -1)
+
+    @staticmethod
+    def _execute(states: np.ndarray, tradable: np.ndarray, buy_blocked: np.ndarray,
+                 sell_blocked: np.ndarray) -> np.ndarray:
+        """
+        按成交规则得到实际仓位：第 t 天收盘的目标仓位在第 t+1 天开盘成交，不能成交时保持原仓位
+        仓位依赖前一天的实际仓位，按时间逐行递推，每行同时处理所有股票
+        """
+        held = np.zeros(states.shape, dtype=bool)
+        want = np.zeros(states.shape[1:], dtype=bool)
+        current = np.zeros(states.shape[1:], dtype=bool)
+        for t in range(1, len(states)):
+            signal = states[t - 1]
+            want = np.where(signal != 0, signal > 0, want)
+            buy = want & ~current & tradable[t] & ~buy_blocked[t]
+            sell = ~want & current & tradable[t] & ~sell_blocked[t]
+            current = (current | buy) & ~sell
+            held[t] = current
+        return held
+
+    @staticmethod
+    def _stats(held: np.ndarray, net: np.ndarray, listed: np.ndarray) -> pd.DataFrame:
+        """
+        每只股票的统计
+        :param listed: (日期 × 股票) 是否已上市，held 和 net 的列数可以是股票数的整数倍
+        """
+        listed_days = np.tile(listed.sum(axis=0), held.shape[1] // max(1, listed.shape[1]))
+        years = listed_days / TRADING_DAYS
+        if len(net):
+            # 净值、最高净值、最低的 净值/最高净值 按时间逐行累计，每行同时处理所有股票，
+            # 比 cumprod 和 maximum.accumulate 生成 (日期 × 股票) 的中间数组更快
+            width = net.shape[1]
+            equity = np.ones(width)
+            peak = np.full(width, -np.inf)
+            worst = np.full(width, np.inf)
+            buffer = np.empty(width)
+            for row in net:
+                np.add(row, 1, out=buffer)
+                equity *= buffer
+                np.maximum(peak, equity, out=peak)
+                np.divide(equity, peak, out=buffer)
+                np.minimum(worst, buffer, out=worst)
+            total = equity - 1
+            max_drawdown = worst - 1
+            changes = held[0] + np.count_nonzero(held[1:] != held[:-1], axis=0)
+        else:
+            total = max_drawdown = changes = np.zeros(held.shape[1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            annual = np.where((years > 0) & (total > -1), np.power(1 + total, 1 / years) - 1, np.nan)
+            return pd.DataFrame({
+                'total_return': total,
+                'annual_return': annual,
+                'max_drawdown': max_drawdown,
+                # 年化单边换手：每年买入和卖出次数之和 / 2
+                'turnover': np.where(years > 0, changes / 2 / years, np.nan),
+                'trades': changes,
+                'exposure': np.where(listed_days > 0, held.sum(axis=0) / listed_days, np.nan),
+            })
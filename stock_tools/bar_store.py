@@ -0,0 +1,333 @@
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class BarStore:
+    """
+    本地K线列式存储
+
+    目录结构：root/<frequency>/<adjustflag>/<code>/
+        - <列名>.bin：定长二进制列文件，新数据全部晚于已有数据时直接追加到末尾，否则写新文件后替换
+        - day_index.bin：日期偏移索引，第 k 个值为日期 >= 索引起始日 + k 天的第一行的行号
+        - meta.json：列类型、行数、索引起始日以及已覆盖的日期区间
+
+    复权因子保存在 root/adjust_factor/<code>/，列为除权除息日（date）和后复权因子（back），
+    meta.json 中的 end 为已经检查过的最后一天，之后只需要从接口获取新的除权除息事件。
+
+    列文件以内存映射方式读取，按日期偏移索引直接定位行号，读取任意日期区间的耗时与文件大小无关。
+    meta.json 中的行数是唯一可信的行数，列文件中多出的字节（如写入中断）不会被读取。
+    写入时不修改已有的行，也不缩短列文件（重写时替换为新文件），已经映射的数组在写入后保持不变。
+    """
+
+    # 列名 -> 存储类型（日线、周线、月线）
+    COLUMN_DTYPES = {
+        'date': 'datetime64[D]',
+        'open': 'float64',
+        'high': 'float64',
+        'low': 'float64',
+        'close': 'float64',
+        'volume': 'int64',
+        'amount': 'float64',
+    }
+    # 分钟线另有K线结束时间
+    MINUTE_COLUMN_DTYPES = {
+        'date': 'datetime64[D]',
+        'time': 'datetime64[ms]',
+        'open': 'float64',
+        'high': 'float64',
+        'low': 'float64',
+        'close': 'float64',
+        'volume': 'int64',
+        'amount': 'float64',
+    }
+    MINUTE_FREQUENCIES = ('5', '15', '30', '60')
+    # 复权因子：列名 -> (接口字段, 存储类型)
+    FACTOR_COLUMNS = {
+        'date': ('dividOperateDate', 'datetime64[D]'),
+        'back': ('backAdjustFactor', 'float64'),
+    }
+
+    def __init__(self, root: str):
+        """
+        :param root: 存储根目录
+        """
+        self.root = root
+
+    def _key_dir(self, code: str, frequency: str, adjustflag: str) -> str:
+        return os.path.join(self.root, frequency, adjustflag, code)
+
+    def _read_meta(self, key_dir: str) -> Optional[Dict]:
+        path = os.path.join(key_dir, 'meta.json')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_meta(self, key_dir: str, meta: Dict):
+        # 先写临时文件再替换，保证 meta.json 不会写出半个文件
+        path = os.path.join(key_dir, 'meta.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def column_dtypes(self, frequency: str) -> Dict[str, str]:
+        """某个频率的列名 -> 存储类型"""
+        return self.MINUTE_COLUMN_DTYPES if frequency in self.MINUTE_FREQUENCIES else self.COLUMN_DTYPES
+
+    def _to_columns(self, data: pd.DataFrame, column_dtypes: Dict[str, str]) -> Dict[str, np.ndarray]:
+        """
+        将接口返回的数据转换为定长列
+        :param data: DataFrame
+        :param column_dtypes: 列名 -> 存储类型
+        :return: 列名 -> ndarray
+        """
+        columns = {}
+        for name, dtype in column_dtypes.items():
+            if dtype.startswith('datetime64'):
+                columns[name] = pd.to_datetime(data[name]).values.astype(dtype)
+            else:
+                values = pd.to_numeric(data[name], errors='coerce')
+                if dtype == 'int64':
+                    values = values.fillna(0)
+                columns[name] = values.to_numpy(dtype=dtype)
+        return columns
+
+    def get_coverage(self, code: str, frequency: str, adjustflag: str) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        获取本地已覆盖的日期区间
+        :return: (开始日期, 结束日期)，没有本地数据时返回None
+        """
+        meta = self._read_meta(self._key_dir(code, frequency, adjustflag))
+        if meta is None:
+            return None
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def _load(self, key_dir: str, meta: Dict) -> Dict[str, np.ndarray]:
+        """以只读内存映射方式打开所有列，不读入内存"""
+        if meta['rows'] == 0:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in meta['columns'].items()}
+        return {
+            name: np.memmap(os.path.join(key_dir, f'{name}.bin'), dtype=dtype, mode='r', shape=(meta['rows'],))
+            for name, dtype in meta['columns'].items()
+        }
+
+    def _row_range(self, key_dir: str, meta: Dict, dates: np.ndarray,
+                   start_date: Optional[str], end_date: Optional[str]) -> Tuple[int, int]:
+        """
+        日期区间 [start_date, end_date] 对应的行号区间 [lo, hi)
+        有日期偏移索引时直接按天数定位，否则（旧版本写入的数据）在日期列上二分查找
+        """
+        start = None if start_date is None else np.datetime64(pd.Timestamp(start_date).date(), 'D')
+        end = None if end_date is None else np.datetime64(pd.Timestamp(end_date).date(), 'D')
+        if 'index_start' not in meta:
+            lo = 0 if start is None else int(np.searchsorted(dates, start, 'left'))
+            hi = len(dates) if end is None else int(np.searchsorted(dates, end, 'right'))
+            return lo, hi
+        index = np.memmap(os.path.join(key_dir, 'day_index.bin'), dtype='int64', mode='r')
+        base = np.datetime64(meta['index_start'], 'D')
+
+        def offset(day, default):
+            if day is None:
+                return default
+            return int(index[min(max(int((day - base).astype(int)), 0), len(index) - 1)])
+
+        return offset(start, 0), offset(None if end is None else end + 1, meta['rows'])
+
+    def _write_day_index(self, key_dir: str, meta: Dict):
+        """由日期列重建日期偏移索引（每天一个 int64，十年约30KB）"""
+        dates = self._load(key_dir, meta)['date']
+        if len(dates) == 0:
+            meta.pop('index_start', None)
+            return
+        days = np.arange(dates[0], dates[-1] + 2, dtype='datetime64[D]')
+        path = os.path.join(key_dir, 'day_index.bin')
+        np.searchsorted(dates, days, 'left').astype('int64').tofile(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        meta['index_start'] = str(dates[0])
+
+    def read_columns(self, code: str, frequency: str, adjustflag: str,
+                     start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        读取本地数据的零拷贝切片
+        返回的数组映射到列文件，只有实际访问的页面才会从磁盘读入，可以直接传给 TechnicalAnalyzer.from_columns
+        :param code: 股票代码
+        :param frequency: 数据频率
+        :param adjustflag: 复权类型
+        :param start_date: 开始日期，默认为本地最早日期
+        :param end_date: 结束日期，默认为本地最晚日期
+        :return: 列名 -> 只读数组，没有本地数据时返回空dict
+        """
+        key_dir = self._key_dir(code, frequency, adjustflag)
+        meta = self._read_meta(key_dir)
+        if meta is None or meta['rows'] == 0:
+            return {}
+        columns = self._load(key_dir, meta)
+        lo, hi = self._row_range(key_dir, meta, columns['date'], start_date, end_date)
+        return {name: values[lo:hi] for name, values in columns.items()}
+
+    def read(self, code: str, frequency: str, adjustflag: str,
+             start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
+        """
+        读取本地数据
+        :param code: 股票代码
+        :param frequency: 数据频率
+        :param adjustflag: 复权类型
+        :param start_date: 开始日期，默认为本地最早日期
+        :param end_date: 结束日期，默认为本地最晚日期
+        :return: DataFrame，列顺序与接口返回一致；数据复制到内存中，不依赖列文件
+        """
+        columns = self.read_columns(code, frequency, adjustflag, start_date, end_date)
+        return self.to_frame(code, adjustflag, columns)
+
+    @staticmethod
+    def to_frame(code: str, adjustflag: str, columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+        """
+        将列转换为与接口返回一致的 DataFrame
+        :param columns: 列名 -> 数组，映射到列文件的数组会被复制到内存中
+        :return: DataFrame，没有数据时返回空 DataFrame
+        """
+        if not columns:
+            return pd.DataFrame()
+        data = pd.DataFrame({
+            name: np.array(values) if isinstance(values, np.memmap) else values
+            for name, values in columns.items()
+        }, copy=False)
+        data.insert(2 if 'time' in columns else 1, 'code', code)
+        data['adjustflag'] = adjustflag
+        return data
+
+    def _factor_dir(self, code: str) -> str:
+        return os.path.join(self.root, 'adjust_factor', code)
+
+    def get_factor_coverage(self, code: str) -> Optional[pd.Timestamp]:
+        """
+        复权因子已经检查到的最后一天
+        :return: 日期，没有本地复权因子时返回None
+        """
+        meta = self._read_meta(self._factor_dir(code))
+        return None if meta is None else pd.Timestamp(meta['end'])
+
+    def read_factors(self, code: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        读取复权因子
+        :return: {'date': 除权除息日, 'back': 后复权因子}，按日期升序；没有本地复权因子时返回None
+        """
+        key_dir = self._factor_dir(code)
+        meta = self._read_meta(key_dir)
+        if meta is None:
+            return None
+        # 复权因子每年只有几行，直接读入内存
+        return {name: np.array(values) for name, values in self._load(key_dir, meta).items()}
+
+    def write_factors(self, code: str, data: pd.DataFrame, end_date: pd.Timestamp):
+        """
+        合并一段复权因子，同一除权除息日以新数据为准
+        :param data: query_adjust_factor 返回的 DataFrame，可以为空（区间内没有除权除息）
+        :param end_date: 本次已确认完整的最后一天
+        """
+        key_dir = self._factor_dir(code)
+        os.makedirs(key_dir, exist_ok=True)
+        meta = self._read_meta(key_dir)
+        if meta is None:
+            meta = {
+                'columns': {name: dtype for name, (_, dtype) in self.FACTOR_COLUMNS.items()},
+                'rows': 0,
+                'end': end_date.strftime('%Y-%m-%d'),
+            }
+        old_columns = self._load(key_dir, meta)
+        if not data.empty:
+            new_columns = self._to_columns(
+                data.rename(columns={field: name for name, (field, _) in self.FACTOR_COLUMNS.items()}),
+                meta['columns']
+            )
+            keep = ~np.isin(old_columns['date'], new_columns['date'])
+            dates = np.concatenate([old_columns['date'][keep], new_columns['date']])
+            order = np.argsort(dates, kind='stable')
+            self._rewrite(key_dir, meta, {
+                name: np.concatenate([old_columns[name][keep], new_columns[name]])[order]
+                for name in meta['columns']
+            })
+        meta['end'] = max(pd.Timestamp(meta['end']), end_date).strftime('%Y-%m-%d')
+        self._write_meta(key_dir, meta)
+
+    def write(self, code: str, frequency: str, adjustflag: str, data: pd.DataFrame,
+              start_date: pd.Timestamp, end_date: pd.Timestamp):
+        """
+        写入一段数据，并把 [start_date, end_date] 合并进已覆盖区间
+        与本地已有日期重叠的行以新数据为准。只在新数据全部晚于本地数据时直接追加，否则整体重写。
+        :param data: 接口返回的 DataFrame，可以为空（区间内没有交易日）
+        :param start_date: 本次请求的开始日期
+        :param end_date: 本次请求已确认完整的结束日期
+        """
+        key_dir = self._key_dir(code, frequency, adjustflag)
+        os.makedirs(key_dir, exist_ok=True)
+        meta = self._read_meta(key_dir)
+        column_dtypes = self.column_dtypes(frequency) if meta is None else meta['columns']
+        new_columns = self._to_columns(data, column_dtypes) if not data.empty else None
+
+        if meta is None:
+            meta = {
+                'columns': dict(column_dtypes),
+                'rows': 0,
+                'start': start_date.strftime('%Y-%m-%d'),
+                'end': end_date.strftime('%Y-%m-%d'),
+            }
+            old_columns = {name: np.empty(0, dtype=dtype) for name, dtype in column_dtypes.items()}
+        else:
+            old_columns = self._load(key_dir, meta)
+
+        if new_columns is not None:
+            old_dates = old_columns['date']
+            new_dates = new_columns['date']
+            # 新数据全部晚于旧数据时直接追加到末尾；与旧数据有重叠（如重新获取最后一天）时整体重写，
+            # 不覆盖已有的行，已经映射（如 read_columns 返回）的数组不会被修改
+            if len(old_dates) == 0 or old_dates[-1] < new_dates[0]:
+                self._append(key_dir, meta, new_columns, meta['rows'])
+            else:
+                mask = (old_dates < new_dates[0]) | (old_dates > new_dates[-1])
+                order = np.argsort(np.concatenate([old_dates[mask], new_dates]), kind='stable')
+                merged = {
+                    name: np.concatenate([old_columns[name][mask], new_columns[name]])[order]
+                    for name in meta['columns']
+                }
+                self._rewrite(key_dir, meta, merged)
+            self._write_day_index(key_dir, meta)
+
+        meta['start'] = min(pd.Timestamp(meta['start']), start_date).strftime('%Y-%m-%d')
+        meta['end'] = max(pd.Timestamp(meta['end']), end_date).strftime('%Y-%m-%d')
+        self._write_meta(key_dir, meta)
+
+    def _append(self, key_dir: str, meta: Dict, columns: Dict[str, np.ndarray], offset: int):
+        """从第 offset 行（不小于已有行数）开始写入，中断时多写的字节不在行数之内，不会被读取"""
+        for name, dtype in meta['columns'].items():
+            path = os.path.join(key_dir, f'{name}.bin')
+            itemsize = np.dtype(dtype).itemsize
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                f.seek(offset * itemsize)
+                columns[name].astype(dtype, copy=False).tofile(f)
+        meta['rows'] = int(offset) + len(columns['date'])
+
+    def _rewrite(self, key_dir: str, meta: Dict, columns: Dict[str, np.ndarray]):
+        for name, dtype in meta['columns'].items():
+            path = os.path.join(key_dir, f'{name}.bin')
+            tmp_path = path + '.tmp'
+            columns[name].astype(dtype, copy=False).tofile(tmp_path)
+            os.replace(tmp_path, path)
+        meta['rows'] = len(columns['date'])
+
+    @staticmethod
+    def last_complete_date() -> pd.Timestamp:
+        """
+        最近一个数据已经完整的日期
+        baostock 在交易日17:30后更新当日数据，18点之前当天的数据视为不完整，下次请求时重新获取
+        """
+        now = datetime.now()
+        if now.hour < 18:
+            now -= timedelta(days=1)
+        return pd.Timestamp(now.date())
@@ -0,0 +1,240 @@
+import json
+import math
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stock_tools.data_fetcher import StockDataFetcher
+from stock_tools.fundamental_analyzer import FundamentalAnalyzer
+from stock_tools.technical_analyzer import TechnicalAnalyzer
+
+# 批量结果中保留的最新技术指标
+SUMMARY_INDICATORS = ['MA5', 'MA20', 'MA60', 'MACD', 'MACD_SIGNAL', 'RSI6', 'RSI14',
+                      'K', 'D', 'J', 'CCI', 'ADX', 'WILLR']
+
+# 基本面数据集：名称 -> 批量查询方法
+FUNDAMENTAL_DATASETS = {
+    'financial': 'get_financial_data_many',
+    'growth': 'get_growth_data_many',
+    'industry': 'get_stock_industry_data_many',
+    'dividend': 'get_adjust_factors_many',
+}
+
+
+def read_watchlist(path: str) -> List[str]:
+    """
+    读取自选股文件：每行一个或多个股票代码（逗号或空白分隔），# 之后为注释
+    :param path: 文件路径
+    :return: 去重后的股票代码列表，保持文件中的顺序
+    """
+    codes = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0]
+            codes.extend(code for code in line.replace(',', ' ').split() if code)
+    return list(dict.fromkeys(codes))
+
+
+def _to_json_value(value):
+    """numpy 标量转换为 Python 类型，NaN 转换为 None"""
+    if isinstance(value, (np.floating, float)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def analyze_prices(data: pd.DataFrame) -> Dict:
+    """
+    技术分析（在计算进程中执行）
+    :param data: 单只股票的K线数据
+    :return: dict，包括最新收盘价、最新指标值、技术信号和计算耗时
+    """
+    start = time.perf_counter()
+    analyzer = TechnicalAnalyzer(data)
+    latest = analyzer.get_indicators(SUMMARY_INDICATORS, tail=1).iloc[-1]
+    return {
+        'date': str(pd.Timestamp(data['date'].iloc[-1]).date()),
+        'close': _to_json_value(analyzer.close.iloc[-1]),
+        'indicators': {name: _to_json_value(value) for name, value in latest.items()},
+        'signals': analyzer.get_technical_signals(),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+class RateLimiter:
+    """
+    简单的限速器：任意两次调用之间至少间隔 60 / calls_per_minute 秒，可在多个线程间共享
+    """
+
+    def __init__(self, calls_per_minute: float):
+        self.interval = 60.0 / calls_per_minute if calls_per_minute else 0.0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class BatchRunner:
+    """
+    批量分析自选股：获取数据、技术分析、基本面分析，可选由大模型生成点评，结果逐行写入 JSONL 文件
+
+    - 数据获取：使用 StockDataFetcher 的批量接口，每个数据集由一个线程驱动，
+      底层由多个进程各自持有 baostock 会话并发查询
+    - 技术分析：在计算进程池中执行
+    - 大模型点评：在线程池中执行，并按每分钟调用次数限速
+    """
+
+    def __init__(self, fetcher: StockDataFetcher, start_date: str, end_date: Optional[str] = None,
+                 io_workers: int = 8, cpu_workers: Optional[int] = None,
+                 narrate: Optional[Callable[[str, Dict], str]] = None,
+                 llm_calls_per_minute: float = 30, llm_workers: int = 4):
+        """
+        :param fetcher: 数据获取器
+        :param start_date: K线开始日期
+        :param end_date: K线结束日期，默认为今天
+        :param io_workers: 并发的 baostock 会话总数
+        :param cpu_workers: 技术分析进程数，默认为CPU核数
+        :param narrate: 大模型点评函数 (股票代码, 分析结果) -> 文本，为None时不生成点评
+        :param llm_calls_per_minute: 大模型每分钟最多调用次数
+        :param llm_workers: 同时进行的大模型调用数
+        """
+        self.fetcher = fetcher
+        self.start_date = start_date
+        self.end_date = end_date
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.narrate = narrate
+        self.rate_limiter = RateLimiter(llm_calls_per_minute)
+        self.llm_workers = llm_workers
+        self._write_lock = threading.Lock()
+
+    def run(self, codes: Iterable[str], output_path: str) -> int:
+        """
+        批量分析
+        :param codes: 股票代码列表
+        :param output_path: 结果文件路径（JSONL，每行一只股票，按完成顺序写入）
+        :return: 没有错误的股票数量
+        """
+        codes = list(dict.fromkeys(self.fetcher._format_stock_code(code) for code in codes))
+        self._started = time.perf_counter()
+        self._written = 0
+        records = {code: {'code': code, 'timing': {}, 'errors': []} for code in codes}
+        fundamentals = {code: {} for code in codes}
+        technical_futures = {}
+        # 每只股票还差几个数据集，全部到齐后放入 ready
+        pending = {code: 1 + len(FUNDAMENTAL_DATASETS) for code in codes}
+        ready = queue.Queue()
+        lock = threading.Lock()
+        # 每个数据集一个线程，会话数在数据集之间平均分配
+        sessions = max(1, self.io_workers // (1 + len(FUNDAMENTAL_DATASETS)))
+
+        def arrived(code):
+            with lock:
+                pending[code] -= 1
+                if pending[code] == 0:
+                    records[code]['timing']['data'] = time.perf_counter() - self._started
+                    ready.put(code)
+
+        def fetch_prices():
+            for code, data in self.fetcher.get_stock_data_many(codes, self.start_date, self.end_date,
+                                                               max_workers=sessions):
+                if data.empty:
+                    records[code]['errors'].append('没有获取到K线数据')
+                else:
+                    technical_futures[code] = cpu_pool.submit(analyze_prices, data)
+                arrived(code)
+
+        def fetch_fundamental(name, method_name):
+            for code, data in getattr(self.fetcher, method_name)(codes, max_workers=sessions):
+                fundamentals[code][name] = data
+                arrived(code)
+
+        cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers)
+        io_pool = ThreadPoolExecutor(max_workers=1 + len(FUNDAMENTAL_DATASETS))
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_workers) if self.narrate else None
+        try:
+            io_futures = [io_pool.submit(fetch_prices)]
+            io_futures += [io_pool.submit(fetch_fundamental, name, method_name)
+                           for name, method_name in FUNDAMENTAL_DATASETS.items()]
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for _ in range(len(codes)):
+                    while True:
+                        try:
+                            code = ready.get(timeout=1)
+                            break
+                        except queue.Empty:
+                            # 数据获取线程异常退出时不再等待
+                            for future in io_futures:
+                                if future.done() and future.exception() is not None:
+                                    raise future.exception()
+                    record = self._complete(records[code], fundamentals.pop(code),
+                                            technical_futures.pop(code, None))
+                    if llm_pool is not None and not record['errors']:
+                        llm_pool.submit(self._narrate, record, f)
+                    else:
+                        self._write(f, record)
+                if llm_pool is not None:
+                    llm_pool.shutdown(wait=True)
+        finally:
+            io_pool.shutdown(wait=True)
+            cpu_pool.shutdown(wait=True)
+            if llm_pool is not None:
+                llm_pool.shutdown(wait=True)
+        return self._written
+
+    def _complete(self, record: Dict, fundamentals: Dict[str, pd.DataFrame], technical_future) -> Dict:
+        """汇总技术分析和基本面分析结果"""
+        if technical_future is not None:
+            try:
+                technical = technical_future.result()
+                record['timing']['technical'] = technical.pop('seconds')
+                record['technical'] = technical
+            except Exception as e:
+                record['errors'].append(f'技术分析失败：{e}')
+
+        start = time.perf_counter()
+        try:
+            analyzer = FundamentalAnalyzer(fundamentals['financial'], fundamentals['growth'],
+                                           fundamentals['industry'], fundamentals['dividend'])
+            record['fundamental'] = {name: _to_json_value(value)
+                                     for name, value in analyzer.analyze_financial_health().items()}
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            # 缺少数据集或字段，或数值字段为空字符串（如银行股的 MBRevenue），只记录这只股票的错误
+            record['errors'].append(f'基本面数据不完整：{e}')
+        record['timing']['fundamental'] = time.perf_counter() - start
+        return record
+
+    def _narrate(self, record: Dict, f):
+        """生成大模型点评（在线程池中执行），完成后写入结果文件"""
+        self.rate_limiter.wait()
+        start = time.perf_counter()
+        try:
+            record['narrative'] = self.narrate(record['code'], record)
+        except Exception as e:
+            record['errors'].append(f'生成点评失败：{e}')
+        record['timing']['llm'] = time.perf_counter() - start
+        self._write(f, record)
+
+    def _write(self, f, record: Dict):
+        record['timing']['total'] = time.perf_counter() - self._started
+        if not record['errors']:
+            del record['errors']
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._write_lock:
+            f.write(line)
+            f.flush()
+            if 'errors' not in record:
+                self._written += 1
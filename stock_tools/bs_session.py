@@ -0,0 +1,138 @@
+import atexit
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import baostock as bs
+
+# 可以通过重新登录、稍后重试恢复的错误：未登录、网络错误（10002xxx）、服务端系统错误
+RETRYABLE_ERRORS = ('10001001', '10005001')
+NETWORK_ERROR_PREFIX = '10002'
+
+
+def is_retryable(error_code: str) -> bool:
+    return error_code in RETRYABLE_ERRORS or error_code.startswith(NETWORK_ERROR_PREFIX)
+
+
+class BaostockSession:
+    """
+    托管的 baostock 会话
+
+    baostock 的登录状态和连接是模块级全局状态，因此每个进程只有一个会话：
+    - 同一进程内的所有查询（包括翻页）在锁内串行执行，多线程、多个 fetcher 可以安全共享
+    - 进程 fork 后子进程继承的连接不可用，检测到进程号变化时在子进程中重新登录
+    - 空闲超过 idle_timeout 的连接可能已被服务端断开，下次查询前主动重新登录
+    - 查询返回未登录、网络错误时重新登录，并按指数退避重试
+    - 进程退出时登出，不依赖垃圾回收
+    """
+
+    _sessions: Dict[Tuple[int, int], 'BaostockSession'] = {}
+    _sessions_lock = threading.Lock()
+
+    def __init__(self, backend=None, max_retries: int = 3, backoff: float = 1.0,
+                 max_backoff: float = 30.0, idle_timeout: float = 300.0):
+        """
+        :param backend: 数据接口，默认为 baostock 模块
+        :param max_retries: 可恢复错误的最大重试次数
+        :param backoff: 第一次重试前的等待时间（秒），之后每次翻倍
+        :param max_backoff: 最长等待时间（秒）
+        :param idle_timeout: 空闲超过该时间（秒）后，下次查询前重新登录
+        """
+        self.backend = backend if backend is not None else bs
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._pid = None  # 登录时的进程号，None 表示未登录
+        self._last_used = 0.0
+        self.logins = 0
+        self.retries = 0
+        atexit.register(self.close)
+
+    @classmethod
+    def shared(cls, backend=None, **kwargs) -> 'BaostockSession':
+        """
+        获取当前进程中该数据接口的共享会话，不存在时创建
+        :param backend: 数据接口，默认为 baostock 模块
+        :param kwargs: 创建会话时的参数，见 __init__
+        """
+        backend = backend if backend is not None else bs
+        key = (os.getpid(), id(backend))
+        with cls._sessions_lock:
+            session = cls._sessions.get(key)
+            if session is None:
+                session = cls(backend, **kwargs)
+                cls._sessions[key] = session
+            return session
+
+    @property
+    def lock(self) -> threading.RLock:
+        """会话锁，需要连续执行多个接口调用时持有"""
+        return self._lock
+
+    def _login(self):
+        """
+        登录（调用方需持有锁）
+        :return: 登录结果
+        """
+        lg = self.backend.login()
+        self.logins += 1
+        if lg.error_code == '0':
+            self._pid = os.getpid()
+            self._last_used = time.monotonic()
+        else:
+            self._pid = None
+            print(f"baostock登录失败，错误代码：{lg.error_code}，错误信息：{lg.error_msg}")
+        return lg
+
+    def _check(self):
+        """
+        健康检查（调用方需持有锁）：未登录、fork 后的子进程或空闲过久时重新登录
+        :return: 登录结果，不需要重新登录时返回None
+        """
+        if self._pid != os.getpid():
+            return self._login()
+        if time.monotonic() - self._last_used > self.idle_timeout:
+            return self._login()
+        return None
+
+    def query(self, query_func: Callable, read: Callable[[Any], Any], **kwargs) -> Tuple[Any, Any]:
+        """
+        执行一次查询，可恢复的错误会重新登录后重试
+        :param query_func: baostock 查询函数
+        :param read: 读取结果的函数，在锁内执行，翻页出错时同样会重试整个查询
+        :param kwargs: 查询参数
+        :return: (最后一次的 ResultData, read 的返回值)，失败时返回值为None
+        """
+        for attempt in range(self.max_retries + 1):
+            with self._lock:
+                lg = self._check()
+                if lg is not None and lg.error_code != '0':
+                    rs, result = lg, None
+                else:
+                    rs = query_func(**kwargs)
+                    result = read(rs) if rs.error_code == '0' else None
+                    # read 中翻页可能出错，以读完后的错误代码为准
+                    if rs.error_code == '0':
+                        self._last_used = time.monotonic()
+                        return rs, result
+                if not is_retryable(rs.error_code) or attempt == self.max_retries:
+                    return rs, None
+                # 连接状态未知，下次重试前重新登录
+                self._pid = None
+                self.retries += 1
+            time.sleep(min(self.max_backoff, self.backoff * 2 ** attempt))
+        return rs, None
+
+    def close(self):
+        """登出"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            self._pid = None
+            try:
+                self.backend.logout()
+            except Exception:
+                pass
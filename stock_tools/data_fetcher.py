@@ -1,17 +1,127 @@
 import baostock as bs
+import numpy as np
 import pandas as pd
+import functools
+import inspect
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from typing import Optional, Callable
+from typing import Optional, Callable, Dict, Iterable, Iterator, Tuple
+
+from stock_tools.bar_store import BarStore
+from stock_tools.bs_session import BaostockSession
+from stock_tools.fundamental_store import FundamentalStore, latest_report_quarter, latest_report_year
+from stock_tools.price_adjust import adjust_columns
+from stock_tools.query_cache import QueryCache
+
+# 数值型字段的类型，其他字段（代码、名称、行业等）保留为字符串
+FIELD_DTYPES = {
+    'date': 'datetime64[D]',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'preclose': 'float64',
+    'amount': 'float64',
+    'turn': 'float64',
+    'pctChg': 'float64',
+    'peTTM': 'float64',
+    'pbMRQ': 'float64',
+    'psTTM': 'float64',
+    'pcfNcfTTM': 'float64',
+    'volume': 'int64',
+    'tradestatus': 'int64',
+    'isST': 'int64',
+    'foreAdjustFactor': 'float64',
+    'backAdjustFactor': 'float64',
+    'adjustFactor': 'float64',
+    # 分钟线的K线结束时间，格式如 20240102093500000
+    'time': 'datetime64[ms]',
+}
+
+# K线频率：日、周、月线和5/15/30/60分钟线
+FREQUENCIES = ('d', 'w', 'm') + BarStore.MINUTE_FREQUENCIES
+# 复权类型：1 后复权，2 前复权，3 不复权
+ADJUSTFLAGS = ('1', '2', '3')
+
+
+def _convert_column(values: tuple, dtype: str) -> np.ndarray:
+    """
+    将一页数据中的一列字符串转换为指定类型
+    空字符串（停牌、缺失）转换为 NaN / NaT，整数列转换为 0
+    """
+    if dtype == 'datetime64[ms]':
+        # 分钟线的 time 字段：YYYYMMDDHHMMSSsss
+        return pd.to_datetime(values, format='%Y%m%d%H%M%S%f').to_numpy().astype(dtype)
+    if dtype.startswith('datetime64'):
+        return np.array(values, dtype=dtype)
+    raw = np.array(values)
+    missing = raw == ''
+    if missing.any():
+        raw[missing] = '0' if dtype == 'int64' else 'nan'
+    return raw.astype(dtype)
+
+
+def cached_query(method: Callable) -> Callable:
+    """
+    查询方法装饰器：fetcher 配置了 query_cache 时，按规范化后的参数缓存查询结果
+    返回结果的浅拷贝，调用方增删列不会影响缓存中的数据
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.query_cache is None:
+            return method(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        arguments = list(bound.arguments.items())[1:]
+        key = (method.__name__,) + tuple(
+            (name, self._normalize_query_arg(name, value)) for name, value in arguments
+        )
+        result = self.query_cache.get_or_compute(
+            key,
+            lambda: method(self, *args, **kwargs),
+            should_cache=lambda data: not data.empty
+        )
+        return result.copy(deep=False)
+
+    return wrapper
+
+
+# 批量查询时每个工作进程持有的 fetcher，各自登录一个 baostock 会话
+_worker_fetcher = None
+
+
+def _init_bulk_worker(backend, store_dir: Optional[str], query_cache_args: Optional[Tuple[float, int]]):
+    global _worker_fetcher
+    query_cache = QueryCache(*query_cache_args) if query_cache_args is not None else None
+    _worker_fetcher = StockDataFetcher(store_dir=store_dir, backend=backend, query_cache=query_cache)
+
+
+def _bulk_worker_call(method_name: str, code: str, kwargs: dict) -> pd.DataFrame:
+    return getattr(_worker_fetcher, method_name)(code, **kwargs)
+
 
 class StockDataFetcher:
-    def __init__(self):
-        self.lg = bs.login()
-    
-    def __del__(self):
-        try:
-            bs.logout()
-        except Exception:
-            pass
+    def __init__(self, store_dir: Optional[str] = None, query_cache: Optional[QueryCache] = None,
+                 backend=None, session: Optional[BaostockSession] = None,
+                 fundamental_store: Optional[FundamentalStore] = None):
+        """
+        :param store_dir: 本地K线存储目录，为None时每次都从接口获取
+        :param query_cache: 查询缓存，同一会话内相同参数的查询只请求一次，为None时不缓存
+        :param backend: 数据接口，默认为 baostock 模块，离线测试时可传入 FakeBaostock
+        :param session: baostock 会话，默认使用当前进程中该数据接口的共享会话（首次查询时登录）
+        :param fundamental_store: 本地基本面数据仓库，已保存的报告期直接从本地读取
+        """
+        self.bs = backend if backend is not None else bs
+        self.session = session if session is not None else BaostockSession.shared(self.bs)
+        self.store_dir = store_dir
+        self.bar_store = BarStore(store_dir) if store_dir else None
+        self.query_cache = query_cache
+        self.fundamental_store = fundamental_store
+        # 查询由会话锁串行执行，这把锁保证本地存储的补齐和写入不会并发进行
+        self._lock = threading.RLock()
 
     def _format_stock_code(self, code: str) -> str:
         """
@@ -26,48 +136,222 @@ class StockDataFetcher:
             code = code.split('.')[0] + '.' + code.split('.')[1].zfill(6)
         return code
 
-    def _fetch_data(self, query_func: Callable, error_msg: str, **kwargs) -> pd.DataFrame:
+    def _normalize_query_arg(self, name: str, value):
         """
-        通用数据获取方法
+        规范化查询参数，使 "600000" 与 "sh.600000"、"2024-5-1" 与 "2024-05-01" 命中同一个缓存
+        """
+        if name == 'code':
+            return self._format_stock_code(value)
+        if name in ('start_date', 'end_date'):
+            if value is None:
+                value = datetime.now()
+            return pd.Timestamp(value).strftime('%Y-%m-%d')
+        return value
+
+    def _query(self, query_func: Callable, error_msg: str, **kwargs) -> Optional[pd.DataFrame]:
+        """
+        执行查询，与 _fetch_data 的区别是查询失败时返回None，便于区分"失败"和"没有数据"
         :param query_func: 查询函数
         :param error_msg: 错误信息前缀
         :param kwargs: 查询参数
-        :return: DataFrame
+        :return: DataFrame，失败时返回None
         """
-        rs = query_func(**kwargs)
+        rs, data = self.session.query(query_func, self._read_pages, **kwargs)
         if rs.error_code != '0':
             print(f"{error_msg}，错误代码：{rs.error_code}，错误信息：{rs.error_msg}")
-            return pd.DataFrame()
-            
-        data_list = []
+            return None
+        return data
+
+    def _read_pages(self, rs) -> pd.DataFrame:
+        """
+        读取查询结果的所有页（翻页同样需要访问接口，在会话锁内执行）
+        :param rs: 查询返回的 ResultData
+        :return: DataFrame
+        """
+        # 按页读取：每页转置为列后立即转换为目标类型，不保留整张表的字符串中间结果
+        fields = rs.fields
+        chunks = {field: [] for field in fields}
         while (rs.error_code == '0') & rs.next():
-            data_list.append(rs.get_row_data())
-            
-        return pd.DataFrame(data_list, columns=rs.fields) if data_list else pd.DataFrame()
+            page = rs.data[rs.cur_row_num:]
+            rs.cur_row_num = len(rs.data)
+            for field, values in zip(fields, zip(*page)):
+                dtype = FIELD_DTYPES.get(field)
+                chunks[field].append(_convert_column(values, dtype) if dtype else values)
+
+        if not chunks or not chunks[fields[0]]:
+            return pd.DataFrame()
+        columns = {}
+        for field, parts in chunks.items():
+            if field in FIELD_DTYPES:
+                columns[field] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            else:
+                columns[field] = [value for part in parts for value in part]
+        return pd.DataFrame(columns, copy=False)
+
+    def _fetch_data(self, query_func: Callable, error_msg: str, **kwargs) -> pd.DataFrame:
+        """
+        通用数据获取方法
+        :param query_func: 查询函数
+        :param error_msg: 错误信息前缀
+        :param kwargs: 查询参数
+        :return: DataFrame
+        """
+        data = self._query(query_func, error_msg, **kwargs)
+        return pd.DataFrame() if data is None else data
+
+    def _query_k_data(self, code: str, start_date: str, end_date: str,
+                      frequency: str, adjustflag: str) -> Optional[pd.DataFrame]:
+        """
+        从接口获取K线数据
+        :return: DataFrame，失败时返回None
+        """
+        # 分钟线多一个 time 字段（K线结束时间）
+        fields = "date,time,code" if frequency in BarStore.MINUTE_FREQUENCIES else "date,code"
+        return self._query(
+            self.bs.query_history_k_data_plus,
+            "获取数据失败",
+            code=code,
+            fields=fields + ",open,high,low,close,volume,amount,adjustflag",
+            start_date=start_date,
+            end_date=end_date,
+            frequency=frequency,
+            adjustflag=adjustflag
+        )
+
+    def _get_stored_stock_data(self, code: str, start_date: str, end_date: str,
+                               frequency: str, adjustflag: str) -> pd.DataFrame:
+        """
+        通过本地存储获取K线数据，只从接口补齐本地缺失的首尾区间
+        """
+        with self._lock:
+            start, end = self._sync_stored_stock_data(code, start_date, end_date, frequency, adjustflag)
+            return self.bar_store.read(code, frequency, adjustflag, start, end)
 
-    def get_stock_data(self, code: str, start_date: str, end_date: Optional[str] = None) -> pd.DataFrame:
+    def _sync_stored_stock_data(self, code: str, start_date: str, end_date: str,
+                                frequency: str, adjustflag: str) -> Tuple[pd.Timestamp, pd.Timestamp]:
+        """从接口补齐本地存储缺失的首尾区间，返回规范化后的 (开始日期, 结束日期)"""
+        start = pd.Timestamp(start_date).normalize()
+        end = pd.Timestamp(end_date).normalize()
+        # 尚未收盘完成的日期不计入已覆盖区间，下次请求时会重新获取
+        complete_end = min(end, BarStore.last_complete_date())
+
+        missing = []
+        coverage = self.bar_store.get_coverage(code, frequency, adjustflag)
+        if coverage is None:
+            missing.append((start, end))
+        else:
+            covered_start, covered_end = coverage
+            if start < covered_start:
+                missing.append((start, covered_start - timedelta(days=1)))
+            if end > covered_end:
+                missing.append((covered_end + timedelta(days=1), end))
+
+        for fetch_start, fetch_end in missing:
+            data = self._query_k_data(
+                code, fetch_start.strftime('%Y-%m-%d'), fetch_end.strftime('%Y-%m-%d'),
+                frequency, adjustflag
+            )
+            if data is None:
+                # 获取失败时不更新本地存储，直接返回已有部分
+                continue
+            self.bar_store.write(
+                code, frequency, adjustflag, data,
+                fetch_start, max(min(fetch_end, complete_end), fetch_start - timedelta(days=1))
+            )
+        return start, end
+
+    def _sync_adjust_factors(self, code: str, end: pd.Timestamp) -> Optional[Dict[str, np.ndarray]]:
+        """
+        从接口补齐本地复权因子，只获取上次检查之后的除权除息事件
+        :param end: 需要覆盖到的日期
+        :return: {'date': 除权除息日, 'back': 后复权因子}，从未获取成功时返回None
         """
-        获取股票日线数据
+        complete_end = BarStore.last_complete_date()
+        checked = self.bar_store.get_factor_coverage(code)
+        if checked is None or checked < min(end, complete_end):
+            fetch_start = '1990-01-01' if checked is None else (checked + timedelta(days=1)).strftime('%Y-%m-%d')
+            data = self._query(
+                self.bs.query_adjust_factor,
+                "获取复权因子失败",
+                code=code,
+                start_date=fetch_start,
+                end_date=datetime.now().strftime('%Y-%m-%d')
+            )
+            if data is not None:
+                self.bar_store.write_factors(code, data, complete_end)
+        return self.bar_store.read_factors(code)
+
+    def _read_stored_columns(self, code: str, start_date: str, end_date: str,
+                             frequency: str, adjustflag: str) -> Optional[Dict[str, np.ndarray]]:
+        """
+        通过本地存储获取K线数据的列，复权价格由本地的不复权K线和复权因子计算
+        :return: 列名 -> 数组，复权因子获取失败时返回None
+        """
+        with self._lock:
+            start, end = self._sync_stored_stock_data(code, start_date, end_date, frequency, "3")
+            columns = self.bar_store.read_columns(code, frequency, "3", start, end)
+            if adjustflag == "3":
+                return columns
+            # 前复权以最新的复权因子为基准，需要检查到最近一天；后复权只需要覆盖到请求的结束日期
+            factors = self._sync_adjust_factors(code, BarStore.last_complete_date() if adjustflag == "2" else end)
+        if factors is None:
+            return None
+        return adjust_columns(columns, factors['date'], factors['back'], adjustflag)
+
+    @staticmethod
+    def _check_k_args(frequency: str, adjustflag: str):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"不支持的K线频率：{frequency}，可选 {', '.join(FREQUENCIES)}")
+        if adjustflag not in ADJUSTFLAGS:
+            raise ValueError(f"不支持的复权类型：{adjustflag}，可选 1（后复权）、2（前复权）、3（不复权）")
+
+    @cached_query
+    def get_stock_data(self, code: str, start_date: str, end_date: Optional[str] = None,
+                       frequency: str = "d", adjustflag: str = "3") -> pd.DataFrame:
+        """
+        获取股票K线数据
         :param code: 股票代码，格式如：sh.600000
         :param start_date: 开始日期，格式：YYYY-MM-DD
         :param end_date: 结束日期，格式：YYYY-MM-DD，默认为今天
-        :return: DataFrame
+        :param frequency: K线频率：d 日线、w 周线、m 月线，5/15/30/60 分钟线
+        :param adjustflag: 复权类型：1 后复权、2 前复权、3 不复权
+        :return: DataFrame，分钟线另有 time 列（K线结束时间）
         """
+        self._check_k_args(frequency, adjustflag)
         if end_date is None:
             end_date = datetime.now().strftime('%Y-%m-%d')
             
         code = self._format_stock_code(code)
-        return self._fetch_data(
-            bs.query_history_k_data_plus,
-            "获取数据失败",
-            code=code,
-            fields="date,code,open,high,low,close,volume,amount,adjustflag",
-            start_date=start_date,
-            end_date=end_date,
-            frequency="d",
-            adjustflag="3"
-        )
+        if self.bar_store is not None:
+            if adjustflag == "3":
+                return self._get_stored_stock_data(code, start_date, end_date, frequency, adjustflag)
+            columns = self._read_stored_columns(code, start_date, end_date, frequency, adjustflag)
+            if columns is not None:
+                return BarStore.to_frame(code, adjustflag, columns)
+        # 没有本地存储，或复权因子获取失败时，直接从接口获取复权后的数据
+        data = self._query_k_data(code, start_date, end_date, frequency, adjustflag)
+        return pd.DataFrame() if data is None else data
+
+    def get_stock_columns(self, code: str, start_date: str, end_date: Optional[str] = None,
+                          frequency: str = "d", adjustflag: str = "3") -> Dict[str, np.ndarray]:
+        """
+        获取K线数据的列，数组直接映射到本地列文件（零拷贝），适合全市场分钟线等放不进内存的数据
+        参数见 get_stock_data；需要配置本地存储
+        :return: 列名 -> 数组，可以直接传给 TechnicalAnalyzer.from_columns；没有数据时返回空dict。
+                 复权时价格列为本地计算的新数组，其他列仍映射到列文件
+        """
+        self._check_k_args(frequency, adjustflag)
+        if self.bar_store is None:
+            raise ValueError("get_stock_columns 需要配置本地K线存储（store_dir）")
+        if end_date is None:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+        code = self._format_stock_code(code)
+        columns = self._read_stored_columns(code, start_date, end_date, frequency, adjustflag)
+        if columns is None:
+            raise RuntimeError(f"获取复权因子失败，无法计算 {code} 的复权价格")
+        return columns
     
+    @cached_query
     def get_stock_basic_info(self, code: str) -> pd.DataFrame:
         """
         获取股票基本信息
@@ -76,45 +360,69 @@ class StockDataFetcher:
         """
         code = self._format_stock_code(code)
         return self._fetch_data(
-            bs.query_stock_basic,
+            self.bs.query_stock_basic,
             "获取基本信息失败",
             code=code
         )
     
-    def get_financial_data(self, code: str, year: int = 2024, quarter: int = 4) -> pd.DataFrame:
+    def _stored_fundamentals(self, dataset: str, code: str, year: int, quarter: int = 4) -> Optional[pd.DataFrame]:
+        """本地基本面仓库中的数据，没有配置仓库或没有保存该股票该期的数据时返回None"""
+        if self.fundamental_store is None:
+            return None
+        return self.fundamental_store.lookup(dataset, code, year, quarter)
+
+    def _stored_industry(self, code: str) -> Optional[pd.DataFrame]:
+        """本地基本面仓库中该股票最新的行业分类，没有时返回None"""
+        if self.fundamental_store is None or not self.fundamental_store.periods('industry'):
+            return None
+        data = self.fundamental_store.as_of_code('industry', code, datetime.now())
+        return None if data.empty else data
+
+    @cached_query
+    def get_financial_data(self, code: str, year: Optional[int] = None, quarter: Optional[int] = None) -> pd.DataFrame:
         """
         获取财务数据
         :param code: 股票代码
-        :param year: 年份
+        :param year: 年份，与 quarter 都为None时为最近一个已过披露期限的报告期
         :param quarter: 季度
         :return: DataFrame
         """
         code = self._format_stock_code(code)
+        year, quarter = self._report_quarter(year, quarter)
+        stored = self._stored_fundamentals('profit', code, year, quarter)
+        if stored is not None:
+            return stored
         return self._fetch_data(
-            bs.query_profit_data,
+            self.bs.query_profit_data,
             "获取财务数据失败",
             code=code,
             year=year,
             quarter=quarter
         )
     
-    def get_growth_data(self, code: str, year: int = 2024, quarter: int = 4) -> pd.DataFrame:
+    @cached_query
+    def get_growth_data(self, code: str, year: Optional[int] = None, quarter: Optional[int] = None) -> pd.DataFrame:
         """
         获取成长数据
         :param code: 股票代码
-        :param year: 年份
+        :param year: 年份，与 quarter 都为None时为最近一个已过披露期限的报告期
         :param quarter: 季度
         :return: DataFrame
         """
         code = self._format_stock_code(code)
+        year, quarter = self._report_quarter(year, quarter)
+        stored = self._stored_fundamentals('growth', code, year, quarter)
+        if stored is not None:
+            return stored
         return self._fetch_data(
-            bs.query_growth_data,
+            self.bs.query_growth_data,
             "获取成长数据失败",
             code=code,
             year=year,
             quarter=quarter
         )
     
+    @cached_query
     def get_stock_industry_data(self, code: str) -> pd.DataFrame:
         """
         获取股票行业数据
@@ -122,23 +430,185 @@ class StockDataFetcher:
         :return: DataFrame
         """     
         code = self._format_stock_code(code)
+        stored = self._stored_industry(code)
+        if stored is not None:
+            return stored
         return self._fetch_data(
-            bs.query_stock_industry,
+            self.bs.query_stock_industry,
             "获取行业数据失败",
             code=code
         )
 
-    def get_adjust_factors(self, code: str, year: int = 2024) -> pd.DataFrame:
+    def get_industry_classification(self, date: str = '') -> pd.DataFrame:
+        """
+        获取全部股票的行业分类
+        :param date: 查询日期，默认为最新
+        :return: DataFrame
+        """
+        return self._fetch_data(self.bs.query_stock_industry, "获取行业数据失败", date=date)
+
+    @cached_query
+    def get_adjust_factors(self, code: str, year: Optional[int] = None) -> pd.DataFrame:
         """
-        获取除权数据
+        获取除权数据（分红送转方案）
+        价格复权不需要这里的数据，get_stock_data 使用本地保存的复权因子计算复权价格
         :param code: 股票代码
-        :param year: 年份
+        :param year: 年份，默认为年报已全部披露的最近一年
         :return: DataFrame
         """
         code = self._format_stock_code(code)
+        if year is None:
+            year = latest_report_year()
+        stored = self._stored_fundamentals('dividend', code, year)
+        if stored is not None:
+            return stored
         return self._fetch_data(
-            bs.query_dividend_data,
+            self.bs.query_dividend_data,
             "获取除权数据失败",
             code=code,
             year=year
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    def _report_quarter(year: Optional[int], quarter: Optional[int]) -> Tuple[int, int]:
+        """补全报告期：都未指定时为最近一个已过披露期限的报告期，只指定年份时为年报"""
+        if year is None and quarter is None:
+            return latest_report_quarter()
+        if year is None:
+            year = latest_report_quarter()[0]
+        return int(year), int(quarter or 4)
+
+    def get_index_stocks(self, index: str = 'hs300', date: str = '') -> pd.DataFrame:
+        """
+        获取指数成分股或全部A股列表
+        :param index: hs300、zz500 或 all
+        :param date: 查询日期，默认为最新
+        :return: DataFrame，包含code列
+        """
+        if index == 'all':
+            data = self._fetch_data(self.bs.query_all_stock, "获取股票列表失败", day=date or None)
+            # query_all_stock 同时返回指数，只保留A股
+            if not data.empty:
+                data = data[data['code'].str.match(r'^(sh\.6|sz\.00|sz\.30)')].reset_index(drop=True)
+            return data
+        query_funcs = {
+            'hs300': self.bs.query_hs300_stocks,
+            'zz500': self.bs.query_zz500_stocks,
+        }
+        if index not in query_funcs:
+            raise ValueError(f"不支持的指数：{index}")
+        return self._fetch_data(query_funcs[index], "获取指数成分股失败", date=date)
+
+    def _fetch_many(self, method_name: str, codes: Iterable[str], max_workers: int,
+                    stored: Optional[Callable[[str], Optional[pd.DataFrame]]] = None,
+                    **kwargs) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        用进程池并发查询多只股票，每个工作进程登录一个独立的 baostock 会话
+        （baostock 的会话是模块级全局状态，同一进程内无法并发查询）
+        工作进程按 store_dir 和 query_cache 的设置重建 fetcher；本地基本面仓库在本进程中查询，
+        已保存的股票直接返回，只有其余的股票交给进程池
+        :param method_name: 单只股票的查询方法名
+        :param codes: 股票代码列表
+        :param max_workers: 最大并发会话数
+        :param stored: 股票代码 -> 本地已保存的数据，没有时返回None
+        :param kwargs: 查询参数
+        :return: 迭代器，每只股票查询完成后立即返回 (股票代码, DataFrame)
+        """
+        codes = list(dict.fromkeys(self._format_stock_code(code) for code in codes))
+        if stored is not None:
+            remaining = []
+            for code in codes:
+                data = stored(code)
+                if data is None:
+                    remaining.append(code)
+                else:
+                    yield code, data
+            codes = remaining
+        if not codes:
+            return
+        # baostock 模块无法在进程间传递，工作进程中自行导入
+        backend = None if self.bs is bs else self.bs
+        query_cache_args = None
+        if self.query_cache is not None:
+            query_cache_args = (self.query_cache.ttl, self.query_cache.max_entries)
+        executor = ProcessPoolExecutor(
+            max_workers=min(max_workers, len(codes)),
+            initializer=_init_bulk_worker,
+            initargs=(backend, self.store_dir, query_cache_args)
+        )
+        try:
+            futures = {
+                executor.submit(_bulk_worker_call, method_name, code, kwargs): code
+                for code in codes
+            }
+            for future in as_completed(futures):
+                code = futures[future]
+                try:
+                    data = future.result()
+                except Exception as e:
+                    print(f"批量查询{code}失败：{e}")
+                    data = pd.DataFrame()
+                yield code, data
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_stock_data_many(self, codes: Iterable[str], start_date: str, end_date: Optional[str] = None,
+                            max_workers: int = 8, frequency: str = "d",
+                            adjustflag: str = "3") -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取股票K线数据
+        :param codes: 股票代码列表
+        :param start_date: 开始日期，格式：YYYY-MM-DD
+        :param end_date: 结束日期，格式：YYYY-MM-DD，默认为今天
+        :param max_workers: 最大并发会话数
+        :param frequency: K线频率，见 get_stock_data
+        :param adjustflag: 复权类型，见 get_stock_data
+        :return: 迭代器，按完成顺序返回 (股票代码, DataFrame)
+        """
+        self._check_k_args(frequency, adjustflag)
+        return self._fetch_many('get_stock_data', codes, max_workers, start_date=start_date, end_date=end_date,
+                                frequency=frequency, adjustflag=adjustflag)
+
+    def get_financial_data_many(self, codes: Iterable[str], year: Optional[int] = None, quarter: Optional[int] = None,
+                                max_workers: int = 8, refresh: bool = False) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取财务数据，本地基本面仓库中已保存的股票不访问网络
+        :param refresh: 是否忽略本地基本面仓库，全部从接口获取
+        :return: 迭代器，按完成顺序返回 (股票代码, DataFrame)
+        """
+        year, quarter = self._report_quarter(year, quarter)
+        stored = None if refresh else functools.partial(self._stored_fundamentals, 'profit', year=year, quarter=quarter)
+        return self._fetch_many('get_financial_data', codes, max_workers, stored, year=year, quarter=quarter)
+
+    def get_growth_data_many(self, codes: Iterable[str], year: Optional[int] = None, quarter: Optional[int] = None,
+                             max_workers: int = 8, refresh: bool = False) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取成长数据，本地基本面仓库中已保存的股票不访问网络
+        :param refresh: 是否忽略本地基本面仓库，全部从接口获取
+        :return: 迭代器，按完成顺序返回 (股票代码, DataFrame)
+        """
+        year, quarter = self._report_quarter(year, quarter)
+        stored = None if refresh else functools.partial(self._stored_fundamentals, 'growth', year=year, quarter=quarter)
+        return self._fetch_many('get_growth_data', codes, max_workers, stored, year=year, quarter=quarter)
+
+    def get_stock_industry_data_many(self, codes: Iterable[str], max_workers: int = 8,
+                                     refresh: bool = False) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取股票行业数据，本地基本面仓库中已保存的股票不访问网络
+        :param refresh: 是否忽略本地基本面仓库，全部从接口获取
+        :return: 迭代器，按完成顺序返回 (股票代码, DataFrame)
+        """
+        stored = None if refresh else self._stored_industry
+        return self._fetch_many('get_stock_industry_data', codes, max_workers, stored)
+
+    def get_adjust_factors_many(self, codes: Iterable[str], year: Optional[int] = None,
+                                max_workers: int = 8, refresh: bool = False) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """
+        批量获取除权数据，本地基本面仓库中已保存的股票不访问网络
+        :param refresh: 是否忽略本地基本面仓库，全部从接口获取
+        :return: 迭代器，按完成顺序返回 (股票代码, DataFrame)
+        """
+        if year is None:
+            year = latest_report_year()
+        stored = None if refresh else functools.partial(self._stored_fundamentals, 'dividend', year=year)
+        return self._fetch_many('get_adjust_factors', codes, max_workers, stored, year=year)
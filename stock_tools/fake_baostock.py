@@ -0,0 +1,304 @@
+import math
+import time
+import zlib
+from typing import List, Optional
+
+import pandas as pd
+
+
+class FakeResultSet:
+    """
+    模拟 baostock 的 ResultData：按页返回数据，next()/get_row_data() 的行为与真实接口一致
+    """
+
+    def __init__(self, fields: List[str], rows: List[List[str]], error_code: str = '0',
+                 error_msg: str = 'success', page_size: int = 10000):
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self.fields = fields
+        self.per_page_count = page_size
+        self._pages = [rows[i:i + page_size] for i in range(0, len(rows), page_size)] or [[]]
+        self._page_num = 0
+        self.data = self._pages[0]
+        self.cur_row_num = 0
+
+    def next(self) -> bool:
+        """当前页还有数据时返回True，当前页读完时切换到下一页"""
+        if self.cur_row_num < len(self.data):
+            return True
+        if self._page_num + 1 >= len(self._pages):
+            return False
+        self._page_num += 1
+        self.data = self._pages[self._page_num]
+        self.cur_row_num = 0
+        return len(self.data) > 0
+
+    def get_row_data(self) -> List[str]:
+        row = self.data[self.cur_row_num]
+        self.cur_row_num += 1
+        return row
+
+
+class FakeBaostock:
+    """
+    离线的 baostock 替身，用于在没有网络的环境下测试和压测 StockDataFetcher
+
+    所有数据都由股票代码和日期确定性地生成，同一区间无论分几次查询结果都一致。
+    用法：StockDataFetcher(backend=FakeBaostock(latency=0.05))
+    """
+
+    PROFIT_FIELDS = ['code', 'pubDate', 'statDate', 'roeAvg', 'npMargin', 'gpMargin',
+                     'netProfit', 'epsTTM', 'MBRevenue', 'totalShare', 'liqaShare']
+    GROWTH_FIELDS = ['code', 'pubDate', 'statDate', 'YOYEquity', 'YOYAsset', 'YOYNI',
+                     'YOYEPSBasic', 'YOYPNI']
+    INDUSTRY_FIELDS = ['updateDate', 'code', 'code_name', 'industry', 'industryClassification']
+    DIVIDEND_FIELDS = ['code', 'dividPreNoticeDate', 'dividAgmPumDate', 'dividPlanAnnounceDate',
+                       'dividPlanDate', 'dividRegistDate', 'dividOperateDate', 'dividPayDate',
+                       'dividStockMarketDate', 'dividCashPsBeforeTax', 'dividCashPsAfterTax',
+                       'dividStocksPs', 'dividCashStock', 'dividReserveToStockPs']
+    ADJUST_FACTOR_FIELDS = ['code', 'dividOperateDate', 'foreAdjustFactor', 'backAdjustFactor',
+                            'adjustFactor']
+    BASIC_FIELDS = ['code', 'code_name', 'ipoDate', 'outDate', 'type', 'status']
+    INDUSTRIES = ['J66货币金融服务', 'C39计算机、通信和其他电子设备制造业', 'C27医药制造业',
+                  'C15酒、饮料和精制茶制造业', 'K70房地产业', 'D44电力、热力生产和供应业']
+
+    def __init__(self, latency: float = 0.0, fail_codes: Optional[List[str]] = None,
+                 page_size: int = 10000, universe_size: int = 1000,
+                 blank_fields: Optional[List[str]] = None):
+        """
+        :param latency: 每次查询的模拟网络延迟（秒）
+        :param fail_codes: 查询时返回错误的股票代码
+        :param blank_fields: 返回空字符串的字段（如银行股的 MBRevenue），用于测试缺失值的处理
+        :param page_size: 每页行数，用于模拟分页
+        :param universe_size: query_all_stock 等返回的股票数量
+        """
+        self.latency = latency
+        self.fail_codes = set(fail_codes or [])
+        self.blank_fields = set(blank_fields or [])
+        self.page_size = page_size
+        self.universe_size = universe_size
+        self.query_count = 0
+        self.logged_in = False
+        self._injected_errors = []
+
+    @staticmethod
+    def _seed(*parts) -> int:
+        return zlib.crc32('|'.join(str(p) for p in parts).encode('utf-8'))
+
+    def _noise(self, *parts) -> float:
+        """[-1, 1) 之间的确定性伪随机数"""
+        return self._seed(*parts) / 2 ** 31 - 1
+
+    def inject_errors(self, error_code: str = '10002007', count: int = 1):
+        """
+        让接下来的 count 次查询返回指定错误，网络错误（10002xxx）同时断开会话
+        :param error_code: 错误代码，默认为网络接收错误
+        :param count: 次数
+        """
+        self._injected_errors.extend([error_code] * count)
+
+    def disconnect(self):
+        """模拟服务端断开会话，之后的查询返回未登录，直到重新登录"""
+        self.logged_in = False
+
+    def _result(self, fields: List[str], rows: List[List[str]], code: str = '') -> FakeResultSet:
+        self.query_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not self.logged_in:
+            return FakeResultSet(fields, [], error_code='10001001', error_msg='用户未登陆')
+        if self._injected_errors:
+            error_code = self._injected_errors.pop(0)
+            if error_code.startswith('10002'):
+                self.logged_in = False
+            return FakeResultSet(fields, [], error_code=error_code, error_msg='模拟错误')
+        if code in self.fail_codes:
+            return FakeResultSet(fields, [], error_code='10004011', error_msg='无效的证券代码')
+        blank = [i for i, field in enumerate(fields) if field in self.blank_fields]
+        if blank:
+            rows = [[('' if i in blank else value) for i, value in enumerate(row)] for row in rows]
+        return FakeResultSet(fields, rows, page_size=self.page_size)
+
+    def login(self, *args, **kwargs) -> FakeResultSet:
+        self.logged_in = True
+        return FakeResultSet([], [], error_msg='login success!')
+
+    def logout(self, *args, **kwargs) -> FakeResultSet:
+        self.logged_in = False
+        return FakeResultSet([], [], error_msg='logout success!')
+
+    def _universe(self) -> List[str]:
+        codes = []
+        for i in range(self.universe_size):
+            if i % 2 == 0:
+                codes.append(f'sh.{600000 + i:06d}')
+            else:
+                codes.append(f'sz.{i:06d}')
+        return codes
+
+    @staticmethod
+    def _bar_times(frequency: str) -> List[str]:
+        """一天中各根分钟K线的结束时间（HHMM），上午 9:30-11:30，下午 13:00-15:00"""
+        minutes = int(frequency)
+        times = []
+        for session_start in (9 * 60 + 30, 13 * 60):
+            for end in range(session_start + minutes, session_start + 121, minutes):
+                times.append(f'{end // 60:02d}{end % 60:02d}')
+        return times
+
+    def _operate_date(self, code, year) -> str:
+        """除权除息日，每年 6 月，与 query_dividend_data 一致"""
+        return f'{year}-06-{10 + self._seed(code, year) % 15:02d}'
+
+    def _adjust_events(self, code) -> List[tuple]:
+        """
+        从上市（2000 年）到今天的除权除息事件
+        :return: [(除权除息日, 后复权因子), ...]，后复权因子为各次除权比例的累乘
+        """
+        today = pd.Timestamp.now().strftime('%Y-%m-%d')
+        events, back = [], 1.0
+        for year in range(2001, pd.Timestamp.now().year + 1):
+            operate_date = self._operate_date(code, year)
+            if operate_date > today:
+                break
+            back *= 1.01 + 0.02 * abs(self._noise(code, year, 'divid'))
+            events.append((operate_date, back))
+        return events
+
+    @staticmethod
+    def _adjust_factor(events: List[tuple], date: str, adjustflag: str) -> float:
+        """某一天的价格复权因子：后复权为当天的后复权因子，前复权再除以最新的后复权因子"""
+        back = 1.0
+        for operate_date, factor in events:
+            if operate_date > date:
+                break
+            back = factor
+        if adjustflag == '2' and events:
+            back /= events[-1][1]
+        return back
+
+    def query_history_k_data_plus(self, code, fields, start_date=None, end_date=None,
+                                  frequency='d', adjustflag='3') -> FakeResultSet:
+        field_list = [f.strip() for f in fields.split(',')]
+        base = 5 + self._seed(code) % 95
+        phase = self._seed(code, 'phase') % 628 / 100
+        bar_times = self._bar_times(frequency) if frequency in ('5', '15', '30', '60') else [None]
+        events = self._adjust_events(code) if adjustflag in ('1', '2') else []
+        rows = []
+        for day in pd.bdate_range(start_date, end_date or pd.Timestamp.now().normalize()):
+            ordinal = day.toordinal()
+            day_close = base * (1 + 0.3 * math.sin(ordinal / 30 + phase) + 0.02 * self._noise(code, ordinal))
+            # 复权价格 = 不复权价格 × 复权因子，成交量和成交额不复权
+            factor = self._adjust_factor(events, day.strftime('%Y-%m-%d'), adjustflag)
+            for i, bar_time in enumerate(bar_times):
+                if bar_time is None:
+                    close = day_close
+                    key = (code, ordinal)
+                else:
+                    close = day_close * (1 + 0.005 * self._noise(code, ordinal, bar_time))
+                    key = (code, ordinal, bar_time)
+                open_ = close * (1 + 0.01 * self._noise(*key, 'o'))
+                high = max(open_, close) * (1 + 0.01 * abs(self._noise(*key, 'h')))
+                low = min(open_, close) * (1 - 0.01 * abs(self._noise(*key, 'l')))
+                volume = (1000000 + self._seed(*key, 'v') % 9000000) // len(bar_times)
+                values = {
+                    'date': day.strftime('%Y-%m-%d'),
+                    'time': day.strftime('%Y%m%d') + f'{bar_time}00000' if bar_time else '',
+                    'code': code,
+                    'open': f'{open_ * factor:.4f}',
+                    'high': f'{high * factor:.4f}',
+                    'low': f'{low * factor:.4f}',
+                    'close': f'{close * factor:.4f}',
+                    'preclose': f'{close * factor:.4f}',
+                    'volume': str(volume),
+                    'amount': f'{volume * close:.4f}',
+                    'adjustflag': adjustflag,
+                    'turn': f'{volume / 1e7:.6f}',
+                    'tradestatus': '1',
+                    'pctChg': '0.000000',
+                    'isST': '0',
+                }
+                rows.append([values.get(f, '') for f in field_list])
+        return self._result(field_list, rows, code)
+
+    def query_profit_data(self, code, year=None, quarter=None) -> FakeResultSet:
+        year, quarter = int(year or 2024), int(quarter or 4)
+        stat_date = (pd.Timestamp(year=year, month=quarter * 3, day=1) + pd.offsets.MonthEnd(0))
+        pub_date = stat_date + pd.Timedelta(days=30)
+
+        def n(name):
+            return self._noise(code, year, quarter, name)
+
+        rows = [[
+            code, pub_date.strftime('%Y-%m-%d'), stat_date.strftime('%Y-%m-%d'),
+            f'{0.08 + 0.07 * n("roe"):.6f}', f'{0.15 + 0.1 * n("np"):.6f}', f'{0.3 + 0.2 * n("gp"):.6f}',
+            f'{1e9 * (1.5 + n("profit")):.2f}', f'{1.2 + n("eps"):.6f}', f'{1e10 * (2 + n("rev")):.2f}',
+            f'{1e9 * (3 + n("share")):.2f}', f'{1e9 * (2.5 + n("share")):.2f}',
+        ]]
+        return self._result(self.PROFIT_FIELDS, rows, code)
+
+    def query_growth_data(self, code, year=None, quarter=None) -> FakeResultSet:
+        year, quarter = int(year or 2024), int(quarter or 4)
+        stat_date = (pd.Timestamp(year=year, month=quarter * 3, day=1) + pd.offsets.MonthEnd(0))
+        pub_date = stat_date + pd.Timedelta(days=30)
+
+        def n(name):
+            return self._noise(code, year, quarter, name)
+
+        rows = [[
+            code, pub_date.strftime('%Y-%m-%d'), stat_date.strftime('%Y-%m-%d'),
+            f'{0.1 * n("equity"):.6f}', f'{0.1 * n("asset"):.6f}', f'{0.3 * n("ni"):.6f}',
+            f'{0.3 * n("eps"):.6f}', f'{0.3 * n("pni"):.6f}',
+        ]]
+        return self._result(self.GROWTH_FIELDS, rows, code)
+
+    def query_stock_industry(self, code='', date='') -> FakeResultSet:
+        codes = [code] if code else self._universe()
+        rows = [[
+            '2024-01-02', c, f'股票{c[-6:]}', self.INDUSTRIES[self._seed(c) % len(self.INDUSTRIES)], '证监会行业分类',
+        ] for c in codes]
+        return self._result(self.INDUSTRY_FIELDS, rows, code)
+
+    def query_dividend_data(self, code, year=None, yearType='report') -> FakeResultSet:
+        year = int(year or 2024)
+        cash = 0.1 + abs(self._noise(code, year, 'divid'))
+        operate_date = self._operate_date(code, year)
+        values = {
+            'code': code,
+            'dividPlanAnnounceDate': f'{year}-04-20',
+            'dividRegistDate': operate_date,
+            'dividOperateDate': operate_date,
+            'dividPayDate': operate_date,
+            'dividCashPsBeforeTax': f'{cash:.4f}',
+            'dividCashPsAfterTax': f'{cash * 0.9:.4f}',
+            'dividCashStock': f'10派{cash * 10:.2f}元(含税)',
+        }
+        rows = [[values.get(f, '') for f in self.DIVIDEND_FIELDS]]
+        return self._result(self.DIVIDEND_FIELDS, rows, code)
+
+    def query_adjust_factor(self, code, start_date=None, end_date=None) -> FakeResultSet:
+        events = self._adjust_events(code)
+        latest = events[-1][1] if events else 1.0
+        rows = []
+        for operate_date, back in events:
+            if (start_date and operate_date < start_date) or (end_date and operate_date > end_date):
+                continue
+            rows.append([code, operate_date, f'{back / latest:.6f}', f'{back:.6f}', f'{back:.6f}'])
+        return self._result(self.ADJUST_FACTOR_FIELDS, rows, code)
+
+    def query_stock_basic(self, code='', code_name='') -> FakeResultSet:
+        codes = [code] if code else self._universe()
+        rows = [[c, f'股票{c[-6:]}', '2000-01-04', '', '1', '1'] for c in codes]
+        return self._result(self.BASIC_FIELDS, rows, code)
+
+    def query_all_stock(self, day=None) -> FakeResultSet:
+        rows = [[c, '1', f'股票{c[-6:]}'] for c in self._universe()]
+        return self._result(['code', 'tradeStatus', 'code_name'], rows)
+
+    def query_hs300_stocks(self, date='') -> FakeResultSet:
+        rows = [['2024-01-02', c, f'股票{c[-6:]}'] for c in self._universe()[:300]]
+        return self._result(['updateDate', 'code', 'code_name'], rows)
+
+    def query_zz500_stocks(self, date='') -> FakeResultSet:
+        rows = [['2024-01-02', c, f'股票{c[-6:]}'] for c in self._universe()[300:800]]
+        return self._result(['updateDate', 'code', 'code_name'], rows)
@@ -0,0 +1,169 @@
+import hashlib
+import os
+import re
+import threading
+import zlib
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# 合成帖子标题用的词
+_TITLE_WORDS = ['业绩', '上涨', '下跌', '利好', '利空', '突破', '风险', '增持', '减持', '看好',
+                '不看好', '震荡', '调整', '创新高', '主力', '资金', '今天', '明天', '非常', '有点']
+
+_LIST_URL = re.compile(r'^/list,(\w+?)(?:_(\d+))?\.html$')
+
+
+def render_list_page(posts: List[Dict[str, str]]) -> str:
+    """
+    按股吧列表页的结构生成 HTML
+    :param posts: 帖子列表，每个帖子包括 date、title、source、href，可选 read、reply
+    """
+    rows = []
+    for post in posts:
+        rows.append(
+            '<tr class="listitem">'
+            f'<td><div class="read">{post.get("read", 0)}</div></td>'
+            f'<td><div class="reply">{post.get("reply", 0)}</div></td>'
+            f'<td><div class="title"><a href="{post["href"]}" title="{post["title"]}">{post["title"]}</a></div></td>'
+            f'<td><div class="author"><a href="//i.eastmoney.com/{post.get("uid", "1")}">{post["source"]}</a></div></td>'
+            f'<td><div class="update">{post["date"]}</div></td>'
+            '</tr>'
+        )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>股吧</title></head><body>'
+        '<div class="header"><a href="/">首页</a></div>'
+        '<table class="default_list"><thead><tr><th>阅读</th><th>评论</th><th>标题</th><th>作者</th>'
+        '<th>最后更新</th></tr></thead>'
+        f'<tbody class="listbody">{"".join(rows)}</tbody></table>'
+        '<div class="pager"><a href="#">下一页</a></div></body></html>'
+    )
+
+
+def synthetic_posts(code: str, page: int, count: int) -> List[Dict[str, str]]:
+    """按代码和页码生成确定的帖子"""
+    seed = zlib.crc32(f'{code}:{page}'.encode('utf-8'))
+    posts = []
+    for i in range(count):
+        value = (seed + i * 2654435761) & 0xffffffff
+        words = [_TITLE_WORDS[(value >> shift) % len(_TITLE_WORDS)] for shift in (0, 5, 10, 15)]
+        number = (page - 1) * count + i
+        posts.append({
+            'date': f'{(value >> 20) % 12 + 1:02d}-{(value >> 8) % 28 + 1:02d} {(value >> 4) % 24:02d}:{value % 60:02d}',
+            'title': ''.join(words) + f'（{code}第{number}帖）',
+            'source': f'股友{value % 100000}',
+            'href': f'/news,{code},{1000000000 + number}.html',
+            'read': str(value % 10000),
+            'reply': str(value % 100),
+            'uid': str(value),
+        })
+    return posts
+
+
+class FakeGuba:
+    """
+    本地股吧服务器，用于测试 NewsCrawler
+
+    - pages_dir 下有录制的页面文件（如 list,600519_2.html）时原样返回，否则生成合成页面
+    - 每只股票 pages 页，超出时返回 404
+    - 支持 ETag/Last-Modified 条件请求
+    - inject_errors 可以让之后的若干次请求返回错误状态码
+    """
+
+    def __init__(self, pages_dir: Optional[str] = None, pages: int = 5, posts_per_page: int = 80,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        :param pages_dir: 录制页面所在目录
+        :param pages: 每只股票的页数（合成页面）
+        :param posts_per_page: 每页帖子数（合成页面）
+        :param host: 监听地址
+        :param port: 监听端口，0 为随机端口
+        """
+        self.pages_dir = pages_dir
+        self.pages = pages
+        self.posts_per_page = posts_per_page
+        self.last_modified = formatdate(usegmt=True)
+        self.requests = 0
+        self.conditional_hits = 0
+        self._errors = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def inject_errors(self, status: int = 503, count: int = 1):
+        """之后的 count 次请求返回 status"""
+        with self._lock:
+            self._errors.extend([status] * count)
+
+    def page(self, path: str) -> Optional[bytes]:
+        """页面内容，不存在时返回None"""
+        if self.pages_dir is not None:
+            file_path = os.path.join(self.pages_dir, path.lstrip('/'))
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    return f.read()
+        match = _LIST_URL.match(path)
+        if match is None:
+            return None
+        code, page = match.group(1), int(match.group(2) or 1)
+        if page > self.pages:
+            return None
+        return render_list_page(synthetic_posts(code, page, self.posts_per_page)).encode('utf-8')
+
+    def _handler(self):
+        guba = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with guba._lock:
+                    guba.requests += 1
+                    error = guba._errors.pop(0) if guba._errors else None
+                if error is not None:
+                    self.send_error(error)
+                    return
+                body = guba.page(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag or \
+                        self.headers.get('If-Modified-Since') == guba.last_modified:
+                    with guba._lock:
+                        guba.conditional_hits += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', guba.last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> 'FakeGuba':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,67 @@
+import hashlib
+import re
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import SimpleChatModel
+from langchain_core.messages import BaseMessage
+
+# StockAnalysisAgent 的工具，Agent 提示词中按这个顺序逐个调用
+AGENT_TOOLS = ('get_stock_data', 'analyze_technical', 'analyze_fundamental')
+
+_QUESTION_CODE = re.compile(r'股票代码为\s*(\S+?)\s*的股票')
+_ANY_CODE = re.compile(r's[hz]\.\d{6}')
+_ACTION = re.compile(r'^Action:\s*(\w+)', re.MULTILINE)
+
+
+def fake_reply(prompt: str) -> str:
+    """
+    按提示词生成确定性的回答
+    - zero-shot-react-description 的 Agent 提示词：依次调用还没有调用过的工具，三个工具都有结果后给出 Final Answer
+    - 其他提示词（如批量点评）：直接返回点评
+    回答只由提示词决定，提示词和工具结果都相同时回答相同
+    :param prompt: 全部消息拼接后的提示词
+    :return: 回答文本
+    """
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+    if 'Action Input' not in prompt:
+        return f'模拟点评（{digest}）：技术面与基本面无明显异常，建议持有。'
+
+    # 工具说明中也有示例代码，优先取问题中的股票代码
+    match = _QUESTION_CODE.search(prompt)
+    codes = _ANY_CODE.findall(prompt)
+    code = match.group(1) if match else (codes[-1] if codes else '')
+    called = {name for name in _ACTION.findall(prompt) if name in AGENT_TOOLS}
+    for name in AGENT_TOOLS:
+        if name not in called:
+            return f'Thought: 需要调用 {name} 获取{code}的数据\nAction: {name}\nAction Input: {code}'
+    return (f'Thought: I now know the final answer\n'
+            f'Final Answer: 模拟分析报告（{digest}）：{code}的行情、技术指标和基本面已获取，短线持有，长线做多。')
+
+
+class FakeChatModel(SimpleChatModel):
+    """
+    离线的大模型替身，用于在没有 ZhipuAI 密钥的环境下测试 Agent 和回答缓存
+
+    回答由 fake_reply 按提示词确定性地生成，latency 模拟真实模型的响应时间，便于对比缓存命中与未命中的耗时。
+    用法：StockAnalysisAgent(start_date, end_date, llm=FakeChatModel(latency=1.0))，
+    或 python main.py --llm-backend fake
+    """
+
+    model_name: str = 'fake-chat'
+    temperature: float = 0.0
+    # 每次调用的模拟响应时间（秒）
+    latency: float = 0.0
+    # 调用次数
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-chat'
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+              run_manager: Optional[Any] = None, **kwargs: Any) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return fake_reply('\n'.join(str(message.content) for message in messages))
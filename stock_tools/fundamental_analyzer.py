@@ -13,23 +13,34 @@ class FundamentalAnalyzer:
         self.growth_data = growth_data
         self.industry_data = industry_data
         self.adjust_factors = adjust_factors
-    def calculate_roe(self, netProfit, equity):
+    @staticmethod
+    def calculate_roe(netProfit, equity):
         """
         计算净资产收益率
-        :param netProfit: 净利润
-        :param equity: 净资产
-        :return: 净资产收益率
+        :param netProfit: 净利润，标量或数组（多只股票）
+        :param equity: 净资产，标量或数组
+        :return: 净资产收益率，净资产不为正时为 NaN；输入为数组时返回数组
         """
-        return (netProfit / equity) * 100 if equity > 0 else np.nan
+        netProfit = np.asarray(netProfit, dtype=np.float64)
+        equity = np.asarray(equity, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(equity > 0, netProfit / equity * 100, np.nan)
+        return result if result.ndim else float(result)
     
-    def calculate_growth_rate(self, current_value, previous_value):
+    @staticmethod
+    def calculate_growth_rate(current_value, previous_value):
         """
         计算增长率
-        :param current_value: 当期值
-        :param previous_value: 上期值
-        :return: 增长率
+        :param current_value: 当期值，标量或数组（多只股票）
+        :param previous_value: 上期值，标量或数组
+        :return: 增长率，上期值为0时为 NaN；输入为数组时返回数组
         """
-        return ((current_value - previous_value) / abs(previous_value)) * 100 if previous_value != 0 else np.nan
+        current_value = np.asarray(current_value, dtype=np.float64)
+        previous_value = np.asarray(previous_value, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(previous_value != 0,
+                              (current_value - previous_value) / np.abs(previous_value) * 100, np.nan)
+        return result if result.ndim else float(result)
     
     def analyze_financial_health(self):
         """
@@ -115,4 +126,119 @@ class FundamentalAnalyzer:
             summary.append(f"最近分红（元）: {analysis['dividCashStock']}，")
             
         
-        return "".join(summary) 
\ No newline at end of file
+        return "".join(summary) 
+
+
+class CrossSectionalFundamentalAnalyzer:
+    """
+    横截面基本面分析：一次分析成千上万只股票，所有指标都按列计算，并给出行业内和全市场的排名
+    输入为多只股票的长表，如 FundamentalStore.get(...) 或 FundamentalStore.as_of(...) 的结果
+    """
+
+    # 盈利指标（来自 financial_data）
+    PROFIT_METRICS = ['roeAvg', 'npMargin', 'gpMargin', 'netProfit', 'epsTTM', 'MBRevenue']
+    # 成长指标（来自 growth_data）
+    GROWTH_METRICS = ['YOYEquity', 'YOYAsset', 'YOYNI', 'YOYEPSBasic', 'YOYPNI']
+    # 参与排名的指标，数值越大排名越靠前
+    RANK_METRICS = ['roeAvg', 'npMargin', 'gpMargin', 'epsTTM', 'YOYNI', 'YOYPNI', 'dividendPerShare',
+                    'Profit_Growth', 'Revenue_Growth']
+
+    def __init__(self, financial_data, growth_data, industry_data=None, dividend_data=None,
+                 last_year_financial_data=None):
+        """
+        :param financial_data: DataFrame，多只股票的盈利能力数据，每只股票一行
+        :param growth_data: DataFrame，多只股票的成长能力数据
+        :param industry_data: DataFrame，行业分类
+        :param dividend_data: DataFrame，分红数据，同一股票多次分红时每股分红相加
+        :param last_year_financial_data: DataFrame，上年同期（上一年同一季度）的盈利能力数据，用于计算净利润和营收的同比增长率。
+                                         季报中的净利润和营收是年初至报告期末的累计值，只能与上年同期比较
+        """
+        self.financial_data = financial_data
+        self.growth_data = growth_data
+        self.industry_data = industry_data
+        self.dividend_data = dividend_data
+        self.last_year_financial_data = last_year_financial_data
+        self.metrics = None
+
+    @staticmethod
+    def _numeric(data, columns):
+        """按代码索引，取出数值列（接口返回的是字符串，空字符串转换为 NaN）"""
+        if data is None or data.empty:
+            return pd.DataFrame(columns=columns, dtype=np.float64)
+        data = data.drop_duplicates('code', keep='last').set_index('code')
+        return data.reindex(columns=columns).apply(pd.to_numeric, errors='coerce')
+
+    def _is_last_year(self, codes):
+        """
+        上年同期数据的报告期是否正好比本期早一年（没有 statDate 列时视为是）
+        :param codes: 股票代码
+        :return: 布尔数组，与 codes 等长
+        """
+        current, last_year = self.financial_data, self.last_year_financial_data
+        if 'statDate' not in current.columns or 'statDate' not in last_year.columns:
+            return np.ones(len(codes), dtype=bool)
+        current = pd.to_datetime(current.drop_duplicates('code', keep='last').set_index('code')['statDate']
+                                 .reindex(codes), errors='coerce')
+        last_year = pd.to_datetime(last_year.drop_duplicates('code', keep='last').set_index('code')['statDate']
+                                   .reindex(codes), errors='coerce')
+        return (last_year == current - pd.DateOffset(years=1)).to_numpy()
+
+    def calculate_metrics(self):
+        """
+        计算所有股票的基本面指标
+        :return: DataFrame，行为股票代码，列为指标及 <指标>_industry_pct（行业内百分位）、
+                 <指标>_industry_rank（行业内名次，1为最好）、<指标>_market_pct（全市场百分位）
+        """
+        metrics = self._numeric(self.financial_data, self.PROFIT_METRICS).join(
+            self._numeric(self.growth_data, self.GROWTH_METRICS), how='outer')
+
+        if self.dividend_data is not None and not self.dividend_data.empty:
+            cash = pd.to_numeric(self.dividend_data['dividCashPsBeforeTax'], errors='coerce')
+            metrics['dividendPerShare'] = cash.groupby(self.dividend_data['code']).sum(min_count=1)
+        else:
+            metrics['dividendPerShare'] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics['dividendPayout'] = np.where(metrics['epsTTM'] > 0,
+                                                 metrics['dividendPerShare'] / metrics['epsTTM'], np.nan)
+
+        if self.last_year_financial_data is not None:
+            previous = self._numeric(self.last_year_financial_data, ['netProfit', 'MBRevenue']).reindex(metrics.index)
+            # 报告期不是上年同期的股票不计算增长率
+            previous.loc[~self._is_last_year(metrics.index)] = np.nan
+            metrics['Profit_Growth'] = FundamentalAnalyzer.calculate_growth_rate(
+                metrics['netProfit'].to_numpy(), previous['netProfit'].to_numpy())
+            metrics['Revenue_Growth'] = FundamentalAnalyzer.calculate_growth_rate(
+                metrics['MBRevenue'].to_numpy(), previous['MBRevenue'].to_numpy())
+
+        if self.industry_data is not None and not self.industry_data.empty:
+            industry = self.industry_data.drop_duplicates('code', keep='last').set_index('code')['industry']
+            metrics['industry'] = industry.reindex(metrics.index).replace('', np.nan).fillna('未分类')
+        else:
+            metrics['industry'] = '未分类'
+
+        rank_columns = [column for column in self.RANK_METRICS if column in metrics.columns]
+        by_industry = metrics.groupby('industry')[rank_columns]
+        industry_pct = by_industry.rank(pct=True)
+        industry_rank = by_industry.rank(ascending=False, method='min')
+        market_pct = metrics[rank_columns].rank(pct=True)
+        metrics = pd.concat([
+            metrics,
+            industry_pct.add_suffix('_industry_pct'),
+            industry_rank.add_suffix('_industry_rank'),
+            market_pct.add_suffix('_market_pct'),
+        ], axis=1)
+        self.metrics = metrics.sort_index()
+        return self.metrics
+
+    def industry_summary(self):
+        """
+        各行业的指标中位数和股票数量
+        :return: DataFrame，行为行业
+        """
+        if self.metrics is None:
+            self.calculate_metrics()
+        columns = [column for column in self.PROFIT_METRICS + self.GROWTH_METRICS + ['dividendPerShare']
+                   if column in self.metrics.columns]
+        summary = self.metrics.groupby('industry')[columns].median()
+        summary.insert(0, 'count', self.metrics.groupby('industry').size())
+        return summary
@@ -0,0 +1,304 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# 数据集 -> 发布日期列，用于时点查询
+PUBLISH_DATE_COLUMNS = {
+    'profit': 'pubDate',
+    'growth': 'pubDate',
+    'dividend': 'dividPlanAnnounceDate',
+    'industry': 'updateDate',
+}
+
+# 数据集 -> 单只股票的批量查询方法
+BULK_METHODS = {
+    'profit': 'get_financial_data_many',
+    'growth': 'get_growth_data_many',
+    'dividend': 'get_adjust_factors_many',
+}
+
+
+def latest_report_quarter(date=None) -> Tuple[int, int]:
+    """
+    截至某日，法定披露期限已过、所有公司都应已披露的最近一个报告期
+    一季报4月30日前、半年报8月31日前、三季报10月31日前、年报次年4月30日前披露
+    :param date: 日期，默认为今天
+    :return: (年份, 季度)
+    """
+    date = pd.Timestamp(date if date is not None else datetime.now())
+    if date.month >= 11:
+        return date.year, 3
+    if date.month >= 9:
+        return date.year, 2
+    if date.month >= 5:
+        return date.year, 1
+    return date.year - 1, 3
+
+
+def latest_report_year(date=None) -> int:
+    """截至某日，年报已全部披露的最近一个年份"""
+    date = pd.Timestamp(date if date is not None else datetime.now())
+    return date.year - 1 if date.month >= 5 else date.year - 2
+
+
+def is_final(dataset: str, year: int, quarter: int = 4, date=None) -> bool:
+    """
+    该报告期的数据是否已不再变化（披露期限已过）
+    未到期限的数据也会保存，但会在 refresh_after 之后重新获取
+    """
+    if dataset == 'dividend':
+        return year <= latest_report_year(date)
+    return (year, quarter) <= latest_report_quarter(date)
+
+
+class FundamentalStore:
+    """
+    本地基本面数据仓库
+
+    目录结构：root/<数据集>/<期>.pkl，每个文件是某一期全部股票的数据
+        - profit、growth：期为 <年>Q<季度>，如 2024Q4
+        - dividend：期为年份
+        - industry：期为获取日期，每次获取保存一份快照
+        - <期>.missing.json：该期获取失败或没有返回数据的股票代码，下次 load_quarter 时只重新获取这些股票
+    数据按期批量获取一次，之后的查询（按代码+报告期，或按日期的时点查询）都不访问网络。
+    有缺失股票的期不会被视为已不再变化。
+    """
+
+    def __init__(self, root: str, refresh_after: float = 86400):
+        """
+        :param root: 存储根目录
+        :param refresh_after: 尚未过披露期限的数据，超过该时间（秒）后重新获取
+        """
+        self.root = root
+        self.refresh_after = refresh_after
+        self._frames = {}  # (数据集, 期) -> DataFrame
+        self._history = {}  # 数据集 -> 所有期合并并排序后的 DataFrame，用于时点查询
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def period(dataset: str, year: int, quarter: int = 4) -> str:
+        return str(year) if dataset == 'dividend' else f'{year}Q{quarter}'
+
+    def _path(self, dataset: str, period: str) -> str:
+        return os.path.join(self.root, dataset, f'{period}.pkl')
+
+    def periods(self, dataset: str) -> List[str]:
+        """已保存的期，按时间排序"""
+        directory = os.path.join(self.root, dataset)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.pkl'))
+
+    def has(self, dataset: str, year: int, quarter: int = 4) -> bool:
+        return os.path.exists(self._path(dataset, self.period(dataset, year, quarter)))
+
+    def _missing_path(self, dataset: str, period: str) -> str:
+        return os.path.join(self.root, dataset, f'{period}.missing.json')
+
+    def missing(self, dataset: str, year: int, quarter: int = 4) -> List[str]:
+        """该期获取失败或没有返回数据的股票代码"""
+        path = self._missing_path(dataset, self.period(dataset, year, quarter))
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _is_stale(self, dataset: str, year: int, quarter: int) -> bool:
+        """已保存的数据是否过期，需要全部重新获取"""
+        saved = os.path.getmtime(self._path(dataset, self.period(dataset, year, quarter)))
+        # 披露期限之后保存的数据不会再变化
+        if is_final(dataset, year, quarter) and saved >= self._final_time(dataset, year, quarter):
+            return False
+        return time.time() - saved > self.refresh_after
+
+    def _needs_refresh(self, dataset: str, year: int, quarter: int) -> bool:
+        path = self._path(dataset, self.period(dataset, year, quarter))
+        if not os.path.exists(path) or self.missing(dataset, year, quarter):
+            return True
+        # 旧版本保存的空文件（全部获取失败）同样需要重新获取
+        data = self._read(dataset, self.period(dataset, year, quarter))
+        return data is None or data.empty or self._is_stale(dataset, year, quarter)
+
+    @staticmethod
+    def _final_time(dataset: str, year: int, quarter: int) -> float:
+        """披露期限之后的时间戳，在此之后保存的文件不会再更新"""
+        if dataset == 'dividend':
+            deadline = pd.Timestamp(year=year + 1, month=5, day=1)
+        else:
+            deadline = {
+                1: pd.Timestamp(year=year, month=5, day=1),
+                2: pd.Timestamp(year=year, month=9, day=1),
+                3: pd.Timestamp(year=year, month=11, day=1),
+                4: pd.Timestamp(year=year + 1, month=5, day=1),
+            }[quarter]
+        return deadline.timestamp()
+
+    def _save(self, dataset: str, period: str, data: pd.DataFrame, missing: Iterable[str] = ()):
+        path = self._path(dataset, period)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写缺失列表再写数据：中断时最多多重新获取一次，不会把缺失的期当作完整的
+        missing_path = self._missing_path(dataset, period)
+        missing = sorted(missing)
+        if missing:
+            with open(missing_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(missing, f)
+            os.replace(missing_path + '.tmp', missing_path)
+        # 先写临时文件再替换，避免读到写了一半的文件
+        tmp_path = path + '.tmp'
+        data.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        if not missing and os.path.exists(missing_path):
+            os.remove(missing_path)
+        with self._lock:
+            self._frames[(dataset, period)] = data
+            self._history.pop(dataset, None)
+
+    def load_quarter(self, fetcher, year: int, quarter: int, codes: Optional[Iterable[str]] = None,
+                     datasets: Iterable[str] = ('profit', 'growth'), max_workers: int = 8,
+                     refresh: bool = False):
+        """
+        批量获取某一报告期全部股票的数据并保存，已保存且不再变化的数据不会重新获取
+        接口失败和没有数据都返回空表，两者无法区分，都记为缺失；已保存的数据未过期时只重新获取缺失的股票
+        :param fetcher: StockDataFetcher
+        :param year: 年份
+        :param quarter: 季度
+        :param codes: 股票代码列表，默认为全部A股
+        :param datasets: 要获取的数据集，profit、growth、dividend（dividend 按年，忽略季度）
+        :param max_workers: 最大并发会话数
+        :param refresh: 是否强制重新获取
+        """
+        datasets = [d for d in datasets if refresh or self._needs_refresh(d, year, quarter)]
+        if not datasets:
+            return
+        all_codes = None if codes is None else list(codes)
+        for dataset in datasets:
+            period = self.period(dataset, year, quarter)
+            existing = None if refresh else self._read(dataset, period)
+            if existing is not None and not existing.empty and not self._is_stale(dataset, year, quarter):
+                # 只补齐上次缺失的股票
+                fetch_codes = self.missing(dataset, year, quarter)
+            else:
+                existing = None
+                if all_codes is None:
+                    all_codes = fetcher.get_index_stocks('all')['code'].tolist()
+                fetch_codes = all_codes
+            kwargs = {'year': year} if dataset == 'dividend' else {'year': year, 'quarter': quarter}
+            results = getattr(fetcher, BULK_METHODS[dataset])(fetch_codes, max_workers=max_workers, refresh=True,
+                                                              **kwargs)
+            frames, missing = [], []
+            for code, data in results:
+                if data.empty:
+                    missing.append(code)
+                else:
+                    frames.append(data)
+            if existing is not None:
+                refetched = set(fetch_codes)
+                frames.insert(0, existing[~existing['code'].isin(refetched)])
+            data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+            if not data.empty:
+                data = data.sort_values('code', kind='stable').reset_index(drop=True)
+            self._save(dataset, period, data, missing)
+
+    def load_industry(self, fetcher, refresh: bool = False):
+        """
+        获取全部股票的最新行业分类并保存，refresh_after 之内不会重新获取
+        :param fetcher: StockDataFetcher
+        :param refresh: 是否强制重新获取
+        """
+        periods = self.periods('industry')
+        if periods and not refresh:
+            path = self._path('industry', periods[-1])
+            if time.time() - os.path.getmtime(path) <= self.refresh_after:
+                return
+        data = fetcher.get_industry_classification()
+        if data.empty:
+            return
+        self._save('industry', datetime.now().strftime('%Y-%m-%d'), data)
+
+    def _read(self, dataset: str, period: str) -> Optional[pd.DataFrame]:
+        key = (dataset, period)
+        with self._lock:
+            if key in self._frames:
+                return self._frames[key]
+        path = self._path(dataset, period)
+        if not os.path.exists(path):
+            return None
+        data = pd.read_pickle(path)
+        with self._lock:
+            self._frames[key] = data
+        return data
+
+    def get(self, dataset: str, year: int, quarter: int = 4) -> Optional[pd.DataFrame]:
+        """
+        某一期全部股票的数据
+        :return: DataFrame，没有保存该期数据时返回None
+        """
+        return self._read(dataset, self.period(dataset, year, quarter))
+
+    def lookup(self, dataset: str, code: str, year: int, quarter: int = 4) -> Optional[pd.DataFrame]:
+        """
+        按 (代码, 报告期) 查询
+        :return: DataFrame，没有保存该期数据或该期数据中没有该股票时返回None，调用方应改为从接口获取
+        """
+        data = self.get(dataset, year, quarter)
+        if data is None or data.empty:
+            return None
+        # 数据按代码排序保存，二分查找
+        codes = data['code']
+        lo = codes.searchsorted(code, side='left')
+        hi = codes.searchsorted(code, side='right')
+        if lo == hi:
+            return None
+        return data.iloc[lo:hi].reset_index(drop=True)
+
+    def _all_periods(self, dataset: str) -> pd.DataFrame:
+        """所有期的数据合并，按 (代码, 发布日期) 排序"""
+        with self._lock:
+            if dataset in self._history:
+                return self._history[dataset]
+        frames = [self._read(dataset, period) for period in self.periods(dataset)]
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            history = pd.DataFrame()
+        else:
+            history = pd.concat(frames, ignore_index=True)
+            history = history.sort_values(['code', PUBLISH_DATE_COLUMNS[dataset]], kind='stable')
+            history = history.reset_index(drop=True)
+        with self._lock:
+            self._history[dataset] = history
+        return history
+
+    def as_of(self, dataset: str, date, codes: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        时点查询：每只股票在 date 当天或之前已发布的最新一条数据，不会用到当时还未发布的数据
+        :param dataset: profit、growth、dividend 或 industry
+        :param date: 日期
+        :param codes: 股票代码列表，默认为全部
+        :return: DataFrame，每只股票一行
+        """
+        history = self._all_periods(dataset)
+        if history.empty:
+            return history
+        date = pd.Timestamp(date).strftime('%Y-%m-%d')
+        column = PUBLISH_DATE_COLUMNS[dataset]
+        # 发布日期为 YYYY-MM-DD 字符串，可以直接按字符串比较；缺失发布日期的行不参与
+        published = history[(history[column] != '') & (history[column] <= date)]
+        if codes is not None:
+            published = published[published['code'].isin(list(codes))]
+        return published.groupby('code', sort=True).tail(1).reset_index(drop=True)
+
+    def as_of_code(self, dataset: str, code: str, date) -> pd.DataFrame:
+        """单只股票的时点查询，没有数据时返回空表"""
+        return self.as_of(dataset, date, [code])
+
+    def fundamentals_as_of(self, code: str, date) -> Dict[str, pd.DataFrame]:
+        """
+        单只股票在某一天可以看到的全部基本面数据，可直接用于构造 FundamentalAnalyzer：
+        FundamentalAnalyzer(data['profit'], data['growth'], data['industry'], data['dividend'])
+        """
+        return {dataset: self.as_of_code(dataset, code, date) for dataset in PUBLISH_DATE_COLUMNS}
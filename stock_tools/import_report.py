@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, Optional
+
+# 子系统 -> 入口模块
+SUBSYSTEMS = {
+    '命令行': 'main',
+    '数据获取': 'stock_tools.data_fetcher',
+    '技术分析': 'stock_tools.technical_analyzer',
+    '基本面分析': 'stock_tools.fundamental_analyzer',
+    '批量分析': 'stock_tools.batch_runner',
+    '舆情分析': 'stock_tools.sentiment_analyzer',
+    '股吧爬虫': 'aiohttp',
+    '大模型': 'langchain_community.chat_models',
+}
+
+# 首次使用时的初始化（不是导入，但同样计入启动时间）：名称 -> (准备代码, 初始化代码)
+FIRST_USE = {
+    '分词词典加载': ('from stock_tools.sentiment_analyzer import init_jieba', 'init_jieba()'),
+}
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    """在新的解释器中执行代码，已导入的模块不会影响结果"""
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', code]
+    return subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+
+
+def measure_import(module: str, top: int = 5) -> Dict:
+    """
+    测量导入一个模块的耗时
+    :param module: 模块名
+    :param top: 列出耗时最多的几个顶层包
+    :return: dict，包括 module、ms（导入耗时）、packages（顶层包 -> 累计耗时ms）；导入失败时包括 error
+    """
+    result = _run(f'import {module}', importtime=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {'module': module, 'error': lines[-1] if lines else f'退出码 {result.returncode}'}
+    total = 0.0
+    packages = {}
+    for line in result.stderr.splitlines():
+        # 格式：import time: 自身耗时(us) | 累计耗时(us) | 模块名（缩进表示层级）
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(parts[1])
+        except ValueError:
+            continue
+        name = parts[2].strip()
+        if name == module:
+            total = cumulative / 1000
+        elif '.' not in name and name != module.split('.')[0]:
+            packages[name] = max(packages.get(name, 0.0), cumulative / 1000)
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {'module': module, 'ms': round(total, 1), 'packages': {name: round(ms, 1) for name, ms in heaviest}}
+
+
+def measure_first_use(setup: str, code: str) -> Dict:
+    """
+    测量首次使用时初始化的耗时
+    :param setup: 准备代码（如导入），耗时不计入
+    :param code: 初始化代码
+    :return: dict，包括 code、ms；执行失败时包括 error
+    """
+    timed = (f'import time\n{setup}\nstart = time.perf_counter()\n{code}\n'
+             f'print((time.perf_counter() - start) * 1000)')
+    result = _run(timed)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return {'code': code, 'error': lines[-1] if lines else f'退出码 {result.returncode}'}
+    return {'code': code, 'ms': round(float(result.stdout.strip().splitlines()[-1]), 1)}
+
+
+def import_report(top: int = 5) -> Dict[str, Dict]:
+    """
+    各子系统的导入耗时和首次使用的初始化耗时
+    :param top: 每个子系统列出耗时最多的几个顶层包
+    :return: dict，名称 -> 测量结果
+    """
+    report = {name: measure_import(module, top) for name, module in SUBSYSTEMS.items()}
+    report.update({name: measure_first_use(setup, code) for name, (setup, code) in FIRST_USE.items()})
+    return report
+
+
+def format_report(report: Dict[str, Dict]) -> str:
+    """格式化为文本表格"""
+    lines = ['导入耗时报告：']
+    for name, item in report.items():
+        if 'error' in item:
+            lines.append(f"  {name:<8} 失败：{item['error']}")
+            continue
+        line = f"  {name:<8} {item['ms']:>8.1f}ms"
+        if item.get('packages'):
+            line += '  ' + ', '.join(f'{package} {ms:.0f}ms' for package, ms in item['packages'].items())
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def write_report(report: Dict[str, Dict], path: Optional[str] = None) -> str:
+    """
+    打印报告，指定 path 时把报告追加为 JSONL 的一行，便于跟踪启动时间的变化
+    :return: 文本报告
+    """
+    text = format_report(report)
+    print(text)
+    if path:
+        with open(path, 'a', encoding='utf-8') as f:
+            record = {'time': datetime.now().isoformat(timespec='seconds'), 'python': sys.version.split()[0],
+                      'report': report}
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return text
@@ -0,0 +1,442 @@
+"""
+基于 NumPy 的技术指标计算核心
+
+所有函数沿第0维（时间）计算，输入可以是一维数组（单只股票），也可以是 (日期 × 股票) 的二维数组，
+一次计算所有股票。默认参数与 talib 对应函数一致，输出与 talib 对齐：前 lookback 个值为 NaN。
+
+缺失值（上市前、停牌）用 NaN 表示：滑动窗口内含 NaN 的位置输出 NaN；
+递推类指标（EMA、Wilder 平滑）在 NaN 之后重新以窗口均值作为初值。
+
+prefix_sums、price_changes、typical_price、directional_movement、volume_prefix_sums 给出与周期无关的中间结果，
+同一份中间结果可以计算多个周期的 MA、RSI、CCI、DMI、VR（参数扫描时使用），结果与直接调用相同。
+"""
+import functools
+
+import numpy as np
+
+# 与 talib 中 TA_IS_ZERO 的判断一致
+_EPSILON = 1e-8
+
+# CCI 的平均偏差小于均值的这个比例时视为横盘：滑动求和有舍入误差，横盘时算出的均值与价格并不完全相等，
+# 偏差和价格与均值之差都是接近0的噪声，talib 逐窗口求和没有这个问题，此时输出0
+FLAT_TOLERANCE = 1e-8
+
+# 分块计算时每块的目标大小（元素个数），使中间结果留在CPU缓存中
+_BLOCK_ELEMENTS = 1 << 17
+
+
+def _panel(func):
+    """
+    装饰器：把一维输入转换为 (T, 1) 的二维数组计算，输出再还原为一维
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        one_dim = False
+        converted = []
+        for arg in args:
+            if isinstance(arg, (np.ndarray, list, tuple)):
+                arg = np.asarray(arg, dtype=np.float64)
+                if arg.ndim == 1:
+                    one_dim = True
+                    arg = arg[:, None]
+            converted.append(arg)
+        result = func(*converted, **kwargs)
+        if not one_dim:
+            return result
+        if isinstance(result, tuple):
+            return tuple(r[:, 0] for r in result)
+        return result[:, 0]
+
+    return wrapper
+
+
+def _shift(x: np.ndarray, periods: int = 1) -> np.ndarray:
+    """沿时间向后平移，空出的位置填 NaN"""
+    out = np.empty_like(x)
+    out[:periods] = np.nan
+    out[periods:] = x[:-periods]
+    return out
+
+
+def prefix_sums(x: np.ndarray):
+    """
+    沿时间的前缀和，以及缺失值个数的前缀和（没有缺失值时为 None）
+    不同窗口长度的滑动求和可以共用同一个前缀和，见 window_sum
+    :param x: 二维数组 (日期 × 股票)
+    :return: (前缀和, 缺失值个数的前缀和)
+    """
+    missing = np.isnan(x)
+    if not missing.any():
+        return np.cumsum(x, axis=0), None
+    return np.cumsum(np.where(missing, 0.0, x), axis=0), np.cumsum(missing, axis=0)
+
+
+def window_sum(prefix, window: int) -> np.ndarray:
+    """
+    由 prefix_sums 的结果计算滑动窗口求和，窗口内有 NaN 时输出 NaN
+    :param prefix: prefix_sums 的结果
+    :param window: 窗口长度
+    """
+    total, count = prefix
+    out = np.empty_like(total)
+    out[:window - 1] = np.nan
+    if len(total) < window:
+        return out
+    out[window - 1] = total[window - 1]
+    np.subtract(total[window:], total[:-window], out=out[window:])
+    if count is not None:
+        missing_in_window = count[window - 1:].copy()
+        missing_in_window[1:] -= count[:-window]
+        out[window - 1:][missing_in_window > 0] = np.nan
+    return out
+
+
+def _rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    return window_sum(prefix_sums(x), window)
+
+
+@_panel
+def rolling_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """
+    滑动窗口求和，窗口内有 NaN 时输出 NaN
+    :param x: 一维或二维数组
+    :param window: 窗口长度
+    """
+    return _rolling_sum(x, window)
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = _rolling_sum(x, window)
+    out /= window
+    return out
+
+
+def _row_blocks(x: np.ndarray, start: int):
+    """从第 start 行起按时间分块，每块大小约为 _BLOCK_ELEMENTS，使块内的多次运算命中CPU缓存"""
+    rows = max(1, _BLOCK_ELEMENTS // max(1, x[0].size))
+    for block_start in range(start, len(x), rows):
+        yield block_start, min(len(x), block_start + rows)
+
+
+def _rolling_extreme(x: np.ndarray, window: int, func) -> np.ndarray:
+    """滑动窗口最大/最小值，func 为 np.maximum 或 np.minimum，遇到 NaN 时结果为 NaN"""
+    out = np.full_like(x, np.nan)
+    for start, stop in _row_blocks(x, window - 1):
+        block = out[start:stop]
+        block[:] = x[start:stop]
+        for k in range(1, window):
+            func(block, x[start - k:stop - k], out=block)
+    return out
+
+
+@_panel
+def rolling_max(x: np.ndarray, window: int) -> np.ndarray:
+    """滑动窗口最大值，窗口内有 NaN 时输出 NaN"""
+    return _rolling_extreme(x, window, np.maximum)
+
+
+@_panel
+def rolling_min(x: np.ndarray, window: int) -> np.ndarray:
+    """滑动窗口最小值，窗口内有 NaN 时输出 NaN"""
+    return _rolling_extreme(x, window, np.minimum)
+
+
+def _recursive(values: np.ndarray, window: int, step, scale: float = None,
+               seed_mask: np.ndarray = None) -> np.ndarray:
+    """
+    通用递推：state[t] = step(state[t-1], t)
+    某列状态为 NaN（尚未开始或刚经过缺失值）时，以 values 最近 window 个值之和乘以 scale 作为初值，
+    scale 默认为 1/window，即窗口均值。循环只在时间维上进行，每一步同时更新所有股票。
+    :param seed_mask: 为 False 的位置不设初值
+    """
+    scale = 1.0 / window if scale is None else scale
+    out = np.empty_like(values)
+    state = np.full(values.shape[1:], np.nan)
+    for t in range(len(values)):
+        if t > 0:
+            state = step(state, t)
+        if t >= window - 1:
+            missing = np.flatnonzero(np.isnan(state))
+            if len(missing):
+                seed = values[t - window + 1:t + 1, missing].sum(axis=0) * scale
+                if seed_mask is not None:
+                    seed[~seed_mask[t, missing]] = np.nan
+                state[missing] = seed
+        out[t] = state
+    return out
+
+
+@_panel
+def sma(x: np.ndarray, timeperiod: int = 30) -> np.ndarray:
+    """简单移动平均，对应 talib.MA(matype=0)"""
+    return _rolling_mean(x, timeperiod)
+
+
+def _ema(x: np.ndarray, timeperiod: int, seed_mask: np.ndarray = None) -> np.ndarray:
+    k = 2.0 / (timeperiod + 1)
+    return _recursive(x, timeperiod, lambda prev, t: prev + k * (x[t] - prev), seed_mask=seed_mask)
+
+
+@_panel
+def ema(x: np.ndarray, timeperiod: int = 30) -> np.ndarray:
+    """指数移动平均，以前 timeperiod 个值的简单平均为初值，对应 talib.EMA"""
+    return _ema(x, timeperiod)
+
+
+@_panel
+def macd(x: np.ndarray, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+    """
+    MACD，对应 talib.MACD
+    与 talib 一致，快线 EMA 与慢线 EMA 在同一位置开始：快线以该位置前 fastperiod 个值的均值为初值
+    :return: (macd, signal, hist)
+    """
+    slow = _ema(x, slowperiod)
+    fast = _ema(x, fastperiod, seed_mask=~np.isnan(slow))
+    macd_line = fast - slow
+    signal = _ema(macd_line, signalperiod)
+    macd_line[np.isnan(signal)] = np.nan
+    return macd_line, signal, macd_line - signal
+
+
+def price_changes(x: np.ndarray):
+    """
+    每天的上涨幅度和下跌幅度（均为非负数），不同周期的 RSI 可以共用
+    :param x: 二维数组 (日期 × 股票)
+    :return: (gain, loss)
+    """
+    diff = x - _shift(x)
+    return np.maximum(diff, 0.0), np.maximum(-diff, 0.0)
+
+
+def rsi_from_changes(gain: np.ndarray, loss: np.ndarray, timeperiod: int = 14) -> np.ndarray:
+    """由 price_changes 的结果计算 RSI"""
+    n = timeperiod
+    avg_gain = _recursive(gain, n, lambda prev, t: (prev * (n - 1) + gain[t]) / n)
+    avg_loss = _recursive(loss, n, lambda prev, t: (prev * (n - 1) + loss[t]) / n)
+    total = avg_gain + avg_loss
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.multiply(avg_gain, 100.0 / total)
+    out[np.abs(total) < _EPSILON] = 0.0
+    return out
+
+
+@_panel
+def rsi(x: np.ndarray, timeperiod: int = 14) -> np.ndarray:
+    """相对强弱指标，Wilder 平滑，对应 talib.RSI"""
+    return rsi_from_changes(*price_changes(x), timeperiod)
+
+
+@_panel
+def bbands(x: np.ndarray, timeperiod: int = 5, nbdevup: float = 2.0, nbdevdn: float = 2.0):
+    """
+    布林带，总体标准差，对应 talib.BBANDS(matype=0)
+    :return: (upper, middle, lower)
+    """
+    middle = _rolling_mean(x, timeperiod)
+    variance = _rolling_mean(x * x, timeperiod)
+    variance -= middle * middle
+    std = np.sqrt(np.maximum(variance, 0.0, out=variance), out=variance)
+    return middle + nbdevup * std, middle, middle - nbdevdn * std
+
+
+def _range_position(high: np.ndarray, low: np.ndarray, close: np.ndarray, timeperiod: int,
+                    scale: float, from_high: bool) -> np.ndarray:
+    """收盘价在最近 timeperiod 根K线高低区间中的位置，区间为0时输出0（与 talib 一致）"""
+    highest = _rolling_extreme(high, timeperiod, np.maximum)
+    lowest = _rolling_extreme(low, timeperiod, np.minimum)
+    diff = highest - lowest
+    numerator = highest - close if from_high else close - lowest
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.multiply(numerator, scale / diff)
+    out[diff == 0] = 0.0
+    return out
+
+
+@_panel
+def stoch(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+          fastk_period: int = 5, slowk_period: int = 3, slowd_period: int = 3):
+    """
+    随机指标，慢速K、D均为简单平均，对应 talib.STOCH 默认参数
+    :return: (slowk, slowd)
+    """
+    fastk = _range_position(high, low, close, fastk_period, 100.0, from_high=False)
+    slowk = _rolling_mean(fastk, slowk_period)
+    slowd = _rolling_mean(slowk, slowd_period)
+    slowk[np.isnan(slowd)] = np.nan
+    return slowk, slowd
+
+
+def typical_price(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """典型价格 (最高 + 最低 + 收盘) / 3，不同周期的 CCI 可以共用"""
+    typical = high + low
+    typical += close
+    typical /= 3.0
+    return typical
+
+
+def cci_from_typical(typical: np.ndarray, timeperiod: int = 14, prefix=None) -> np.ndarray:
+    """
+    由典型价格计算 CCI
+    :param typical: typical_price 的结果
+    :param timeperiod: 周期
+    :param prefix: 典型价格的 prefix_sums，计算多个周期时传入以共用
+    """
+    average = window_sum(prefix if prefix is not None else prefix_sums(typical), timeperiod)
+    average /= timeperiod
+
+    # 平均绝对偏差要用当期均值逐个计算，按时间分块使中间结果留在缓存中
+    deviation = np.full_like(typical, np.nan)
+    for start, stop in _row_blocks(typical, timeperiod - 1):
+        block_average = average[start:stop]
+        block = np.zeros_like(block_average)
+        buffer = np.empty_like(block_average)
+        for k in range(timeperiod):
+            np.subtract(typical[start - k:stop - k], block_average, out=buffer)
+            np.abs(buffer, out=buffer)
+            block += buffer
+        deviation[start:stop] = block
+
+    delta = typical - average
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.multiply(delta, timeperiod / 0.015 / deviation)
+    out[(delta == 0) | (deviation <= FLAT_TOLERANCE * timeperiod * np.abs(average))] = 0.0
+    return out
+
+
+@_panel
+def cci(high: np.ndarray, low: np.ndarray, close: np.ndarray, timeperiod: int = 14) -> np.ndarray:
+    """顺势指标，对应 talib.CCI"""
+    return cci_from_typical(typical_price(high, low, close), timeperiod)
+
+
+def directional_movement(high: np.ndarray, low: np.ndarray, close: np.ndarray):
+    """
+    未经平滑的 +DM、-DM、真实波幅（TR），不同周期的 DMI 可以共用
+    :param high: 二维数组 (日期 × 股票)
+    :return: (plus_dm, minus_dm, true_range)，第一行和缺失值的相邻位置为 NaN
+    """
+    up = high - _shift(high)
+    down = _shift(low) - low
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    prev_close = _shift(close)
+    true_range = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+    missing = np.isnan(up) | np.isnan(down) | np.isnan(prev_close)
+    plus_dm[missing] = np.nan
+    minus_dm[missing] = np.nan
+    true_range[missing] = np.nan
+    return plus_dm, minus_dm, true_range
+
+
+def _wilder_sum(values: np.ndarray, timeperiod: int) -> np.ndarray:
+    """
+    Wilder 平滑，供 DMI/ADX 使用
+    初值为前 timeperiod-1 根K线之和，之后 S = S - S/n + 当期值
+    """
+    n = timeperiod
+    decay = (n - 1) / n
+    smoothed = _recursive(values, n - 1, lambda prev, t: prev * decay + values[t], scale=1.0)
+    # 初值位置只是累加和，还没有经过一次平滑，与 talib 一样不输出
+    smoothed[np.isnan(_shift(smoothed))] = np.nan
+    return smoothed
+
+
+def _directional_index(dm: np.ndarray, tr: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.multiply(dm, 100.0 / tr)
+    out[np.abs(tr) < _EPSILON] = 0.0
+    return out
+
+
+def dmi_from_movement(plus_dm: np.ndarray, minus_dm: np.ndarray, true_range: np.ndarray,
+                      timeperiod: int = 14):
+    """
+    由 directional_movement 的结果计算 DMI
+    :return: (plus_di, minus_di, adx)
+    """
+    true_range = _wilder_sum(true_range, timeperiod)
+    plus_di = _directional_index(_wilder_sum(plus_dm, timeperiod), true_range)
+    minus_di = _directional_index(_wilder_sum(minus_dm, timeperiod), true_range)
+    total = plus_di + minus_di
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dx = np.abs(plus_di - minus_di)
+        dx *= 100.0 / total
+    dx[np.abs(total) < _EPSILON] = 0.0
+    n = timeperiod
+    adx = _recursive(dx, n, lambda prev, t: (prev * (n - 1) + dx[t]) / n)
+    return plus_di, minus_di, adx
+
+
+@_panel
+def dmi(high: np.ndarray, low: np.ndarray, close: np.ndarray, timeperiod: int = 14):
+    """
+    动向指标，对应 talib.PLUS_DI、talib.MINUS_DI、talib.ADX
+    :return: (plus_di, minus_di, adx)
+    """
+    return dmi_from_movement(*directional_movement(high, low, close), timeperiod)
+
+
+@_panel
+def obv(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """能量潮，首个有效值为当日成交量，对应 talib.OBV"""
+    valid = ~np.isnan(close)
+    direction = np.sign(close - _shift(close))
+    direction[valid & (np.cumsum(valid, axis=0) == 1)] = 1.0
+    contribution = direction * volume
+    out = np.cumsum(np.where(np.isnan(contribution), 0.0, contribution), axis=0)
+    out[~valid] = np.nan
+    return out
+
+
+def volume_prefix_sums(close: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    上涨日成交量、下跌日成交量、缺失标记的前缀和，不同窗口的 VR 可以共用
+    第一根K线视为平盘；收盘价、成交量或前一天收盘价为 NaN 的K线记为缺失
+    :return: 数组 (日期数 + 1, 3, 股票数)，第0行为0
+    """
+    rows = len(close)
+    # 三者放在同一个缓冲区里，一次 cumsum 得到三者的前缀和
+    sums = np.zeros((rows + 1, 3) + close.shape[1:])
+    diff = sums[2:, 2]
+    np.subtract(close[1:], close[:-1], out=diff)
+    missing = np.isnan(sums[1:, 2]) | np.isnan(volume)
+    np.copyto(sums[1:, 0], volume, where=(sums[1:, 2] > 0) & ~missing)
+    np.copyto(sums[1:, 1], volume, where=(sums[1:, 2] < 0) & ~missing)
+    sums[1:, 2] = missing
+    np.cumsum(sums, axis=0, out=sums)
+    return sums
+
+
+def vr_from_prefix(sums: np.ndarray, window: int = 26) -> np.ndarray:
+    """由 volume_prefix_sums 的结果计算 VR"""
+    rows = len(sums) - 1
+    out = np.full((rows,) + sums.shape[2:], np.nan)
+    if rows < window:
+        return out
+    up = out[window - 1:]
+    np.subtract(sums[window:, 0], sums[:-window, 0], out=up)
+    down = sums[window:, 1] - sums[:-window, 1]
+    valid = down > 0
+    np.divide(up, down, out=up, where=valid)
+    up *= 100
+    np.subtract(sums[window:, 2], sums[:-window, 2], out=down)
+    up[~valid | (down > 0)] = np.nan
+    return out
+
+
+@_panel
+def vr(close: np.ndarray, volume: np.ndarray, window: int = 26) -> np.ndarray:
+    """
+    成交量比率：窗口内上涨日成交量之和 / 下跌日成交量之和 * 100
+    第一根K线视为平盘；窗口内有缺失的K线（收盘价、成交量或前一天收盘价为 NaN）时输出 NaN；
+    窗口内没有下跌日（分母为0）时输出 NaN
+    """
+    if len(close) < window:
+        return np.full(close.shape, np.nan)
+    return vr_from_prefix(volume_prefix_sums(close, volume), window)
+
+
+@_panel
+def willr(high: np.ndarray, low: np.ndarray, close: np.ndarray, timeperiod: int = 14) -> np.ndarray:
+    """威廉指标，对应 talib.WILLR"""
+    return _range_position(high, low, close, timeperiod, -100.0, from_high=True)
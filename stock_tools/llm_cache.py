@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Iterable, Optional
+
+import pandas as pd
+
+
+def digest_observations(observations: Iterable) -> str:
+    """
+    计算工具结果的内容摘要，数据没有变化时摘要不变
+    :param observations: 工具结果列表，DataFrame 按内容计算，其他对象按字符串计算
+    :return: 十六进制摘要
+    """
+    h = hashlib.sha256()
+    for observation in observations:
+        if isinstance(observation, pd.DataFrame):
+            h.update(','.join(map(str, observation.columns)).encode('utf-8'))
+            h.update(pd.util.hash_pandas_object(observation, index=True).values.tobytes())
+        else:
+            h.update(str(observation).encode('utf-8'))
+        # 分隔符，避免相邻结果拼接后产生歧义
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+class LLMCache:
+    """
+    大模型回答缓存，保存在本地 SQLite 文件中
+    - 按 模型、温度、提示词、工具结果摘要 计算缓存键，任一项变化都不会命中
+    - 缓存总大小超过 max_bytes 时淘汰最久未使用的回答
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024):
+        """
+        :param path: SQLite 文件路径
+        :param max_bytes: 缓存回答的总大小上限（字节）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, '
+                'created REAL, accessed REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+
+    def _connect(self):
+        # 每次操作单独连接，可以在多个线程中使用
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    @staticmethod
+    def make_key(model: str, temperature: Optional[float], prompt: str, observations_digest: str = '') -> str:
+        """
+        计算缓存键
+        :param model: 模型名称
+        :param temperature: 温度
+        :param prompt: 提示词
+        :param observations_digest: 工具结果摘要，见 digest_observations
+        """
+        payload = json.dumps([model, temperature, prompt, observations_digest], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        读取缓存
+        :return: 缓存的回答，不存在时返回None
+        """
+        with self._lock, self._connect() as conn:
+            row = conn.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = ''):
+        """
+        写入缓存，超过大小上限时淘汰最久未使用的回答
+        """
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (key, model, response, size, created, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, response, size, now, now)
+            )
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evict = []
+            rows = conn.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+            for old_key, old_size in rows:
+                if total <= self.max_bytes:
+                    break
+                evict.append((old_key,))
+                total -= old_size
+            conn.executemany('DELETE FROM responses WHERE key = ?', evict)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock, self._connect() as conn:
+            conn.execute('DELETE FROM responses')
@@ -0,0 +1,353 @@
+import asyncio
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    # 只用于类型注解，运行时在 crawl 中才导入
+    import aiohttp
+
+# 东方财富股吧
+GUBA_URL = 'http://guba.eastmoney.com'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 可以稍后重试的 HTTP 状态码
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+
+NEWS_COLUMNS = ['date', 'title', 'source', 'url']
+
+
+def normalize_code(code: str) -> str:
+    """去掉股票代码的 sh./sz. 前缀"""
+    return code.replace('sh.', '').replace('sz.', '')
+
+
+def list_page_url(base_url: str, code: str, page: int = 1) -> str:
+    """股吧帖子列表页地址，第一页为 list,<代码>.html，之后为 list,<代码>_<页码>.html"""
+    if page <= 1:
+        return f'{base_url}/list,{code}.html'
+    return f'{base_url}/list,{code}_{page}.html'
+
+
+def parse_post_list_soup(html: str, base_url: str = GUBA_URL) -> List[Dict[str, str]]:
+    """
+    使用 BeautifulSoup 解析股吧帖子列表页（原实现，较慢，用于对照）
+    :param html: 页面内容
+    :param base_url: 帖子链接的前缀
+    :return: 帖子列表，每个帖子包括 date、title、source、url
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    posts = []
+    for post in soup.select('tbody.listbody tr.listitem'):
+        try:
+            link = post.select_one('.title a')
+            posts.append({
+                'date': post.select_one('.update').text,
+                'title': link.text,
+                'source': post.select_one('.author a').text,
+                'url': f"{base_url}{link['href']}",
+            })
+        except (AttributeError, TypeError, KeyError):
+            continue
+    return posts
+
+
+# 没有结束标签的元素
+_VOID_ELEMENTS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+                            'param', 'source', 'track', 'wbr'])
+
+_LISTBODY_START = re.compile(r'<tbody\b[^>]*\bclass\s*=\s*["\']?[^"\'>]*\blistbody\b', re.IGNORECASE)
+
+
+class _PostListParser(HTMLParser):
+    """
+    流式解析股吧帖子列表页，不构建文档树，直接把每个帖子的字段追加到列中
+    提取规则与 parse_post_list_soup 相同：tbody.listbody 中的每个 tr.listitem，
+    取第一个 .update 的文本、第一个 .title 下第一个链接、第一个 .author 下第一个链接，缺少任一项的行跳过
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.columns = {column: [] for column in NEWS_COLUMNS}
+        self._listbody = 0  # 所在的 tbody.listbody 层数
+        self._stack = None  # 当前帖子行内未闭合的元素，不在帖子行内时为None
+        self._row = None  # 当前帖子行的字段
+        self._capture = None  # (字段, 开始收集文本时的层数)
+        self._text = []
+        self._containers = {}  # 字段 -> 所在 .title/.author 元素的层数，链接在这些元素内时提取
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'tbody':
+            if self._listbody or 'listbody' in classes:
+                self._listbody += 1
+            return
+        if self._stack is None:
+            if tag == 'tr' and self._listbody and 'listitem' in classes:
+                self._stack = []
+                self._row = {}
+                self._containers = {}
+            return
+        if tag in _VOID_ELEMENTS:
+            return
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if self._capture is not None:
+            return
+        if 'update' in classes and 'date' not in self._row:
+            self._start_capture('date', depth)
+            return
+        if tag == 'a':
+            for field in ('title', 'source'):
+                if field in self._containers and field not in self._row:
+                    if field == 'title':
+                        self._row['href'] = attrs.get('href')
+                    self._start_capture(field, depth)
+                    return
+        if 'title' in classes and 'title' not in self._containers:
+            self._containers['title'] = depth
+        if 'author' in classes and 'source' not in self._containers:
+            self._containers['source'] = depth
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> 等自闭合写法：开始后立即结束，<br/> 等本身没有结束标签的元素不入栈
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if self._stack is None:
+            if tag == 'tbody' and self._listbody:
+                self._listbody -= 1
+            return
+        if tag == 'tr' and 'tr' not in self._stack:
+            self._finish_row()
+            return
+        if tag not in self._stack:
+            return
+        # 弹出到匹配的开始标签，未闭合的元素一并关闭
+        while self._stack:
+            if self._stack.pop() == tag:
+                break
+        depth = len(self._stack)
+        if self._capture is not None and depth < self._capture[1]:
+            field = self._capture[0]
+            self._row[field] = ''.join(self._text)
+            self._capture = None
+        for field, container_depth in list(self._containers.items()):
+            if depth < container_depth and field not in self._row:
+                # 该 .title/.author 元素中没有链接，继续查找后面的同类元素
+                del self._containers[field]
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+
+    def _start_capture(self, field: str, depth: int):
+        self._capture = (field, depth)
+        self._text = []
+
+    def _finish_row(self):
+        row = self._row
+        self._stack = None
+        self._row = None
+        self._capture = None
+        if 'date' in row and 'title' in row and 'source' in row and row.get('href') is not None:
+            self.columns['date'].append(row['date'])
+            self.columns['title'].append(row['title'])
+            self.columns['source'].append(row['source'])
+            self.columns['url'].append(f"{self.base_url}{row['href']}")
+
+    def close(self):
+        super().close()
+        # 页面在帖子行内截断时，已收集完整的帖子仍然保留
+        if self._stack is not None:
+            if self._capture is not None:
+                self._row[self._capture[0]] = ''.join(self._text)
+            self._finish_row()
+
+
+def parse_post_columns(html: str, base_url: str = GUBA_URL) -> Dict[str, List[str]]:
+    """
+    流式解析股吧帖子列表页
+    :param html: 页面内容
+    :param base_url: 帖子链接的前缀
+    :return: dict，列名（date、title、source、url） -> 值列表
+    """
+    parser = _PostListParser(base_url)
+    # 第一个 tbody.listbody 之前的页头、脚本等与帖子无关，跳过不解析
+    match = _LISTBODY_START.search(html)
+    parser.feed(html[match.start():] if match else html)
+    parser.close()
+    return parser.columns
+
+
+class _HostThrottle:
+    """同一主机的两次请求之间至少间隔 delay 秒（加少量随机抖动）"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            wait_time = self._next_time - now
+            self._next_time = max(now, self._next_time) + self.delay * random.uniform(0.8, 1.2)
+        if wait_time > 0:
+            await asyncio.sleep(wait_time)
+
+
+class NewsCrawler:
+    """
+    异步股吧爬虫，并发获取多只股票的帖子列表
+
+    - 所有请求共用一个连接池，总并发数和每个主机的并发数都有上限
+    - 同一主机的请求之间有礼貌间隔
+    - 每只股票按页获取，直到达到页数上限或某页没有帖子
+    - 记录每个页面的 ETag/Last-Modified，再次获取时发送条件请求，未修改（304）时使用上次的解析结果
+    - 超时、连接错误和 429/5xx 按指数退避重试
+    """
+
+    def __init__(self, base_url: str = GUBA_URL, pages: int = 1, concurrency: int = 32,
+                 per_host: int = 4, delay: float = 0.2, timeout: float = 10.0,
+                 max_retries: int = 3, backoff: float = 1.0, headers: Optional[Dict[str, str]] = None):
+        """
+        :param base_url: 股吧地址，测试时可以指向本地服务器
+        :param pages: 每只股票默认获取的页数
+        :param concurrency: 总并发连接数
+        :param per_host: 每个主机的并发连接数
+        :param delay: 同一主机两次请求之间的间隔（秒）
+        :param timeout: 建立连接、读取数据的超时（秒）
+        :param max_retries: 最大重试次数
+        :param backoff: 第一次重试前的等待时间（秒），之后每次翻倍
+        :param headers: 请求头，默认模拟浏览器
+        """
+        self.base_url = base_url.rstrip('/')
+        self.pages = pages
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.delay = delay
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.headers = headers or DEFAULT_HEADERS
+        self._validators = {}  # url -> (ETag, Last-Modified, 解析结果)
+        self._throttles = {}  # 主机 -> _HostThrottle
+        self.requests = 0
+        self.not_modified = 0
+        self.retries = 0
+
+    def _throttle(self, url: str) -> _HostThrottle:
+        host = urlsplit(url).netloc
+        if host not in self._throttles:
+            self._throttles[host] = _HostThrottle(self.delay)
+        return self._throttles[host]
+
+    async def _fetch_page(self, session: 'aiohttp.ClientSession', url: str) -> Optional[Dict[str, List[str]]]:
+        """
+        获取并解析一个列表页
+        :return: 帖子的各列（见 parse_post_columns），页面不存在时各列为空，多次重试仍失败时返回None
+        """
+        import aiohttp
+
+        cached = self._validators.get(url)
+        headers = {}
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+
+        for attempt in range(self.max_retries + 1):
+            await self._throttle(url).wait()
+            self.requests += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        self.not_modified += 1
+                        return cached[2]
+                    if response.status == 404:
+                        return {column: [] for column in NEWS_COLUMNS}
+                    if response.status == 200:
+                        html = await response.text(encoding='utf-8', errors='replace')
+                        columns = parse_post_columns(html, self.base_url)
+                        etag = response.headers.get('ETag')
+                        last_modified = response.headers.get('Last-Modified')
+                        if etag or last_modified:
+                            self._validators[url] = (etag, last_modified, columns)
+                        return columns
+                    error = f'HTTP {response.status}'
+                    if response.status not in RETRYABLE_STATUS:
+                        break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+            if attempt < self.max_retries:
+                self.retries += 1
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        print(f"获取股吧页面失败：{url}，{error}")
+        return None
+
+    async def _crawl_code(self, session: 'aiohttp.ClientSession', code: str, pages: int) -> pd.DataFrame:
+        """按页获取一只股票的帖子，去掉翻页时新帖子导致的重复"""
+        frames = []
+        for page in range(1, pages + 1):
+            columns = await self._fetch_page(session, list_page_url(self.base_url, code, page))
+            if not columns or not columns['url']:
+                break
+            frames.append(pd.DataFrame(columns, columns=NEWS_COLUMNS))
+        if not frames:
+            return pd.DataFrame(columns=NEWS_COLUMNS)
+        data = pd.concat(frames, ignore_index=True)
+        return data.drop_duplicates('url').reset_index(drop=True)
+
+    async def crawl(self, codes: Iterable[str], pages: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        并发获取多只股票的帖子
+        :param codes: 股票代码列表（如：600519，带 sh./sz. 前缀时自动去掉）
+        :param pages: 每只股票获取的页数，默认为 self.pages
+        :return: dict，股票代码 -> DataFrame（date、title、source、url），获取失败时为空表
+        """
+        # aiohttp 只在实际抓取时导入，避免拖慢不需要舆情数据的命令的启动
+        import aiohttp
+
+        pages = pages or self.pages
+        codes = list(dict.fromkeys(normalize_code(code) for code in codes))
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        # 超时不包括在连接池中排队等待的时间
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            results = await asyncio.gather(*(self._crawl_code(session, code, pages) for code in codes))
+        return dict(zip(codes, results))
+
+    def fetch(self, codes: Iterable[str], pages: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        crawl 的同步版本
+        当前线程已有正在运行的事件循环时（Jupyter、异步的 Agent 等），在工作线程中用新的事件循环抓取，
+        调用期间会阻塞当前事件循环；异步代码中应直接 await crawl()
+        """
+        # 每次调用使用新的事件循环，节流器与事件循环绑定，需要重新创建
+        self._throttles = {}
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.crawl(codes, pages))
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, self.crawl(codes, pages)).result()
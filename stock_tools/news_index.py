@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+# 情感倾向 -> 统计表中的列
+SENTIMENT_COLUMNS = {'正面': 'positive', '中性': 'neutral', '负面': 'negative'}
+
+# SQLite 单条语句的参数个数上限较小，按批查询
+_BATCH = 500
+
+
+def content_hash(title: str, source: str = '') -> str:
+    """帖子内容摘要：标题或作者变化时视为帖子被编辑（列表页的更新时间随回复变化，不参与计算）"""
+    return hashlib.sha1(f'{title}\x00{source}'.encode('utf-8')).hexdigest()
+
+
+class NewsIndex:
+    """
+    帖子索引，保存在本地 SQLite 文件中
+
+    - posts：按帖子链接索引，记录内容摘要、首次发现时间和情感分析结果
+    - buckets、bucket_keywords：按股票和时间桶（首次发现时间）累计帖子数、得分之和、情感分布和关键词次数
+    每次刷新只分析新出现或内容有变化的帖子，并把变化量累加到对应的时间桶；
+    滚动窗口的统计只需要合并窗口内的时间桶，不需要重新读取帖子。
+    """
+
+    def __init__(self, path: str, bucket_seconds: int = 3600):
+        """
+        :param path: SQLite 文件路径
+        :param bucket_seconds: 时间桶长度（秒），滚动窗口的起点按时间桶对齐
+        """
+        self.path = path
+        self.bucket_seconds = bucket_seconds
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS posts ('
+                'url TEXT PRIMARY KEY, code TEXT, title TEXT, source TEXT, date TEXT, hash TEXT, '
+                'score REAL, sentiment TEXT, key_words TEXT, first_seen REAL, updated REAL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS posts_code_first_seen ON posts (code, first_seen)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'code TEXT, bucket INTEGER, count INTEGER, score_sum REAL, '
+                'positive INTEGER, neutral INTEGER, negative INTEGER, PRIMARY KEY (code, bucket))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS bucket_keywords ('
+                'code TEXT, bucket INTEGER, word TEXT, count INTEGER, PRIMARY KEY (code, bucket, word))'
+            )
+
+    def _connect(self):
+        # 每次操作单独连接，可以在多个线程中使用
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def bucket(self, timestamp: float) -> int:
+        """时间戳所在时间桶的起点"""
+        return int(timestamp // self.bucket_seconds * self.bucket_seconds)
+
+    def ingest(self, code: str, news: pd.DataFrame,
+               analyze: Callable[[List[str]], List[Dict]], now: Optional[float] = None) -> List[Dict]:
+        """
+        写入一次抓取的结果，只分析新帖子和内容有变化的帖子
+        :param code: 股票代码
+        :param news: 帖子，包括 date、title、source、url 列
+        :param analyze: 批量情感分析函数，标题列表 -> 结果列表，见 SentimentAnalyzer.analyze_sentiment_batch
+        :param now: 当前时间戳，默认为现在
+        :return: 本次分析的帖子的结果（在 analyze 的结果上增加 url、title、new）
+        """
+        if news is None or news.empty:
+            return []
+        now = time.time() if now is None else now
+        news = news.drop_duplicates('url')
+        urls = news['url'].tolist()
+        titles = news['title'].tolist()
+        sources = news['source'].tolist()
+        dates = news['date'].tolist()
+        hashes = [content_hash(title, source) for title, source in zip(titles, sources)]
+
+        with self._lock, self._connect() as conn:
+            existing = {}
+            for start in range(0, len(urls), _BATCH):
+                batch = urls[start:start + _BATCH]
+                rows = conn.execute(
+                    f'SELECT url, hash, first_seen, score, sentiment, key_words FROM posts '
+                    f'WHERE url IN ({",".join("?" * len(batch))})', batch
+                ).fetchall()
+                existing.update((row[0], row[1:]) for row in rows)
+
+            changed = [i for i, (url, h) in enumerate(zip(urls, hashes))
+                       if url not in existing or existing[url][0] != h]
+            if not changed:
+                return []
+            results = analyze([titles[i] for i in changed])
+
+            counts = defaultdict(lambda: [0, 0.0, 0, 0, 0])  # 时间桶 -> [帖子数, 得分之和, 正面, 中性, 负面]
+            keywords = defaultdict(int)  # (时间桶, 关键词) -> 次数
+            posts = []
+            processed = []
+            for i, result in zip(changed, results):
+                old = existing.get(urls[i])
+                if old is not None:
+                    # 编辑过的帖子：从原时间桶中减去原来的结果
+                    first_seen = old[1]
+                    self._accumulate(counts, keywords, self.bucket(first_seen), old[2], old[3],
+                                     json.loads(old[4]), -1)
+                else:
+                    first_seen = now
+                key_words = sorted(set(result['key_words']))
+                self._accumulate(counts, keywords, self.bucket(first_seen), result['score'],
+                                 result['sentiment'], key_words, 1)
+                posts.append((urls[i], code, titles[i], sources[i], dates[i], hashes[i], result['score'],
+                              result['sentiment'], json.dumps(key_words, ensure_ascii=False), first_seen, now))
+                processed.append(dict(result, url=urls[i], title=titles[i], new=old is None))
+
+            conn.execute('BEGIN')
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO posts (url, code, title, source, date, hash, score, sentiment, '
+                    'key_words, first_seen, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', posts
+                )
+                conn.executemany(
+                    'INSERT INTO buckets (code, bucket, count, score_sum, positive, neutral, negative) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (code, bucket) DO UPDATE SET '
+                    'count = count + excluded.count, score_sum = score_sum + excluded.score_sum, '
+                    'positive = positive + excluded.positive, neutral = neutral + excluded.neutral, '
+                    'negative = negative + excluded.negative',
+                    [(code, bucket, *values) for bucket, values in counts.items()]
+                )
+                conn.executemany(
+                    'INSERT INTO bucket_keywords (code, bucket, word, count) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT (code, bucket, word) DO UPDATE SET count = count + excluded.count',
+                    [(code, bucket, word, count) for (bucket, word), count in keywords.items() if count]
+                )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        return processed
+
+    @staticmethod
+    def _accumulate(counts, keywords, bucket: int, score: float, sentiment: str, key_words, sign: int):
+        values = counts[bucket]
+        values[0] += sign
+        values[1] += sign * score
+        values[2 + list(SENTIMENT_COLUMNS).index(sentiment)] += sign
+        for word in key_words:
+            keywords[(bucket, word)] += sign
+
+    def summary(self, code: str, window: float = 86400, now: Optional[float] = None, top: int = 10) -> Dict:
+        """
+        滚动窗口内的统计（按帖子首次发现时间）
+        :param code: 股票代码
+        :param window: 窗口长度（秒），起点向前对齐到时间桶
+        :param now: 当前时间戳，默认为现在
+        :param top: 热门关键词数量
+        :return: dict，包括 post_count、average_score（没有帖子时为None）、sentiment_distribution、top_keywords
+        """
+        now = time.time() if now is None else now
+        since = self.bucket(now - window)
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT COALESCE(SUM(count), 0), COALESCE(SUM(score_sum), 0), COALESCE(SUM(positive), 0), '
+                'COALESCE(SUM(neutral), 0), COALESCE(SUM(negative), 0) '
+                'FROM buckets WHERE code = ? AND bucket >= ?', (code, since)
+            ).fetchone()
+            words = conn.execute(
+                'SELECT word, SUM(count) AS total FROM bucket_keywords WHERE code = ? AND bucket >= ? '
+                'GROUP BY word HAVING total > 0 ORDER BY total DESC, word LIMIT ?', (code, since, top)
+            ).fetchall()
+        count, score_sum = row[0], row[1]
+        distribution = {sentiment: value for sentiment, value in zip(SENTIMENT_COLUMNS, row[2:]) if value}
+        return {
+            'post_count': count,
+            'average_score': score_sum / count if count else None,
+            'sentiment_distribution': distribution,
+            'top_keywords': dict(words),
+        }
+
+    def prune(self, before: float):
+        """
+        删除 before 之前的时间桶和帖子
+        删除的帖子如果再次出现在列表页中，会被当作新帖子重新统计，before 应早于最长的统计窗口
+        """
+        bucket = self.bucket(before)
+        with self._lock, self._connect() as conn:
+            conn.execute('BEGIN')
+            conn.execute('DELETE FROM buckets WHERE bucket < ?', (bucket,))
+            conn.execute('DELETE FROM bucket_keywords WHERE bucket < ?', (bucket,))
+            conn.execute('DELETE FROM posts WHERE first_seen < ?', (bucket,))
+            conn.execute('COMMIT')
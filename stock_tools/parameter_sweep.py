@@ -0,0 +1,377 @@
+"""
+技术指标周期的参数扫描
+
+对多组指标周期（网格或随机抽样）回测信号规则，按股票和行业汇总回测指标。
+与周期无关的中间结果在所有参数组合之间共用：收盘价前缀和（所有 MA 周期）、涨跌幅（所有 RSI 周期）、
+典型价格（所有 CCI 周期）、+DM/-DM/真实波幅（所有 DMI 周期）、上涨/下跌日成交量前缀和（所有 VR 窗口），
+每个 (规则, 周期) 的信号状态也只计算一次。股票按列分块交给多个进程，行情数据放在共享内存中，不在进程间复制。
+"""
+import itertools
+import os
+import random
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from stock_tools import indicators
+from stock_tools.backtester import SignalBacktester
+from stock_tools.signals import (CCI_BOUNDS, RSI_BOUNDS, VR_BOUNDS, WILLR_BOUNDS, dmi_state, threshold_state,
+                                 trend_state)
+
+# 默认扫描范围：TechnicalAnalyzer 中使用的周期（RSI 另加信号规则使用的14）
+DEFAULT_SPACE = {
+    'ma_short': (5, 10),
+    'ma_long': (20, 60),
+    'rsi': (6, 12, 14, 24),
+    'cci': (14,),
+    'dmi': (14,),
+    'willr': (14,),
+    'vr': (26,),
+}
+
+# 规则 -> (计算方法, 用到的参数)
+RULES = {
+    'MA': ('_rule_ma', ('ma_short', 'ma_long')),
+    'RSI': ('_rule_rsi', ('rsi',)),
+    'CCI': ('_rule_cci', ('cci',)),
+    'DMI': ('_rule_dmi', ('dmi',)),
+    'WILLR': ('_rule_willr', ('willr',)),
+    'VR': ('_rule_vr', ('vr',)),
+}
+
+# 可扫描的策略：单条规则，或各规则投票的组合策略
+STRATEGIES = tuple(RULES) + ('COMBINED',)
+
+# 每只股票的回测指标，见 SignalBacktester._stats
+METRICS = ('total_return', 'annual_return', 'max_drawdown', 'turnover', 'trades', 'exposure')
+
+
+class SharedIntermediates:
+    """
+    一组股票的中间结果，按需计算并缓存，供所有参数组合共用
+    信号状态按 (规则, 周期) 缓存为 int8 数组，指标值本身用完即释放
+    """
+
+    def __init__(self, high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray):
+        """
+        :param high: 最高价，(日期 × 股票) 二维数组
+        :param low: 最低价
+        :param close: 收盘价
+        :param volume: 成交量
+        """
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self._shared = {}
+        self._states = {}
+
+    def shared(self, name: str):
+        """与周期无关的中间结果"""
+        if name not in self._shared:
+            if name == 'close_prefix':
+                self._shared[name] = indicators.prefix_sums(self.close)
+            elif name == 'changes':
+                self._shared[name] = indicators.price_changes(self.close)
+            elif name == 'typical':
+                typical = indicators.typical_price(self.high, self.low, self.close)
+                self._shared[name] = (typical, indicators.prefix_sums(typical))
+            elif name == 'movement':
+                self._shared[name] = indicators.directional_movement(self.high, self.low, self.close)
+            elif name == 'volume_prefix':
+                self._shared[name] = indicators.volume_prefix_sums(self.close, self.volume)
+            else:
+                raise ValueError(f"未知的中间结果: {name}")
+        return self._shared[name]
+
+    def state(self, rule: str, params: tuple) -> np.ndarray:
+        """
+        一条规则在给定周期下的状态
+        :param rule: 规则名，见 RULES
+        :param params: 周期，顺序与 RULES 中的参数一致
+        :return: int8 数组 (日期 × 股票)
+        """
+        key = (rule, params)
+        if key not in self._states:
+            self._states[key] = getattr(self, RULES[rule][0])(*params)
+        return self._states[key]
+
+    def ma(self, period: int) -> np.ndarray:
+        out = indicators.window_sum(self.shared('close_prefix'), period)
+        out /= period
+        return out
+
+    def _rule_ma(self, short: int, long: int) -> np.ndarray:
+        return trend_state(self.ma(short), self.ma(long))
+
+    def _rule_rsi(self, period: int) -> np.ndarray:
+        return threshold_state(indicators.rsi_from_changes(*self.shared('changes'), period), RSI_BOUNDS)
+
+    def _rule_cci(self, period: int) -> np.ndarray:
+        typical, prefix = self.shared('typical')
+        return threshold_state(indicators.cci_from_typical(typical, period, prefix=prefix), CCI_BOUNDS)
+
+    def _rule_dmi(self, period: int) -> np.ndarray:
+        return dmi_state(*indicators.dmi_from_movement(*self.shared('movement'), period))
+
+    def _rule_willr(self, period: int) -> np.ndarray:
+        return threshold_state(indicators.willr(self.high, self.low, self.close, period), WILLR_BOUNDS)
+
+    def _rule_vr(self, window: int) -> np.ndarray:
+        return threshold_state(indicators.vr_from_prefix(self.shared('volume_prefix'), window), VR_BOUNDS)
+
+    def strategy_state(self, strategy: str, combination: Mapping[str, int]) -> np.ndarray:
+        """策略在一个参数组合下的状态；组合策略按各规则投票，多数看多为 1、多数看空为 -1"""
+        if strategy != 'COMBINED':
+            return self.state(strategy, tuple(combination[name] for name in RULES[strategy][1]))
+        votes = sum(self.state(rule, tuple(combination[name] for name in params)).astype(np.int16)
+                    for rule, (_, params) in RULES.items())
+        return np.sign(votes)
+
+
+def evaluate_combinations(open, high, low, close, volume, strategy: str, combinations: Sequence[Mapping],
+                          backtest_kwargs: Optional[Dict] = None, batch_size: int = 8,
+                          intermediates: Optional[SharedIntermediates] = None) -> np.ndarray:
+    """
+    在一组股票上回测多个参数组合（可在计算进程中执行）
+    :param open: 开盘价，(日期 × 股票) 二维数组，其余价格和成交量相同
+    :param strategy: 策略名，见 STRATEGIES
+    :param combinations: 参数组合列表，每个为 参数名 -> 周期
+    :param backtest_kwargs: SignalBacktester 的成交和成本参数
+    :param batch_size: 每次一起执行的组合数，多个组合沿列拼接后共用一次逐日递推
+    :param intermediates: 中间结果，默认在这组股票上新建
+    :return: 数组 (组合数, 股票数, len(METRICS))
+    """
+    backtester = SignalBacktester(open, high, low, close, volume, **(backtest_kwargs or {}))
+    market = backtester._market(slice(None))
+    if intermediates is None:
+        intermediates = SharedIntermediates(market['high'], market['low'], market['close'], market['volume'])
+    width = market['close'].shape[1]
+    result = np.empty((len(combinations), width, len(METRICS)))
+    for start in range(0, len(combinations), batch_size):
+        batch = combinations[start:start + batch_size]
+        states = [intermediates.strategy_state(strategy, combination) for combination in batch]
+        held, net = backtester._simulate(np.concatenate(states, axis=1), market)
+        stats = backtester._stats(held, net, market['listed'])
+        result[start:start + len(batch)] = stats[list(METRICS)].to_numpy().reshape(len(batch), width, -1)
+    return result
+
+
+# 工作进程中映射到共享内存的行情数据 (5, 日期, 股票)：开盘、最高、最低、收盘、成交量
+_worker_memory = None
+_worker_panel = None
+
+
+def _init_worker(name: str, shape: tuple):
+    global _worker_memory, _worker_panel
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_panel = np.ndarray(shape, dtype=np.float64, buffer=_worker_memory.buf)
+
+
+def _worker_evaluate(start: int, stop: int, strategy: str, combinations, backtest_kwargs, batch_size):
+    return evaluate_combinations(*(_worker_panel[i, :, start:stop] for i in range(5)), strategy, combinations,
+                                 backtest_kwargs, batch_size)
+
+
+def group_column(group) -> str:
+    """ParameterSweep.scores 中分组得分的列名"""
+    return f'group:{group}'
+
+
+class ParameterSweep:
+    """
+    指标周期的参数扫描（网格或随机抽样），按 SignalBacktester 的成交规则回测
+
+    用法：
+        sweep = ParameterSweep.from_frame(data, groups=industry, strategy='RSI')
+        scores = sweep.run(sweep.grid({'rsi': range(4, 31)}))
+    """
+
+    def __init__(self, open, high, low, close, volume, symbols=None, groups=None, strategy: str = 'COMBINED',
+                 workers: Optional[int] = None, chunk_size: int = 500, batch_size: int = 8, **backtest_kwargs):
+        """
+        :param open: 开盘价，(日期 × 股票) 二维数组，缺失为 NaN
+        :param high: 最高价
+        :param low: 最低价
+        :param close: 收盘价
+        :param volume: 成交量
+        :param symbols: 股票代码，长度等于列数
+        :param groups: 每只股票的分组（如行业），与列一一对应的数组，或 股票代码 -> 分组 的映射
+        :param strategy: 策略名，见 STRATEGIES
+        :param workers: 进程数，默认为CPU核数；为1时在当前进程中计算
+        :param chunk_size: 每个任务的股票数
+        :param batch_size: 每次一起执行的参数组合数
+        :param backtest_kwargs: SignalBacktester 的成交和成本参数（commission、stamp_duty、slippage、limit）
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"不支持的策略: {strategy}")
+        self.panel = np.stack([np.asarray(x, dtype=np.float64) for x in (open, high, low, close, volume)])
+        if self.panel.ndim != 3:
+            raise ValueError("面板数据必须是 (日期 × 股票) 的二维数组")
+        columns = self.panel.shape[2]
+        self.symbols = np.asarray(symbols) if symbols is not None else np.arange(columns)
+        if groups is None:
+            self.groups = None
+        elif isinstance(groups, (Mapping, pd.Series)):
+            self.groups = np.array([groups.get(symbol) for symbol in self.symbols], dtype=object)
+        else:
+            self.groups = np.asarray(groups, dtype=object)
+        self.strategy = strategy
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.backtest_kwargs = backtest_kwargs
+        self.combinations = []
+        # 回测结果：(组合数, 股票数, len(METRICS))
+        self.stats = None
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, **kwargs):
+        """
+        由多只股票的长表构造
+        :param data: DataFrame，包含 date、code、open、high、low、close、volume 列
+        :param kwargs: 其他参数，见 __init__
+        """
+        panel = data.pivot_table(index='date', columns='code',
+                                 values=['open', 'high', 'low', 'close', 'volume'], aggfunc='last')
+        panel = panel.sort_index()
+        return cls(
+            panel['open'].to_numpy(),
+            panel['high'].to_numpy(),
+            panel['low'].to_numpy(),
+            panel['close'].to_numpy(),
+            panel['volume'].to_numpy(),
+            symbols=panel['close'].columns.to_numpy(),
+            **kwargs
+        )
+
+    @property
+    def parameters(self) -> tuple:
+        """当前策略用到的参数"""
+        rules = RULES if self.strategy == 'COMBINED' else {self.strategy: RULES[self.strategy]}
+        return tuple(name for _, params in rules.values() for name in params)
+
+    def _space(self, space: Optional[Mapping[str, Iterable[int]]]) -> Dict[str, List[int]]:
+        """扫描范围：未指定的参数取 DEFAULT_SPACE，只保留当前策略用到的参数"""
+        space = dict(DEFAULT_SPACE, **(space or {}))
+        return {name: [int(value) for value in space[name]] for name in self.parameters}
+
+    @staticmethod
+    def _valid(combination: Mapping[str, int]) -> bool:
+        if any(value < 2 for value in combination.values()):
+            return False
+        return combination.get('ma_short', 0) < combination.get('ma_long', 1)
+
+    def grid(self, space: Optional[Mapping[str, Iterable[int]]] = None) -> List[Dict[str, int]]:
+        """
+        网格：所有参数取值的组合
+        :param space: 参数名 -> 取值列表，见 DEFAULT_SPACE
+        """
+        space = self._space(space)
+        combinations = (dict(zip(space, values)) for values in itertools.product(*space.values()))
+        return [combination for combination in combinations if self._valid(combination)]
+
+    def sample(self, space: Optional[Mapping[str, Iterable[int]]] = None, count: int = 50,
+               seed: Optional[int] = None) -> List[Dict[str, int]]:
+        """
+        随机搜索：每个参数独立随机取值，不重复，最多 count 个组合
+        :param space: 参数名 -> 取值列表，见 DEFAULT_SPACE
+        :param count: 组合数
+        :param seed: 随机种子
+        """
+        space = self._space(space)
+        rng = random.Random(seed)
+        sampled = {}
+        for _ in range(count * 20):
+            if len(sampled) >= count:
+                break
+            combination = {name: rng.choice(values) for name, values in space.items()}
+            if self._valid(combination):
+                sampled.setdefault(tuple(combination.values()), combination)
+        return list(sampled.values())
+
+    def run(self, combinations: Optional[Iterable[Mapping[str, int]]] = None,
+            metric: str = 'annual_return') -> pd.DataFrame:
+        """
+        回测所有参数组合
+        :param combinations: 参数组合列表，默认为 DEFAULT_SPACE 的网格；缺少的参数取 DEFAULT_SPACE 的第一个值
+        :param metric: 汇总的回测指标，见 METRICS
+        :return: 见 scores
+        """
+        if combinations is None:
+            combinations = self.grid()
+        defaults = {name: values[0] for name, values in DEFAULT_SPACE.items()}
+        unique = {}
+        for combination in combinations:
+            combination = {name: int(dict(defaults, **combination)[name]) for name in self.parameters}
+            if self._valid(combination):
+                unique.setdefault(tuple(combination.values()), combination)
+        self.combinations = list(unique.values())
+        if not self.combinations:
+            raise ValueError("没有有效的参数组合")
+
+        columns = self.panel.shape[2]
+        chunks = [(start, min(start + self.chunk_size, columns)) for start in range(0, columns, self.chunk_size)]
+        workers = min(self.workers or os.cpu_count() or 1, len(chunks))
+        if workers == 1:
+            results = [evaluate_combinations(*(self.panel[i, :, start:stop] for i in range(5)), self.strategy,
+                                             self.combinations, self.backtest_kwargs, self.batch_size)
+                       for start, stop in chunks]
+        else:
+            results = self._run_parallel(chunks, workers)
+        self.stats = np.concatenate(results, axis=1)
+        return self.scores(metric)
+
+    def _run_parallel(self, chunks, workers: int) -> List[np.ndarray]:
+        """行情数据复制到共享内存一次，各进程按股票分块计算"""
+        memory = shared_memory.SharedMemory(create=True, size=self.panel.nbytes)
+        try:
+            shared = np.ndarray(self.panel.shape, dtype=np.float64, buffer=memory.buf)
+            shared[:] = self.panel
+            del shared
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(memory.name, self.panel.shape)) as pool:
+                futures = [pool.submit(_worker_evaluate, start, stop, self.strategy, self.combinations,
+                                       self.backtest_kwargs, self.batch_size) for start, stop in chunks]
+                return [future.result() for future in futures]
+        finally:
+            memory.close()
+            memory.unlink()
+
+    def scores(self, metric: str = 'annual_return') -> pd.DataFrame:
+        """
+        按回测指标汇总 run 的结果
+        :param metric: 回测指标，见 METRICS
+        :return: DataFrame，每行一个参数组合：参数列、score（所有股票的平均值）、
+                 每个分组一列 group:<分组名>（组内股票的平均值，加前缀避免与参数列和 score 重名），
+                 按 score 从大到小排列
+        """
+        if self.stats is None:
+            raise ValueError("请先调用 run")
+        if metric not in METRICS:
+            raise ValueError(f"不支持的回测指标: {metric}")
+        values = self.stats[:, :, METRICS.index(metric)]
+        frame = pd.DataFrame(self.combinations)
+        # 全部为 NaN 的分组（如没有上市的股票）平均值为 NaN
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            frame['score'] = np.nanmean(values, axis=1)
+            if self.groups is not None:
+                for group in pd.unique(self.groups[pd.notna(self.groups)]):
+                    frame[group_column(group)] = np.nanmean(values[:, self.groups == group], axis=1)
+        return frame.sort_values('score', ascending=False, kind='stable').reset_index(drop=True)
+
+    def best(self, metric: str = 'annual_return', group=None) -> Dict[str, int]:
+        """
+        得分最高的参数组合
+        :param metric: 回测指标，见 METRICS（越大越好，如 max_drawdown 越接近0越好）
+        :param group: 分组名，默认按所有股票
+        """
+        scores = self.scores(metric)
+        column = 'score' if group is None else group_column(group)
+        row = scores.loc[scores[column].idxmax()]
+        return {name: int(row[name]) for name in self.parameters}
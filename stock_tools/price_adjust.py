@@ -0,0 +1,54 @@
+"""
+本地复权
+
+本地只保存不复权K线和每只股票完整的复权因子历史（query_adjust_factor 的后复权因子），
+前复权、后复权价格都在本地计算，不再按复权类型分别从接口下载：
+    - 后复权价格 = 不复权价格 × 当天的后复权因子
+    - 前复权价格 = 不复权价格 × 当天的后复权因子 / 最新的后复权因子
+第一个除权除息日之前的后复权因子为 1。后复权因子本身就是各次除权比例的累乘，
+因此每根K线只需要一次二分查找定位除权区间和一次乘法，分钟线按日期列查找。
+"""
+from typing import Dict, Mapping
+
+import numpy as np
+
+# 需要复权的价格列，成交量和成交额不复权
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'preclose')
+
+
+def bar_factors(dates: np.ndarray, factor_dates: np.ndarray, back: np.ndarray,
+                adjustflag: str) -> np.ndarray:
+    """
+    每根K线的价格复权因子
+    :param dates: K线日期，datetime64[D]
+    :param factor_dates: 除权除息日，升序
+    :param back: 每个除权除息日起生效的后复权因子
+    :param adjustflag: 1 后复权、2 前复权、3 不复权
+    :return: float64 数组，与 dates 等长
+    """
+    if adjustflag == '3' or len(back) == 0:
+        return np.ones(len(dates))
+    # 第 i 个除权除息日之前（不含当天）为第 i 段，第 0 段的因子为 1
+    table = np.concatenate([[1.0], np.asarray(back, dtype=np.float64)])
+    if adjustflag == '2':
+        table /= table[-1]
+    return table[np.searchsorted(factor_dates, dates, 'right')]
+
+
+def adjust_columns(columns: Mapping[str, np.ndarray], factor_dates: np.ndarray, back: np.ndarray,
+                   adjustflag: str) -> Dict[str, np.ndarray]:
+    """
+    将不复权K线的列换算为复权价格
+    :param columns: 列名 -> 数组，需包括 date，例如 BarStore.read_columns 的结果
+    :param factor_dates: 除权除息日，升序
+    :param back: 后复权因子
+    :param adjustflag: 1 后复权、2 前复权、3 不复权
+    :return: 新的 dict，价格列为新数组，其他列原样返回（不复制）
+    """
+    if adjustflag == '3' or not columns:
+        return dict(columns)
+    factors = bar_factors(columns['date'], factor_dates, back, adjustflag)
+    return {
+        name: values * factors if name in PRICE_COLUMNS else values
+        for name, values in columns.items()
+    }
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+
+class QueryCache:
+    """
+    会话级查询缓存
+    - 按规范化后的查询参数缓存结果，超过ttl秒的结果视为过期
+    - 超过max_entries时淘汰最久未使用的结果
+    - 同一个key同时只会执行一次查询，并发的相同请求等待并共享这次查询的结果
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 256):
+        """
+        :param ttl: 缓存有效期（秒）
+        :param max_entries: 最多缓存的结果数
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (过期时间, 结果)
+        self._in_flight = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       should_cache: Callable[[Any], bool] = lambda result: True) -> Any:
+        """
+        获取缓存结果，不存在时调用compute计算
+        :param key: 缓存键
+        :param compute: 计算函数
+        :param should_cache: 判断结果是否需要缓存，例如查询失败返回的空结果不缓存
+        :return: 结果
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.hits += 1
+                leader = False
+            else:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._in_flight[key]
+            if should_cache(result):
+                self._entries[key] = (time.monotonic() + self.ttl, result)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        future.set_result(result)
+        return result
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
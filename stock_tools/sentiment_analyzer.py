@@ -1,20 +1,93 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
-from datetime import datetime, timedelta
-import jieba
 from collections import Counter
 import numpy as np
 import os
 from dotenv import load_dotenv
-import time
-import random
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from stock_tools.news_crawler import NewsCrawler, normalize_code
 
 # 加载环境变量
 load_dotenv()
 
+# 词典中词的类型
+SENTIMENT_WORD, INTENSITY_WORD, NEGATION_WORD = 0, 1, 2
+
+_jieba = None
+
+
+def init_jieba(cache_dir=None):
+    """
+    导入并初始化 jieba（只在第一次分词时执行）
+    jieba 第一次加载时需要由词典构建前缀词典（约1-2秒），结果缓存在 cache_dir 中，之后直接读取缓存
+    默认缓存目录为 JIEBA_CACHE_DIR，未设置时为 $STOCK_DATA_DIR/jieba，而不是可能被清理的系统临时目录
+    :param cache_dir: 缓存目录
+    :return: jieba 模块
+    """
+    global _jieba
+    if _jieba is None:
+        import jieba
+
+        cache_dir = (cache_dir or os.getenv('JIEBA_CACHE_DIR')
+                     or os.path.join(os.getenv('STOCK_DATA_DIR', 'data'), 'jieba'))
+        os.makedirs(cache_dir, exist_ok=True)
+        jieba.dt.tmp_dir = cache_dir
+        jieba.initialize()
+        _jieba = jieba
+    return _jieba
+
+
+def score_titles(titles, lexicon):
+    """
+    分词并按词典打分（可在计算进程中执行）
+    :param titles: 标题列表
+    :param lexicon: 编译后的词典，词 -> (类型, 权重)，见 SentimentAnalyzer.compile_lexicon
+    :return: 列表，每个标题的 (原始得分, 关键词元组)
+    """
+    jieba = init_jieba()
+    results = []
+    for title in titles:
+        sentiment_score = 0.0
+        key_words = []
+        intensity = 1.0
+        for word in jieba.cut(title):
+            entry = lexicon.get(word)
+            if entry is None:
+                intensity = 1.0
+                continue
+            kind, weight = entry
+            if kind == INTENSITY_WORD:
+                intensity = weight
+            elif kind == NEGATION_WORD:
+                intensity = -1.0
+            else:
+                sentiment_score += weight * intensity
+                key_words.append(word)
+                intensity = 1.0
+        results.append((sentiment_score, tuple(key_words)))
+    return results
+
+
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(self, crawler=None, index=None, window=86400, cache_size=200000, parallel_threshold=20000,
+                 workers=None):
+        """
+        :param crawler: 股吧爬虫，默认为 NewsCrawler()，同一个爬虫再次获取时会发送条件请求
+        :param index: 帖子索引（NewsIndex），指定时每次只分析新帖子，统计结果按滚动窗口累计；为None时每次全部重新分析
+        :param window: 使用帖子索引时的统计窗口（秒）
+        :param cache_size: 最多缓存的标题打分结果数
+        :param parallel_threshold: 需要分词的标题超过该数量时使用多进程
+        :param workers: 分词进程数，默认为CPU核数
+        """
+        self.crawler = crawler or NewsCrawler()
+        self.index = index
+        self.window = window
+        self.cache_size = cache_size
+        self.parallel_threshold = parallel_threshold
+        self.workers = workers
+        self._scores = OrderedDict()  # 标题 -> (原始得分, 关键词元组)，按最近使用排序
+
         # 初始化情感词典
         self.positive_words = set([
             '上涨', '增长', '利好', '突破', '创新高', '强势', '看好', '推荐', '买入',
@@ -42,53 +115,64 @@ class SentimentAnalyzer:
         
         # 否定词
         self.negation_words = set(['不', '没有', '未', '无', '非', '否'])
+
+        self.compile_lexicon()
+
+    def compile_lexicon(self):
+        """
+        把情感词、程度副词、否定词合并为一个词典，每个词只需查找一次；修改词典后需要重新调用
+        同一个词出现在多个词表中时，优先级为 程度副词 > 否定词 > 正面词 > 负面词
+        """
+        lexicon = {}
+        for word in self.negative_words:
+            lexicon[word] = (SENTIMENT_WORD, -self.word_weights.get(word, 1.0))
+        for word in self.positive_words:
+            lexicon[word] = (SENTIMENT_WORD, self.word_weights.get(word, 1.0))
+        for word in self.negation_words:
+            lexicon[word] = (NEGATION_WORD, -1.0)
+        for word in self.intensity_words:
+            lexicon[word] = (INTENSITY_WORD, self.intensity_words[word])
+        self.lexicon = lexicon
+        # 只有情感词会改变得分，标题中不包含任何情感词时不需要分词
+        sentiment_words = sorted((word for word, (kind, _) in lexicon.items() if kind == SENTIMENT_WORD),
+                                 key=len, reverse=True)
+        self._sentiment_pattern = re.compile('|'.join(map(re.escape, sentiment_words))) if sentiment_words else None
+        self._scores.clear()
     
-    def get_news_data(self, stock_code):
+    def get_news_data(self, stock_code, pages=1):
         """
         获取股票相关评论
         :param stock_code: 股票代码（如：600519）
+        :param pages: 获取的页数
         :return: DataFrame
         """
-        # 移除股票代码前缀（如果有）
-        stock_code = stock_code.replace('sh.', '').replace('sz.', '')
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        }
-        
-        # 东方财富股吧URL
-        base_url = f'http://guba.eastmoney.com/list,{stock_code}.html'
-        
-        url = base_url
-        print(url)
-        response = requests.get(url, headers=headers)
-        response.encoding = 'utf-8'
-        soup = BeautifulSoup(response.text, 'html.parser')
-        posts = soup.select('tbody.listbody tr.listitem')
-
-        news_data = []
-        for post in posts:
-            try:
-                date = post.select_one('.update').text
-                title = post.select_one('.title a').text
-                content = post.select_one('.title a')['href']  # 获取帖子链接
-                source = post.select_one('.author a').text
-                url = f"http://guba.eastmoney.com{content}"
-                
-                news_data.append({
-                    'date': date,
-                    'title': title, 
-                    'source': source,
-                    'url': url
-                })
-            except (AttributeError, TypeError) as e:
-                continue
+        stock_code = normalize_code(stock_code)
+        return self.crawler.fetch([stock_code], pages)[stock_code]
+
+    def get_news_data_many(self, stock_codes, pages=1):
+        """
+        并发获取多只股票的评论
+        :param stock_codes: 股票代码列表
+        :param pages: 每只股票获取的页数
+        :return: dict，股票代码（不带前缀） -> DataFrame
+        """
+        return self.crawler.fetch(stock_codes, pages)
 
-        return pd.DataFrame(news_data)
+    def refresh(self, stock_codes, pages=1):
+        """
+        抓取多只股票的帖子并写入帖子索引，只分析新帖子和内容有变化的帖子
+        :param stock_codes: 股票代码列表
+        :param pages: 每只股票获取的页数
+        :return: dict，股票代码（不带前缀） -> 本次分析的帖子数
+        """
+        if self.index is None:
+            raise ValueError("未指定帖子索引")
+        threading.Thread(target=init_jieba, daemon=True).start()
+        news = self.get_news_data_many(stock_codes, pages)
+        return {code: len(self.index.ingest(code, news_df, self.analyze_sentiment_batch))
+                for code, news_df in news.items()}
     
-    def analyze_sentiment(self, title, content):
+    def analyze_sentiment(self, title, content=None):
         """
         使用基于词典和规则的方法分析文本情感
         :param title: 新闻标题
@@ -96,60 +180,7 @@ class SentimentAnalyzer:
         :return: 情感分析结果字典
         """
         try:
-            # 分词
-            title_words = list(jieba.cut(title))
-            
-            # 初始化情感分析结果
-            sentiment_score = 0
-            key_words = []
-            intensity = 1.0
-            
-            # 分析每个词
-            for i, word in enumerate(title_words):
-                # 检查程度副词
-                if word in self.intensity_words:
-                    intensity = self.intensity_words[word]
-                    continue
-                
-                # 检查否定词
-                if word in self.negation_words:
-                    intensity = -1.0
-                    continue
-                
-                # 检查情感词
-                if word in self.positive_words:
-                    weight = self.word_weights.get(word, 1.0)
-                    sentiment_score += weight * intensity
-                    key_words.append(word)
-                elif word in self.negative_words:
-                    weight = self.word_weights.get(word, 1.0)
-                    sentiment_score -= weight * intensity
-                    key_words.append(word)
-                
-                # 重置强度
-                intensity = 1.0
-            
-            # 归一化情感得分到0-10分
-            normalized_score = min(max((sentiment_score + 10) / 2, 0), 10)
-            
-            # 确定情感倾向
-            if normalized_score > 6:
-                sentiment = "正面"
-            elif normalized_score < 4:
-                sentiment = "负面"
-            else:
-                sentiment = "中性"
-            
-            # 生成影响分析
-            impact = self._generate_impact_analysis(sentiment, normalized_score, key_words)
-            
-            return {
-                "sentiment": sentiment,
-                "score": normalized_score,
-                "key_words": list(set(key_words)),
-                "impact": impact
-            }
-            
+            return self.analyze_sentiment_batch([title])[0]
         except Exception as e:
             print(f"情感分析出错: {str(e)}")
             return {
@@ -158,6 +189,67 @@ class SentimentAnalyzer:
                 "key_words": [],
                 "impact": "无法分析"
             }
+
+    def analyze_sentiment_batch(self, titles):
+        """
+        批量分析标题情感：相同标题只计算一次，已缓存的标题不再分词，需要分词的标题较多时使用多进程
+        :param titles: 标题列表
+        :return: 列表，与 titles 一一对应，每项与 analyze_sentiment 的结果相同
+        """
+        titles = list(titles)
+        scores = {}
+        pending = []
+        for title in dict.fromkeys(titles):
+            cached = self._scores.get(title)
+            if cached is not None:
+                self._scores.move_to_end(title)
+                scores[title] = cached
+            elif self._sentiment_pattern is None or not self._sentiment_pattern.search(title):
+                scores[title] = (0.0, ())
+            else:
+                pending.append(title)
+
+        if pending:
+            for title, result in zip(pending, self._score_pending(pending)):
+                scores[title] = result
+        for title, result in scores.items():
+            self._scores[title] = result
+        while len(self._scores) > self.cache_size:
+            self._scores.popitem(last=False)
+
+        results = {title: self._make_result(*result) for title, result in scores.items()}
+        return [dict(results[title], key_words=list(results[title]['key_words'])) for title in titles]
+
+    def _score_pending(self, titles):
+        """对未缓存的标题分词打分，数量较多时分块交给多个进程"""
+        if len(titles) < self.parallel_threshold or self.workers == 1:
+            return score_titles(titles, self.lexicon)
+        workers = self.workers or os.cpu_count() or 1
+        chunk_size = -(-len(titles) // (workers * 4))
+        chunks = [titles[i:i + chunk_size] for i in range(0, len(titles), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(score_titles, chunks, [self.lexicon] * len(chunks))
+            return [result for chunk in results for result in chunk]
+
+    def _make_result(self, sentiment_score, key_words):
+        """由原始得分生成情感分析结果"""
+        # 归一化情感得分到0-10分
+        normalized_score = min(max((sentiment_score + 10) / 2, 0), 10)
+
+        # 确定情感倾向
+        if normalized_score > 6:
+            sentiment = "正面"
+        elif normalized_score < 4:
+            sentiment = "负面"
+        else:
+            sentiment = "中性"
+
+        return {
+            "sentiment": sentiment,
+            "score": normalized_score,
+            "key_words": list(set(key_words)),
+            "impact": self._generate_impact_analysis(sentiment, normalized_score, key_words)
+        }
     
     def _generate_impact_analysis(self, sentiment, score, key_words):
         """生成对股价影响的简要分析"""
@@ -180,17 +272,19 @@ class SentimentAnalyzer:
         :param stock_code: 股票代码
         :return: 分析结果字典
         """
+        # 分词词典加载（1秒以上）与抓取股吧页面同时进行
+        threading.Thread(target=init_jieba, daemon=True).start()
         news_df = self.get_news_data(stock_code)
-        print(news_df)
+
+        if self.index is not None:
+            return self._indexed_analysis(normalize_code(stock_code), news_df)
         
-        sentiment_results = []
-        for _, row in news_df.iterrows():
-            result = self.analyze_sentiment(row['title'], row['content'])
-            sentiment_results.append(result)
+        titles = news_df['title'].tolist() if 'title' in news_df.columns else []
+        sentiment_results = self.analyze_sentiment_batch(titles)
         
         # 计算总体情感得分
         scores = [r['score'] for r in sentiment_results]
-        avg_score = np.mean(scores)
+        avg_score = np.mean(scores) if scores else 5.0
         
         # 统计情感倾向
         sentiments = [r['sentiment'] for r in sentiment_results]
@@ -211,6 +305,20 @@ class SentimentAnalyzer:
         }
         
         return analysis
+
+    def _indexed_analysis(self, stock_code, news_df):
+        """写入帖子索引，统计结果取自索引中滚动窗口内的全部帖子，详细分析只包括本次新增或更新的帖子"""
+        processed = self.index.ingest(stock_code, news_df, self.analyze_sentiment_batch)
+        stats = self.index.summary(stock_code, self.window)
+        avg_score = stats['average_score'] if stats['average_score'] is not None else 5.0
+        return {
+            'average_score': avg_score,
+            'sentiment_distribution': stats['sentiment_distribution'],
+            'top_keywords': stats['top_keywords'],
+            'recent_trend': '看涨' if avg_score > 5 else '看跌',
+            'detailed_analysis': processed,
+            'post_count': stats['post_count'],
+        }
     
     def get_sentiment_summary(self, stock_code):
         """
@@ -226,8 +334,11 @@ class SentimentAnalyzer:
             f"情感分布: {analysis['sentiment_distribution']}",
             f"热门关键词: {analysis['top_keywords']}",
             f"近期趋势: {analysis['recent_trend']}",
-            "\n详细分析:"
         ]
+        if 'post_count' in analysis:
+            summary.append(f"统计帖子数: {analysis['post_count']}（近{self.window / 3600:g}小时），"
+                           f"本次新增或更新: {len(analysis['detailed_analysis'])}")
+        summary.append("\n详细分析:")
         
         # 添加每条新闻的详细分析
         for i, detail in enumerate(analysis['detailed_analysis'], 1):
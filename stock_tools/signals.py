@@ -0,0 +1,98 @@
+"""
+技术信号规则
+
+每条规则把指标转换为状态数组：1 为看多（买入、超卖、金叉、强势上涨），-1 为看空，0 为中性。
+规则按数组整体计算，输入可以是某只股票的最后几根K线，也可以是 (日期 × 股票) 的全部历史，
+TechnicalAnalyzer.get_technical_signals（最新信号）和 SignalBacktester（历史回测）共用这里的规则。
+"""
+from typing import Dict, Mapping
+
+import numpy as np
+
+# 规则用到的指标
+SIGNAL_INDICATORS = ('MACD', 'MACD_SIGNAL', 'RSI14', 'BB_UPPER', 'BB_LOWER', 'K', 'D', 'CCI',
+                     'PLUS_DI', 'MINUS_DI', 'ADX')
+
+# 超买超卖阈值：(下限, 上限)，低于下限为超卖（看多），高于上限为超买（看空）
+RSI_BOUNDS = (30, 70)
+CCI_BOUNDS = (-100, 100)
+WILLR_BOUNDS = (-80, -20)
+VR_BOUNDS = (40, 350)
+# ADX 高于该值时认为趋势明显
+ADX_TREND = 25
+
+# 规则名 -> 状态 -> 信号文字
+SIGNAL_LABELS = {
+    'MACD': {1: '买入', -1: '卖出'},
+    'RSI': {1: '超卖', 0: '中性', -1: '超买'},
+    'BB': {1: '超卖', 0: '中性', -1: '超买'},
+    'KDJ': {1: '金叉', 0: '中性', -1: '死叉'},
+    'CCI': {1: '超卖', 0: '中性', -1: '超买'},
+    'DMI': {1: '强势上涨', 0: '盘整', -1: '强势下跌'},
+}
+
+
+def _shift(x: np.ndarray) -> np.ndarray:
+    """沿时间向后平移一行，第一行为 NaN"""
+    out = np.empty_like(x, dtype=np.float64)
+    out[:1] = np.nan
+    out[1:] = x[:-1]
+    return out
+
+
+def _state(bullish: np.ndarray, bearish: np.ndarray) -> np.ndarray:
+    return bullish.astype(np.int8) - bearish.astype(np.int8)
+
+
+def threshold_state(values: np.ndarray, bounds) -> np.ndarray:
+    """超买超卖规则：低于下限为 1，高于上限为 -1，NaN 为 0"""
+    lower, upper = bounds
+    with np.errstate(invalid='ignore'):
+        return _state(values < lower, values > upper)
+
+
+def dmi_state(plus_di: np.ndarray, minus_di: np.ndarray, adx: np.ndarray) -> np.ndarray:
+    """DMI 规则：趋势明显时 +DI 在上为 1（强势上涨），-DI 在上为 -1（强势下跌）"""
+    with np.errstate(invalid='ignore'):
+        strong = adx > ADX_TREND
+        return _state((plus_di > minus_di) & strong, (plus_di < minus_di) & strong)
+
+
+def trend_state(short: np.ndarray, long: np.ndarray) -> np.ndarray:
+    """均线规则：短期均线在长期均线之上为 1，之下为 -1，NaN 为 0"""
+    with np.errstate(invalid='ignore'):
+        return _state(short > long, short < long)
+
+
+def signal_states(values: Mapping[str, np.ndarray], close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算各规则的状态
+    :param values: 指标名 -> 数组，需包括 SIGNAL_INDICATORS，形状与 close 相同
+    :param close: 收盘价，一维数组或 (日期 × 股票) 二维数组
+    :return: dict，规则名 -> int8 状态数组；指标为 NaN 时比较结果为假
+    """
+    close = np.asarray(close, dtype=np.float64)
+    v = {name: np.asarray(values[name], dtype=np.float64) for name in SIGNAL_INDICATORS}
+    with np.errstate(invalid='ignore'):
+        # MACD 在信号线之上为买入，否则为卖出（包括指标尚未形成时）
+        macd_above = v['MACD'] > v['MACD_SIGNAL']
+        k, d = v['K'], v['D']
+        prev_k, prev_d = _shift(k), _shift(d)
+        return {
+            'MACD': np.where(macd_above, 1, -1).astype(np.int8),
+            'RSI': threshold_state(v['RSI14'], RSI_BOUNDS),
+            'BB': _state(close < v['BB_LOWER'], close > v['BB_UPPER']),
+            'KDJ': _state((k > d) & (prev_k <= prev_d), (k < d) & (prev_k >= prev_d)),
+            'CCI': threshold_state(v['CCI'], CCI_BOUNDS),
+            'DMI': dmi_state(v['PLUS_DI'], v['MINUS_DI'], v['ADX']),
+        }
+
+
+def signal_labels(states: Mapping[str, np.ndarray], row: int = -1) -> Dict[str, str]:
+    """
+    某一行的信号文字
+    :param states: signal_states 的结果（一维）
+    :param row: 行号，默认为最后一行
+    :return: dict，规则名 -> 信号文字
+    """
+    return {name: SIGNAL_LABELS[name][int(state[row])] for name, state in states.items()}
@@ -0,0 +1,363 @@
+from typing import Dict
+
+import numpy as np
+
+from stock_tools.indicators import FLAT_TOLERANCE
+
+
+class _Window:
+    """
+    固定长度的滑动窗口（镜像环形缓冲区）
+    每个值同时写在 pos 与 pos+size 两处，最近 k 个值总是一段连续内存，取窗口不需要拼接
+    """
+
+    def __init__(self, size: int, width: int):
+        self.size = size
+        self.buffer = np.full((2 * size, width), np.nan)
+        self.pos = 0
+        self.count = 0
+
+    def push(self, values: np.ndarray):
+        self.buffer[self.pos] = values
+        self.buffer[self.pos + self.size] = values
+        self.pos = (self.pos + 1) % self.size
+        self.count += 1
+
+    def outgoing(self, k: int) -> np.ndarray:
+        """下一次 push 后移出最近 k 个值窗口的值；窗口不足 k 个值时为 0"""
+        if self.count < k:
+            return np.zeros(self.buffer.shape[1])
+        return self.buffer[self.pos + self.size - k]
+
+    def last(self, k: int) -> np.ndarray:
+        """最近 k 个值，按时间从旧到新排列，形状 (k, 股票数)"""
+        end = self.pos + self.size
+        return self.buffer[end - k:end]
+
+
+class _SlidingSum:
+    """
+    滑动窗口的和：每次加上新值、减去移出窗口的值（与 talib 的累加顺序一致）
+    NaN 不进入和，单独计数，窗口内有 NaN 时结果为 NaN，NaN 移出窗口后恢复
+    """
+
+    def __init__(self, width: int):
+        self.total = np.zeros(width)
+        self.missing = np.zeros(width)
+
+    def update(self, incoming: np.ndarray, outgoing: np.ndarray):
+        """
+        :param incoming: 进入窗口的值
+        :param outgoing: 移出窗口的值，窗口未满时为 0（见 _Window.outgoing）
+        """
+        incoming_missing = np.isnan(incoming)
+        outgoing_missing = np.isnan(outgoing)
+        self.total += np.where(incoming_missing, 0.0, incoming)
+        self.total -= np.where(outgoing_missing, 0.0, outgoing)
+        self.missing += incoming_missing
+        self.missing -= outgoing_missing
+
+    @property
+    def value(self) -> np.ndarray:
+        return np.where(self.missing > 0, np.nan, self.total)
+
+
+class StreamingIndicators:
+    """
+    增量技术指标：每来一根新K线只更新一次内部状态，计算量与历史长度无关
+
+    MA、布林带、VR 维护滑动和（布林带另有平方和），每根K线加上新值、减去移出窗口的值，与 EMA 类指标
+    （MACD、RSI、DMI）一样每次更新为 O(1)。CCI 的平均偏差、KDJ 和威廉指标的最高最低价需要遍历整个窗口，
+    每次更新为 O(窗口长度)（窗口只有 5~14 根K线）。
+
+    指标、参数与 TechnicalAnalyzer.calculate_all_indicators 相同，输出与 talib 批量计算的结果一致
+    （同样的 lookback 期内输出 NaN）。内部状态按股票向量化，可以同时推进整个自选股列表，
+    要求所有股票每次一起更新一根K线。
+    """
+
+    MA_PERIODS = (5, 10, 20, 60)
+    RSI_PERIODS = (6, 12, 24)
+    MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+    BB_PERIOD, BB_DEV = 5, 2.0
+    STOCH_FASTK, STOCH_SLOWK, STOCH_SLOWD = 5, 3, 3
+    CCI_PERIOD = 14
+    DMI_PERIOD = 14
+    VR_PERIOD = 26
+    WILLR_PERIOD = 14
+
+    def __init__(self, symbols: int = 1):
+        """
+        :param symbols: 同时计算的股票数量
+        """
+        self.symbols = symbols
+        self.bars = 0
+        nan = np.full(symbols, np.nan)
+
+        self.closes = _Window(max(max(self.MA_PERIODS), self.MACD_SLOW), symbols)
+        self.highs = _Window(max(self.STOCH_FASTK, self.WILLR_PERIOD), symbols)
+        self.lows = _Window(max(self.STOCH_FASTK, self.WILLR_PERIOD), symbols)
+        self.prev_close = nan.copy()
+        self.prev_high = nan.copy()
+        self.prev_low = nan.copy()
+
+        # 收盘价的滑动和：周期 -> 最近 period 根K线的和（MA 和布林带中轨），布林带另需平方和
+        self.close_sums = {period: _SlidingSum(symbols) for period in sorted({*self.MA_PERIODS, self.BB_PERIOD})}
+        self.close_square_sum = _SlidingSum(symbols)
+
+        # MACD
+        self.ema_fast = nan.copy()
+        self.ema_slow = nan.copy()
+        self.macd_values = _Window(self.MACD_SIGNAL, symbols)
+        self.macd_signal = nan.copy()
+
+        # RSI：周期 -> [平均涨幅, 平均跌幅]
+        self.rsi_state = {period: [np.zeros(symbols), np.zeros(symbols)] for period in self.RSI_PERIODS}
+
+        # KDJ
+        self.fastk_values = _Window(self.STOCH_SLOWK, symbols)
+        self.slowk_values = _Window(self.STOCH_SLOWD, symbols)
+
+        # CCI
+        self.typical = _Window(self.CCI_PERIOD, symbols)
+        self.typical_sum = _SlidingSum(symbols)
+
+        # DMI：Wilder 平滑后的 +DM、-DM、TR 以及 ADX
+        self.plus_dm = np.zeros(symbols)
+        self.minus_dm = np.zeros(symbols)
+        self.true_range = np.zeros(symbols)
+        self.dx_sum = np.zeros(symbols)
+        self.adx = nan.copy()
+
+        # OBV、VR
+        self.obv = np.zeros(symbols)
+        self.up_volume = _Window(self.VR_PERIOD, symbols)
+        self.down_volume = _Window(self.VR_PERIOD, symbols)
+        self.up_sum = _SlidingSum(symbols)
+        self.down_sum = _SlidingSum(symbols)
+
+        self.latest = {}
+
+    def update(self, high, low, close, volume) -> Dict[str, np.ndarray]:
+        """
+        推进一根K线
+        :param high: 最高价，标量或长度为股票数的数组，下同
+        :param low: 最低价
+        :param close: 收盘价
+        :param volume: 成交量
+        :return: dict，指标名 -> 每只股票的最新值，指标名与 TechnicalAnalyzer 的列名一致
+        """
+        high = np.broadcast_to(np.asarray(high, dtype=np.float64), (self.symbols,))
+        low = np.broadcast_to(np.asarray(low, dtype=np.float64), (self.symbols,))
+        close = np.broadcast_to(np.asarray(close, dtype=np.float64), (self.symbols,))
+        volume = np.broadcast_to(np.asarray(volume, dtype=np.float64), (self.symbols,))
+
+        self.bars += 1
+        self._push_close(close)
+        self.highs.push(high)
+        self.lows.push(low)
+        nan = np.full(self.symbols, np.nan)
+        result = {}
+
+        for period in self.MA_PERIODS:
+            result[f'MA{period}'] = self.close_sums[period].value / period if self.bars >= period else nan
+
+        result['MACD'], result['MACD_SIGNAL'], result['MACD_HIST'] = self._update_macd(close, nan)
+
+        for period in self.RSI_PERIODS:
+            result[f'RSI{period}'] = self._update_rsi(period, close, nan)
+
+        if self.bars >= self.BB_PERIOD:
+            middle = self.close_sums[self.BB_PERIOD].value / self.BB_PERIOD
+            std = np.sqrt(np.maximum(self.close_square_sum.value / self.BB_PERIOD - middle * middle, 0.0))
+            result['BB_UPPER'] = middle + self.BB_DEV * std
+            result['BB_MIDDLE'] = middle
+            result['BB_LOWER'] = middle - self.BB_DEV * std
+        else:
+            result['BB_UPPER'] = result['BB_MIDDLE'] = result['BB_LOWER'] = nan
+
+        result['K'], result['D'] = self._update_stoch(close, nan)
+        result['J'] = 3 * result['K'] - 2 * result['D']
+        result['CCI'] = self._update_cci(high, low, close, nan)
+        result['PLUS_DI'], result['MINUS_DI'], result['ADX'] = self._update_dmi(high, low, close, nan)
+
+        if self.bars == 1:
+            self.obv = volume.copy()
+        else:
+            self.obv = self.obv + np.sign(close - self.prev_close) * volume
+        result['OBV'] = self.obv.copy()
+
+        result['VR'] = self._update_vr(close, volume, nan)
+
+        if self.bars >= self.WILLR_PERIOD:
+            highest = self.highs.last(self.WILLR_PERIOD).max(axis=0)
+            lowest = self.lows.last(self.WILLR_PERIOD).min(axis=0)
+            diff = highest - lowest
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result['WILLR'] = np.where(diff != 0, -100.0 * (highest - close) / diff, 0.0)
+        else:
+            result['WILLR'] = nan
+
+        self.prev_close = close.copy()
+        self.prev_high = high.copy()
+        self.prev_low = low.copy()
+        self.latest = result
+        return result
+
+    def warm_up(self, high, low, close, volume) -> Dict[str, np.ndarray]:
+        """
+        用历史数据初始化状态
+        :param high: 历史最高价，一维（单只股票）或 (日期 × 股票) 二维数组，下同
+        :return: 最后一根K线的指标值
+        """
+        high, low, close, volume = (np.asarray(x, dtype=np.float64).reshape(len(x), -1)
+                                    for x in (high, low, close, volume))
+        for t in range(len(close)):
+            self.update(high[t], low[t], close[t], volume[t])
+        return self.latest
+
+    def _push_close(self, close):
+        """收盘价进入窗口，同时更新各周期的滑动和"""
+        for period, total in self.close_sums.items():
+            total.update(close, self.closes.outgoing(period))
+        outgoing = self.closes.outgoing(self.BB_PERIOD)
+        self.close_square_sum.update(close * close, outgoing * outgoing)
+        self.closes.push(close)
+
+    def _update_macd(self, close, nan):
+        k_fast = 2.0 / (self.MACD_FAST + 1)
+        k_slow = 2.0 / (self.MACD_SLOW + 1)
+        if self.bars < self.MACD_SLOW:
+            return nan, nan, nan
+        if self.bars == self.MACD_SLOW:
+            # 与 talib 一致，快线与慢线在同一根K线开始，各自以窗口均值为初值
+            self.ema_slow = self.closes.last(self.MACD_SLOW).mean(axis=0)
+            self.ema_fast = self.closes.last(self.MACD_FAST).mean(axis=0)
+        else:
+            self.ema_slow = self.ema_slow + k_slow * (close - self.ema_slow)
+            self.ema_fast = self.ema_fast + k_fast * (close - self.ema_fast)
+        macd = self.ema_fast - self.ema_slow
+        self.macd_values.push(macd)
+
+        k_signal = 2.0 / (self.MACD_SIGNAL + 1)
+        if self.macd_values.count < self.MACD_SIGNAL:
+            return nan, nan, nan
+        if self.macd_values.count == self.MACD_SIGNAL:
+            self.macd_signal = self.macd_values.last(self.MACD_SIGNAL).mean(axis=0)
+        else:
+            self.macd_signal = self.macd_signal + k_signal * (macd - self.macd_signal)
+        return macd, self.macd_signal, macd - self.macd_signal
+
+    def _update_rsi(self, period, close, nan):
+        if self.bars == 1:
+            return nan
+        state = self.rsi_state[period]
+        diff = close - self.prev_close
+        gain = np.maximum(diff, 0.0)
+        loss = np.maximum(-diff, 0.0)
+        changes = self.bars - 1
+        if changes <= period:
+            # 前 period 个涨跌幅先累加，凑满后取平均作为初值
+            state[0] = state[0] + gain
+            state[1] = state[1] + loss
+            if changes < period:
+                return nan
+            state[0] = state[0] / period
+            state[1] = state[1] / period
+        else:
+            state[0] = (state[0] * (period - 1) + gain) / period
+            state[1] = (state[1] * (period - 1) + loss) / period
+        total = state[0] + state[1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(np.abs(total) < 1e-8, 0.0, 100.0 * state[0] / total)
+
+    def _update_stoch(self, close, nan):
+        if self.bars < self.STOCH_FASTK:
+            return nan, nan
+        highest = self.highs.last(self.STOCH_FASTK).max(axis=0)
+        lowest = self.lows.last(self.STOCH_FASTK).min(axis=0)
+        diff = highest - lowest
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fastk = np.where(diff != 0, 100.0 * (close - lowest) / diff, 0.0)
+        self.fastk_values.push(fastk)
+        if self.fastk_values.count < self.STOCH_SLOWK:
+            return nan, nan
+        slowk = self.fastk_values.last(self.STOCH_SLOWK).mean(axis=0)
+        self.slowk_values.push(slowk)
+        if self.slowk_values.count < self.STOCH_SLOWD:
+            return nan, nan
+        return slowk, self.slowk_values.last(self.STOCH_SLOWD).mean(axis=0)
+
+    def _update_cci(self, high, low, close, nan):
+        typical = (high + low + close) / 3.0
+        self.typical_sum.update(typical, self.typical.outgoing(self.CCI_PERIOD))
+        self.typical.push(typical)
+        if self.typical.count < self.CCI_PERIOD:
+            return nan
+        average = self.typical_sum.value / self.CCI_PERIOD
+        # 平均偏差依赖当前均值，无法增量更新，需要遍历整个窗口
+        window = self.typical.last(self.CCI_PERIOD)
+        deviation = np.abs(window - average).mean(axis=0)
+        delta = window[-1] - average
+        # 横盘时滑动和的舍入误差使偏差不为0，与面板模式一样按相对误差判断
+        flat = deviation <= FLAT_TOLERANCE * np.abs(average)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where((delta != 0) & ~flat, delta / (0.015 * deviation), 0.0)
+
+    def _update_dmi(self, high, low, close, nan):
+        if self.bars == 1:
+            return nan, nan, nan
+        n = self.DMI_PERIOD
+        up = high - self.prev_high
+        down = self.prev_low - low
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+        true_range = np.maximum(high - low, np.maximum(np.abs(high - self.prev_close),
+                                                       np.abs(low - self.prev_close)))
+        changes = self.bars - 1
+        if changes < n:
+            # 前 n-1 根K线的 +DM、-DM、TR 先累加作为初值
+            self.plus_dm = self.plus_dm + plus_dm
+            self.minus_dm = self.minus_dm + minus_dm
+            self.true_range = self.true_range + true_range
+            return nan, nan, nan
+        self.plus_dm = self.plus_dm - self.plus_dm / n + plus_dm
+        self.minus_dm = self.minus_dm - self.minus_dm / n + minus_dm
+        self.true_range = self.true_range - self.true_range / n + true_range
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            zero_range = np.abs(self.true_range) < 1e-8
+            plus_di = np.where(zero_range, 0.0, 100.0 * self.plus_dm / self.true_range)
+            minus_di = np.where(zero_range, 0.0, 100.0 * self.minus_dm / self.true_range)
+            total = plus_di + minus_di
+            dx = np.where(np.abs(total) < 1e-8, 0.0, 100.0 * np.abs(plus_di - minus_di) / total)
+
+        dx_count = changes - n + 1
+        if dx_count < n:
+            self.dx_sum = self.dx_sum + dx
+            return plus_di, minus_di, nan
+        if dx_count == n:
+            self.adx = (self.dx_sum + dx) / n
+        else:
+            self.adx = (self.adx * (n - 1) + dx) / n
+        return plus_di, minus_di, self.adx
+
+    def _update_vr(self, close, volume, nan):
+        if self.bars == 1:
+            # 第一根K线没有涨跌，计入0
+            diff = np.zeros(self.symbols)
+        else:
+            diff = close - self.prev_close
+        # 缺失的K线记为 NaN，窗口内有缺失时输出 NaN，与 indicators.vr 一致
+        missing = np.isnan(diff) | np.isnan(volume)
+        up = np.where(missing, np.nan, np.where(diff > 0, volume, 0.0))
+        down = np.where(missing, np.nan, np.where(diff < 0, volume, 0.0))
+        self.up_sum.update(up, self.up_volume.outgoing(self.VR_PERIOD))
+        self.down_sum.update(down, self.down_volume.outgoing(self.VR_PERIOD))
+        self.up_volume.push(up)
+        self.down_volume.push(down)
+        if self.up_volume.count < self.VR_PERIOD:
+            return nan
+        up, down = self.up_sum.value, self.down_sum.value
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # 窗口内没有下跌日时分母为0，输出 NaN
+            return np.where(down > 0, up / down * 100, np.nan)
@@ -2,155 +2,398 @@ import pandas as pd
 import numpy as np
 import talib
 
+from stock_tools import indicators
+from stock_tools.signals import SIGNAL_INDICATORS, signal_labels, signal_states
+
+def _round(value, digits=3):
+    """摘要中的数值保留有限位数，NaN 转换为 None"""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def summarize_prices(data, window=20):
+    """
+    生成行情摘要：最新一根K线、近期区间统计和最近几天的收盘价，大小与历史长度无关
+    :param data: DataFrame，get_stock_data 的结果
+    :param window: 近期统计的K线数
+    :return: dict
+    """
+    columns = {str(column).lower(): column for column in data.columns}
+    close = data[columns['close']].astype(np.float64, copy=False)
+    volume = data[columns['volume']].astype(np.float64, copy=False)
+    recent = data.iloc[-window:]
+    last = data.iloc[-1]
+    dates = data[columns['date']] if 'date' in columns else data.index.to_series()
+
+    def day(value):
+        return str(pd.Timestamp(value).date())
+
+    summary = {
+        '区间': [day(dates.iloc[0]), day(dates.iloc[-1])],
+        'K线数': len(data),
+        '最新': {
+            '日期': day(dates.iloc[-1]),
+            **{name: _round(last[columns[name]]) for name in ('open', 'high', 'low', 'close') if name in columns},
+            'volume': int(volume.iloc[-1]),
+        },
+        f'近{window}日': {
+            '涨跌幅%': _round((close.iloc[-1] / close.iloc[max(len(close) - window - 1, 0)] - 1) * 100, 2),
+            '最高价': _round(recent[columns['high']].max()),
+            '最低价': _round(recent[columns['low']].min()),
+            '日均成交量': int(volume.iloc[-window:].mean()),
+            '最新成交量/日均': _round(volume.iloc[-1] / volume.iloc[-window:].mean(), 2),
+        },
+        '全区间': {
+            '涨跌幅%': _round((close.iloc[-1] / close.iloc[0] - 1) * 100, 2),
+            '最高收盘价': _round(close.max()),
+            '最低收盘价': _round(close.min()),
+        },
+        '最近5日收盘价': [_round(value) for value in close.iloc[-5:]],
+    }
+    return summary
+
+
 class TechnicalAnalyzer:
-    def __init__(self, data):
+    # 指标族：族名 -> (计算方法, 输出的指标名, lookback)
+    # lookback 为计算最后一个值所需的额外历史K线数，None 表示递推类指标，需要全部历史才能与 talib 结果一致
+    FAMILIES = {
+        'MACD': ('_compute_macd', ('MACD', 'MACD_SIGNAL', 'MACD_HIST'), None),
+        'BBANDS': ('_compute_bbands', ('BB_UPPER', 'BB_MIDDLE', 'BB_LOWER'), 4),
+        'STOCH': ('_compute_stoch', ('K', 'D'), 8),
+        'J': ('_compute_j', ('J',), 0),
+        'CCI': ('_compute_cci', ('CCI',), 13),
+        'DMI': ('_compute_dmi', ('PLUS_DI', 'MINUS_DI', 'ADX'), None),
+        'OBV': ('_compute_obv', ('OBV',), None),
+        'VR': ('_compute_vr', ('VR',), 26),
+        'WILLR': ('_compute_willr', ('WILLR',), 13),
+    }
+    # 带周期参数的指标，如 MA30、RSI14、VR13
+    PERIOD_FAMILIES = {
+        'MA': ('_compute_ma', lambda period: period - 1),
+        'RSI': ('_compute_rsi', lambda period: None),
+        'VR': ('_compute_vr', lambda period: period),
+    }
+    # get_summary 中给出最新值的指标
+    SUMMARY_INDICATORS = (
+        'MA5', 'MA10', 'MA20', 'MA60', 'MACD', 'MACD_SIGNAL', 'MACD_HIST', 'RSI6', 'RSI14',
+        'BB_UPPER', 'BB_LOWER', 'K', 'D', 'J', 'CCI', 'PLUS_DI', 'MINUS_DI', 'ADX', 'VR', 'WILLR',
+    )
+    # calculate_all_indicators 计算的指标
+    DEFAULT_INDICATORS = (
+        'MA5', 'MA10', 'MA20', 'MA60', 'MACD', 'MACD_SIGNAL', 'MACD_HIST', 'RSI6', 'RSI12', 'RSI24',
+        'BB_UPPER', 'BB_MIDDLE', 'BB_LOWER', 'K', 'D', 'J', 'CCI', 'PLUS_DI', 'MINUS_DI', 'ADX',
+        'OBV', 'VR', 'WILLR',
+    )
+
+    def __init__(self, data, dtype=np.float64):
         """
-        :param data: DataFrame，包含OHLCV数据
+        :param data: DataFrame，包含OHLCV数据，列名不区分大小写。不会被修改，可以在多个分析之间共享
+        :param dtype: 指标结果的类型，传 np.float32 可以减半内存
         """
         self.data = data
-        # 确保列名是小写的
-        self.data.columns = self.data.columns.str.lower()
-        self.close = self.data['close'].astype(float)
-        self.high = self.data['high'].astype(float)
-        self.low = self.data['low'].astype(float)
-        self.volume = self.data['volume'].astype(float)
-    
+        columns = {str(column).lower(): column for column in data.columns}
+        # StockDataFetcher 返回的价格列已是 float64，此时直接引用原数据，不会复制
+        self.close = data[columns['close']].astype(np.float64, copy=False)
+        self.high = data[columns['high']].astype(np.float64, copy=False)
+        self.low = data[columns['low']].astype(np.float64, copy=False)
+        self.volume = data[columns['volume']].astype(np.float64, copy=False)
+        self.dtype = np.dtype(dtype)
+        # calculate_* 的结果：指标名 -> ndarray，长度与 data 一致
+        self.indicators = {}
+        # (族名, 起始行) -> {指标名: ndarray}，同一族的指标一起计算、一起缓存
+        self._computed = {}
+
+    @classmethod
+    def from_columns(cls, columns, dtype=np.float64):
+        """
+        由列数组构造，不复制数据
+        :param columns: 列名 -> 一维数组，如 BarStore.read_columns / StockDataFetcher.get_stock_columns 返回的
+                        内存映射切片；float64 的价格列直接引用原数组（成交量为整数，会转换为 float64）
+        :param dtype: 指标结果的类型
+        """
+        return cls(pd.DataFrame(dict(columns), copy=False), dtype=dtype)
+
+    @classmethod
+    def _resolve(cls, name):
+        """
+        指标名 -> (族名, 计算方法, 参数, lookback)
+        """
+        for family, (method, outputs, lookback) in cls.FAMILIES.items():
+            if name in outputs:
+                return family, method, (), lookback
+        for prefix, (method, lookback) in cls.PERIOD_FAMILIES.items():
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and suffix.isdigit() and int(suffix) > 0:
+                period = int(suffix)
+                return name, method, (period,), lookback(period)
+        raise ValueError(f"不支持的技术指标: {name}")
+
+    def indicator(self, name, tail=None):
+        """
+        按需计算单个指标，结果会被缓存
+        :param name: 指标名，与 calculate_all_indicators 的列名一致；MA、RSI 可以带任意周期，如 MA30、RSI14
+        :param tail: 只需要最后 tail 行时传入。窗口类指标只计算最后 tail + lookback 行，递推类指标仍使用全部历史
+        :return: Series，索引与 self.data 一致（tail 时为最后 tail 行）
+        """
+        family, method, params, lookback = self._resolve(name)
+        size = len(self.close)
+        tail = size if tail is None else min(tail, size)
+        start = 0 if lookback is None else max(size - tail - lookback, 0)
+
+        key = (family, start)
+        if key not in self._computed:
+            # 已经算过更长区间时直接复用
+            reuse = [k for k in self._computed if k[0] == family and k[1] <= start]
+            if reuse:
+                key = max(reuse, key=lambda k: k[1])
+            else:
+                result = getattr(self, method)(start, *params)
+                self._computed[key] = {k: v.astype(self.dtype, copy=False) for k, v in result.items()}
+        values = self._computed[key][name]
+        return pd.Series(values[len(values) - tail:], index=self.data.index[size - tail:], name=name)
+
+    def get_indicators(self, names, tail=None):
+        """
+        按需计算一组指标，只计算所需的指标族及其依赖
+        :param names: 指标名列表
+        :param tail: 只需要最后 tail 行时传入，如筛选时只看最新值可以传 1
+        :return: DataFrame，列为指标
+        """
+        return pd.DataFrame({name: self.indicator(name, tail) for name in names})
+
+    def _arrays(self, start, *names):
+        return [getattr(self, name).to_numpy()[start:] for name in names]
+
+    def _compute_ma(self, start, period):
+        close, = self._arrays(start, 'close')
+        return {f'MA{period}': talib.MA(close, timeperiod=period)}
+
+    def _compute_rsi(self, start, period):
+        close, = self._arrays(start, 'close')
+        return {f'RSI{period}': talib.RSI(close, timeperiod=period)}
+
+    def _compute_macd(self, start):
+        close, = self._arrays(start, 'close')
+        return dict(zip(self.FAMILIES['MACD'][1], talib.MACD(close)))
+
+    def _compute_bbands(self, start):
+        close, = self._arrays(start, 'close')
+        # 显式固定原来的5日周期，与面板模式的 indicators.bbands(close, 5) 保持一致
+        return dict(zip(self.FAMILIES['BBANDS'][1], talib.BBANDS(close, timeperiod=5)))
+
+    def _compute_stoch(self, start):
+        high, low, close = self._arrays(start, 'high', 'low', 'close')
+        return dict(zip(self.FAMILIES['STOCH'][1], talib.STOCH(high, low, close)))
+
+    def _compute_j(self, start):
+        tail = len(self.close) - start
+        k = self.indicator('K', tail).to_numpy()
+        d = self.indicator('D', tail).to_numpy()
+        return {'J': 3 * k - 2 * d}
+
+    def _compute_cci(self, start):
+        high, low, close = self._arrays(start, 'high', 'low', 'close')
+        return {'CCI': talib.CCI(high, low, close, timeperiod=14)}
+
+    def _compute_dmi(self, start):
+        high, low, close = self._arrays(start, 'high', 'low', 'close')
+        return {
+            'PLUS_DI': talib.PLUS_DI(high, low, close, timeperiod=14),
+            'MINUS_DI': talib.MINUS_DI(high, low, close, timeperiod=14),
+            'ADX': talib.ADX(high, low, close, timeperiod=14),
+        }
+
+    def _compute_obv(self, start):
+        close, volume = self._arrays(start, 'close', 'volume')
+        return {'OBV': talib.OBV(close, volume)}
+
+    def _compute_vr(self, start, window=None):
+        close, volume = self._arrays(start, 'close', 'volume')
+        name = 'VR' if window is None else f'VR{window}'
+        return {name: indicators.vr(close, volume, window or 26)}
+
+    def _compute_willr(self, start):
+        high, low, close = self._arrays(start, 'high', 'low', 'close')
+        return {'WILLR': talib.WILLR(high, low, close, timeperiod=14)}
+
+    def _assign(self, names):
+        """
+        计算一组指标并记入 self.indicators
+        :return: 新的 DataFrame：行情列（列名小写）加上目前已计算的全部指标列，与原来 calculate_* 的返回值一致；
+                 传入的 DataFrame 不会被修改
+        """
+        for name in names:
+            self.indicators[name] = self.indicator(name).to_numpy()
+        data = self.data.rename(columns=lambda column: str(column).lower())
+        return pd.concat([data, self.to_frame(include_data=False)], axis=1)
+
+    def to_frame(self, include_data=True):
+        """
+        把已计算的指标整理成 DataFrame
+        :param include_data: 是否包含原始的行情列
+        :return: 新的 DataFrame，原始数据不受影响
+        """
+        frame = pd.DataFrame(self.indicators, index=self.data.index)
+        if include_data:
+            frame = pd.concat([self.data, frame], axis=1)
+        return frame
+
     def calculate_moving_averages(self):
         """计算移动平均线"""
-        self.data['MA5'] = talib.MA(self.close, timeperiod=5)
-        self.data['MA10'] = talib.MA(self.close, timeperiod=10)
-        self.data['MA20'] = talib.MA(self.close, timeperiod=20)
-        self.data['MA60'] = talib.MA(self.close, timeperiod=60)
-        return self.data
-    
+        return self._assign(['MA5', 'MA10', 'MA20', 'MA60'])
+
     def calculate_macd(self):
         """计算MACD指标"""
-        macd, signal, hist = talib.MACD(self.close)
-        self.data['MACD'] = macd
-        self.data['MACD_SIGNAL'] = signal
-        self.data['MACD_HIST'] = hist
-        return self.data
-    
+        return self._assign(['MACD', 'MACD_SIGNAL', 'MACD_HIST'])
+
     def calculate_rsi(self):
         """计算RSI指标"""
-        self.data['RSI6'] = talib.RSI(self.close, timeperiod=6)
-        self.data['RSI12'] = talib.RSI(self.close, timeperiod=12)
-        self.data['RSI24'] = talib.RSI(self.close, timeperiod=24)
-        return self.data
-    
+        return self._assign(['RSI6', 'RSI12', 'RSI24'])
+
     def calculate_bollinger_bands(self):
         """计算布林带"""
-        upper, middle, lower = talib.BBANDS(self.close)
-        self.data['BB_UPPER'] = upper
-        self.data['BB_MIDDLE'] = middle
-        self.data['BB_LOWER'] = lower
-        return self.data
-    
+        return self._assign(['BB_UPPER', 'BB_MIDDLE', 'BB_LOWER'])
+
     def calculate_kdj(self):
         """计算KDJ指标"""
-        self.data['K'], self.data['D'] = talib.STOCH(self.high, self.low, self.close)
-        self.data['J'] = 3 * self.data['K'] - 2 * self.data['D']
-        return self.data
-    
+        return self._assign(['K', 'D', 'J'])
+
     def calculate_all_indicators(self):
         """计算所有技术指标"""
-        self.calculate_moving_averages()
-        self.calculate_macd()
-        self.calculate_rsi()
-        self.calculate_bollinger_bands()
-        self.calculate_kdj()
-        self.calculate_cci()
-        self.calculate_dmi()
-        self.calculate_obv()
-        self.calculate_vr()
-        self.calculate_williams_r()
-        return self.data
-    
+        return self._assign(self.DEFAULT_INDICATORS)
+
     def calculate_cci(self):
         """计算顺势指标(CCI)"""
-        self.data['CCI'] = talib.CCI(self.high, self.low, self.close, timeperiod=14)
-        return self.data
-    
+        return self._assign(['CCI'])
+
     def calculate_dmi(self):
         """计算动向指标(DMI)"""
-        self.data['PLUS_DI'] = talib.PLUS_DI(self.high, self.low, self.close, timeperiod=14)
-        self.data['MINUS_DI'] = talib.MINUS_DI(self.high, self.low, self.close, timeperiod=14)
-        self.data['ADX'] = talib.ADX(self.high, self.low, self.close, timeperiod=14)
-        return self.data
-    
+        return self._assign(['PLUS_DI', 'MINUS_DI', 'ADX'])
+
     def calculate_obv(self):
         """计算能量潮指标(OBV)"""
-        self.data['OBV'] = talib.OBV(self.close, self.volume)
-        return self.data
-    
+        return self._assign(['OBV'])
+
     def calculate_vr(self):
         """计算成交量比率(VR)"""
-        close_diff = self.close.diff()
-        up_volume = self.volume.where(close_diff > 0, 0)
-        down_volume = self.volume.where(close_diff < 0, 0)
-        self.data['VR'] = (up_volume.rolling(26).sum() / down_volume.rolling(26).sum()) * 100
-        return self.data
-    
+        return self._assign(['VR'])
+
     def calculate_williams_r(self):
         """计算威廉指标(%R)"""
-        self.data['WILLR'] = talib.WILLR(self.high, self.low, self.close, timeperiod=14)
-        return self.data
-    
+        return self._assign(['WILLR'])
+
+    def get_summary(self, window=20):
+        """
+        生成技术面摘要：最新指标值、技术信号和近期统计，大小与历史长度无关，适合作为大模型工具的返回结果
+        :param window: 近期统计的K线数
+        :return: dict
+        """
+        latest = self.get_indicators(self.SUMMARY_INDICATORS, tail=1).iloc[-1]
+        recent = self.get_indicators(['MACD_HIST', 'RSI6', 'BB_UPPER', 'BB_LOWER'], tail=window)
+        close = self.close.iloc[-window:].to_numpy()
+        # MACD 柱连续同号的天数，正数表示红柱，负数表示绿柱
+        hist = recent['MACD_HIST'].to_numpy()
+        sign = np.sign(hist[-1])
+        streak = 0
+        for value in hist[::-1]:
+            if np.isnan(value) or np.sign(value) != sign:
+                break
+            streak += 1
+        return {
+            '最新指标': {name: _round(value) for name, value in latest.items()},
+            '技术信号': self.get_technical_signals(),
+            f'近{window}日': {
+                'MACD柱连续天数': None if np.isnan(sign) else int(sign * streak),
+                'RSI6区间': [_round(recent['RSI6'].min()), _round(recent['RSI6'].max())],
+                '收盘价高于布林带上轨天数': int((close > recent['BB_UPPER'].to_numpy()).sum()),
+                '收盘价低于布林带下轨天数': int((close < recent['BB_LOWER'].to_numpy()).sum()),
+            },
+        }
+
     def get_technical_signals(self):
-        """获取技术指标信号"""
-        signals = {}
-        
-        # MACD信号
-        if self.data['MACD'].iloc[-1] > self.data['MACD_SIGNAL'].iloc[-1]:
-            signals['MACD'] = '买入'
-        else:
-            signals['MACD'] = '卖出'
-            
-        # RSI信号
-        rsi = self.data['RSI14'].iloc[-1]
-        if rsi > 70:
-            signals['RSI'] = '超买'
-        elif rsi < 30:
-            signals['RSI'] = '超卖'
-        else:
-            signals['RSI'] = '中性'
-            
-        # 布林带信号
-        close = self.data['close'].iloc[-1]
-        if close > self.data['BB_UPPER'].iloc[-1]:
-            signals['BB'] = '超买'
-        elif close < self.data['BB_LOWER'].iloc[-1]:
-            signals['BB'] = '超卖'
-        else:
-            signals['BB'] = '中性'
-            
-        # KDJ信号
-        if (self.data['K'].iloc[-1] > self.data['D'].iloc[-1] and 
-            self.data['K'].iloc[-2] <= self.data['D'].iloc[-2]):
-            signals['KDJ'] = '金叉'
-        elif (self.data['K'].iloc[-1] < self.data['D'].iloc[-1] and 
-              self.data['K'].iloc[-2] >= self.data['D'].iloc[-2]):
-            signals['KDJ'] = '死叉'
-        else:
-            signals['KDJ'] = '中性'
-            
-        # CCI信号
-        cci = self.data['CCI'].iloc[-1]
-        if cci > 100:
-            signals['CCI'] = '超买'
-        elif cci < -100:
-            signals['CCI'] = '超卖'
-        else:
-            signals['CCI'] = '中性'
-            
-        # DMI信号
-        if (self.data['PLUS_DI'].iloc[-1] > self.data['MINUS_DI'].iloc[-1] and 
-            self.data['ADX'].iloc[-1] > 25):
-            signals['DMI'] = '强势上涨'
-        elif (self.data['PLUS_DI'].iloc[-1] < self.data['MINUS_DI'].iloc[-1] and 
-              self.data['ADX'].iloc[-1] > 25):
-            signals['DMI'] = '强势下跌'
-        else:
-            signals['DMI'] = '盘整'
-            
-        return signals
\ No newline at end of file
+        """获取技术指标信号，规则见 stock_tools.signals（与回测共用）"""
+        # 只需要最后两天的值，按需计算
+        latest = self.get_indicators(SIGNAL_INDICATORS, tail=2)
+        states = signal_states({name: latest[name].to_numpy() for name in SIGNAL_INDICATORS},
+                               self.close.to_numpy()[-len(latest):])
+        return signal_labels(states)
+
+
+class PanelTechnicalAnalyzer:
+    """
+    多股票面板模式：输入 (日期 × 股票) 的二维数组，一次计算所有股票的全部技术指标
+    指标与 TechnicalAnalyzer.calculate_all_indicators 相同，计算在时间维上进行，
+    每一步同时处理所有股票，没有逐只股票的 Python 循环。缺失值（未上市、停牌）用 NaN 表示。
+    """
+
+    def __init__(self, high, low, close, volume, dates=None, symbols=None):
+        """
+        :param high: 最高价，(日期 × 股票) 二维数组
+        :param low: 最低价
+        :param close: 收盘价
+        :param volume: 成交量
+        :param dates: 日期，长度等于行数
+        :param symbols: 股票代码，长度等于列数
+        """
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        if self.close.ndim != 2:
+            raise ValueError("面板数据必须是 (日期 × 股票) 的二维数组")
+        self.dates = dates
+        self.symbols = symbols
+        self.indicators = {}
+
+    @classmethod
+    def from_frame(cls, data):
+        """
+        由多只股票的长表构造面板
+        :param data: DataFrame，包含 date、code、high、low、close、volume 列，如多次 get_stock_data 结果的拼接
+        """
+        panel = data.pivot_table(index='date', columns='code',
+                                 values=['high', 'low', 'close', 'volume'], aggfunc='last')
+        panel = panel.sort_index()
+        return cls(
+            panel['high'].to_numpy(),
+            panel['low'].to_numpy(),
+            panel['close'].to_numpy(),
+            panel['volume'].to_numpy(),
+            dates=panel.index.to_numpy(),
+            symbols=panel['close'].columns.to_numpy()
+        )
+
+    def calculate_all_indicators(self):
+        """
+        计算所有技术指标
+        :return: dict，指标名 -> (日期 × 股票) 二维数组，指标名与 TechnicalAnalyzer 的列名一致
+        """
+        close, high, low = self.close, self.high, self.low
+        result = {}
+        for period in (5, 10, 20, 60):
+            result[f'MA{period}'] = indicators.sma(close, period)
+        result['MACD'], result['MACD_SIGNAL'], result['MACD_HIST'] = indicators.macd(close)
+        for period in (6, 12, 24):
+            result[f'RSI{period}'] = indicators.rsi(close, period)
+        result['BB_UPPER'], result['BB_MIDDLE'], result['BB_LOWER'] = indicators.bbands(close, 5)
+        result['K'], result['D'] = indicators.stoch(high, low, close)
+        result['J'] = 3 * result['K'] - 2 * result['D']
+        result['CCI'] = indicators.cci(high, low, close, 14)
+        result['PLUS_DI'], result['MINUS_DI'], result['ADX'] = indicators.dmi(high, low, close, 14)
+        result['OBV'] = indicators.obv(close, self.volume)
+        result['VR'] = indicators.vr(close, self.volume, 26)
+        result['WILLR'] = indicators.willr(high, low, close, 14)
+        self.indicators = result
+        return result
+
+    def latest(self):
+        """
+        每只股票最新一天的指标值，用于全市场筛选
+        :return: DataFrame，行为股票，列为指标
+        """
+        if not self.indicators:
+            self.calculate_all_indicators()
+        return pd.DataFrame(
+            {name: values[-1] for name, values in self.indicators.items()},
+            index=self.symbols
+        )
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 仓库没有打包配置，直接把仓库根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
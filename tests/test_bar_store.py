@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from stock_tools.bar_store import BarStore
+
+
+def bars(dates, close):
+    dates = pd.to_datetime(dates)
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'open': close, 'high': close, 'low': close, 'close': close,
+        'volume': np.full(len(dates), 100), 'amount': np.asarray(close) * 100,
+    })
+
+
+def test_overlapping_write_keeps_mapped_columns(tmp_path):
+    store = BarStore(str(tmp_path))
+    dates = pd.bdate_range('2024-01-01', periods=10)
+    store.write('sh.600000', 'd', '3', bars(dates, np.arange(10.0)), dates[0], dates[-1])
+    mapped = store.read_columns('sh.600000', 'd', '3')
+    before = np.array(mapped['close'])
+
+    # 重新获取最后一天（盘中数据被收盘数据替换）并追加新的一天
+    refreshed = bars(dates[-1:].append(pd.bdate_range(dates[-1], periods=2)[1:]), [99.0, 100.0])
+    store.write('sh.600000', 'd', '3', refreshed, dates[-1], dates[-1] + pd.Timedelta(days=3))
+
+    np.testing.assert_array_equal(mapped['close'], before)
+    close = store.read('sh.600000', 'd', '3')['close'].to_numpy()
+    np.testing.assert_array_equal(close, list(range(9)) + [99.0, 100.0])
+
+
+def test_append_after_last_bar(tmp_path):
+    store = BarStore(str(tmp_path))
+    dates = pd.bdate_range('2024-01-01', periods=20)
+    store.write('sh.600000', 'd', '3', bars(dates[:10], np.arange(10.0)), dates[0], dates[9])
+    store.write('sh.600000', 'd', '3', bars(dates[10:], np.arange(10.0, 20.0)), dates[10], dates[-1])
+
+    data = store.read('sh.600000', 'd', '3', '2024-01-05', '2024-01-20')
+    expected = np.arange(20.0)[(dates >= '2024-01-05') & (dates <= '2024-01-20')]
+    np.testing.assert_array_equal(data['close'].to_numpy(), expected)
+    assert store.get_coverage('sh.600000', 'd', '3') == (dates[0], dates[-1])
@@ -0,0 +1,22 @@
+import json
+
+from stock_tools.batch_runner import BatchRunner
+from stock_tools.data_fetcher import StockDataFetcher
+from stock_tools.fake_baostock import FakeBaostock
+
+
+def test_blank_numeric_field_fails_only_that_symbol(tmp_path):
+    # 银行股的 MBRevenue 为空字符串时，基本面分析失败只记录在该股票的结果中，批量分析继续
+    fetcher = StockDataFetcher(backend=FakeBaostock(blank_fields=['MBRevenue']))
+    codes = ['sh.600000', 'sz.000001', 'sh.600002']
+    output = tmp_path / 'results.jsonl'
+    runner = BatchRunner(fetcher, '2024-01-01', '2024-03-01', io_workers=5, cpu_workers=1)
+
+    succeeded = runner.run(codes, str(output))
+
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert succeeded == 0
+    assert sorted(record['code'] for record in records) == sorted(codes)
+    for record in records:
+        assert any(error.startswith('基本面数据不完整') for error in record['errors'])
+        assert 'technical' in record
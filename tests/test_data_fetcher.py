@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_tools.bar_store import BarStore
+from stock_tools.data_fetcher import StockDataFetcher
+from stock_tools.fake_baostock import FakeBaostock
+
+CODE = 'sh.600010'
+
+
+def assert_same_bars(local, remote):
+    assert list(local.columns) == list(remote.columns)
+    assert list(local['date']) == list(remote['date'])
+    for column in ('open', 'high', 'low', 'close'):
+        # 本地复权与接口返回的复权价格只有舍入误差
+        np.testing.assert_allclose(local[column], remote[column], rtol=1e-5)
+    np.testing.assert_array_equal(local['volume'].to_numpy(), remote['volume'].to_numpy())
+
+
+@pytest.mark.parametrize('frequency', ['d', '30'])
+@pytest.mark.parametrize('adjustflag', ['1', '2', '3'])
+def test_stored_bars_match_remote(tmp_path, frequency, adjustflag):
+    fetcher = StockDataFetcher(store_dir=str(tmp_path), backend=FakeBaostock())
+    remote = StockDataFetcher(backend=FakeBaostock())
+
+    local = fetcher.get_stock_data(CODE, '2022-01-01', '2023-06-30', frequency, adjustflag)
+    expected = remote.get_stock_data(CODE, '2022-01-01', '2023-06-30', frequency, adjustflag)
+
+    assert len(local) > 0
+    assert_same_bars(local, expected)
+
+
+def test_incremental_fetch_reads_store(tmp_path):
+    backend = FakeBaostock()
+    fetcher = StockDataFetcher(store_dir=str(tmp_path), backend=backend)
+    fetcher.get_stock_data(CODE, '2023-01-01', '2023-03-31')
+
+    # 已保存的区间不再访问接口
+    queries = backend.query_count
+    cached = fetcher.get_stock_data(CODE, '2023-02-01', '2023-03-15')
+    assert backend.query_count == queries
+
+    # 向后延伸时只补齐缺少的部分，结果与一次性获取相同
+    extended = fetcher.get_stock_data(CODE, '2023-01-01', '2023-06-30')
+    assert backend.query_count > queries
+    expected = StockDataFetcher(backend=FakeBaostock()).get_stock_data(CODE, '2023-01-01', '2023-06-30')
+    assert_same_bars(extended, expected)
+    window = expected[(expected['date'] >= '2023-02-01') & (expected['date'] <= '2023-03-15')]
+    assert list(cached['date']) == list(window['date'])
+
+    # 重新打开存储目录，数据仍在
+    stored = BarStore(str(tmp_path)).read(CODE, 'd', '3', '2023-01-01', '2023-06-30')
+    np.testing.assert_allclose(stored['close'].to_numpy(), pd.to_numeric(expected['close']).to_numpy())
@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from stock_tools.fundamental_analyzer import CrossSectionalFundamentalAnalyzer
+
+
+def test_profit_growth_compares_same_quarter_of_last_year():
+    current = pd.DataFrame({'code': ['sh.600000', 'sh.600001'], 'statDate': ['2024-09-30'] * 2,
+                            'netProfit': ['120', '50'], 'MBRevenue': ['10', '10']})
+    # sh.600001 只有上一季度的数据，累计值不可比
+    last_year = pd.DataFrame({'code': ['sh.600000', 'sh.600001'], 'statDate': ['2023-09-30', '2024-06-30'],
+                              'netProfit': ['100', '40'], 'MBRevenue': ['8', '8']})
+    growth = pd.DataFrame({'code': ['sh.600000', 'sh.600001'], 'YOYNI': ['0.2', '0.1']})
+
+    metrics = CrossSectionalFundamentalAnalyzer(current, growth, last_year_financial_data=last_year).calculate_metrics()
+
+    assert metrics.loc['sh.600000', 'Profit_Growth'] == 20.0
+    assert metrics.loc['sh.600000', 'Revenue_Growth'] == 25.0
+    assert np.isnan(metrics.loc['sh.600001', 'Profit_Growth'])
+    assert np.isnan(metrics.loc['sh.600001', 'Revenue_Growth'])
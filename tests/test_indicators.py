@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from stock_tools import indicators
+
+talib = pytest.importorskip('talib')
+
+
+@pytest.fixture(scope='module')
+def panel():
+    """(日期 × 股票) 的随机行情，最后一列为一段横盘（高低区间为0、没有涨跌）"""
+    rng = np.random.default_rng(7)
+    close = 10 * np.cumprod(1 + rng.normal(0, 0.02, (300, 4)), axis=0)
+    close[:, -1] = np.round(close[:, -1], 1)
+    close[100:130, -1] = close[100, -1]
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    high[100:130, -1] = low[100:130, -1] = close[100:130, -1]
+    volume = rng.integers(1_000, 100_000, close.shape).astype(np.float64)
+    return high, low, close, volume
+
+
+def columns(panel):
+    high, low, close, volume = panel
+    for i in range(close.shape[1]):
+        yield i, high[:, i], low[:, i], close[:, i], volume[:, i]
+
+
+def assert_matches(actual, expected):
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+@pytest.mark.parametrize('period', [5, 20, 60])
+def test_sma_and_ema(panel, period):
+    close = panel[2]
+    for i, _, _, c, _ in columns(panel):
+        assert_matches(indicators.sma(close, period)[:, i], talib.MA(c, timeperiod=period))
+        assert_matches(indicators.ema(close, period)[:, i], talib.EMA(c, timeperiod=period))
+
+
+def test_macd(panel):
+    result = indicators.macd(panel[2])
+    for i, _, _, c, _ in columns(panel):
+        for actual, expected in zip(result, talib.MACD(c)):
+            assert_matches(actual[:, i], expected)
+
+
+@pytest.mark.parametrize('period', [6, 14, 24])
+def test_rsi(panel, period):
+    result = indicators.rsi(panel[2], period)
+    for i, _, _, c, _ in columns(panel):
+        assert_matches(result[:, i], talib.RSI(c, timeperiod=period))
+
+
+def test_bbands(panel):
+    result = indicators.bbands(panel[2], 5)
+    for i, _, _, c, _ in columns(panel):
+        for actual, expected in zip(result, talib.BBANDS(c, timeperiod=5)):
+            assert_matches(actual[:, i], expected)
+
+
+def test_range_indicators(panel):
+    high, low, close, _ = panel
+    slowk, slowd = indicators.stoch(high, low, close)
+    willr = indicators.willr(high, low, close)
+    cci = indicators.cci(high, low, close)
+    for i, h, lo, c, _ in columns(panel):
+        expected_k, expected_d = talib.STOCH(h, lo, c)
+        assert_matches(slowk[:, i], expected_k)
+        assert_matches(slowd[:, i], expected_d)
+        assert_matches(willr[:, i], talib.WILLR(h, lo, c, timeperiod=14))
+        assert_matches(cci[:, i], talib.CCI(h, lo, c, timeperiod=14))
+
+
+def test_dmi(panel):
+    high, low, close, _ = panel
+    plus_di, minus_di, adx = indicators.dmi(high, low, close)
+    for i, h, lo, c, _ in columns(panel):
+        assert_matches(plus_di[:, i], talib.PLUS_DI(h, lo, c, timeperiod=14))
+        assert_matches(minus_di[:, i], talib.MINUS_DI(h, lo, c, timeperiod=14))
+        assert_matches(adx[:, i], talib.ADX(h, lo, c, timeperiod=14))
+
+
+def test_obv(panel):
+    _, _, close, volume = panel
+    result = indicators.obv(close, volume)
+    for i, _, _, c, v in columns(panel):
+        assert_matches(result[:, i], talib.OBV(c, v))
+
+
+def test_one_dimensional_input(panel):
+    close = panel[2][:, 0]
+    assert_matches(indicators.rsi(close, 14), talib.RSI(close, timeperiod=14))
+    assert_matches(indicators.rsi(close.tolist(), 14), talib.RSI(close, timeperiod=14))
+
+
+def test_vr():
+    # talib 没有 VR，按定义逐窗口计算
+    close = np.array([10, 11, 10.5, 10.5, 12, 11, 11.5, 13, 12, 12.5, np.nan, 12, 13, 12.5, 14, 15, 16])
+    volume = np.arange(1.0, len(close) + 1)
+    window = 4
+    diff = np.diff(close, prepend=close[0])
+    expected = np.full(len(close), np.nan)
+    for t in range(window - 1, len(close)):
+        d, v = diff[t - window + 1:t + 1], volume[t - window + 1:t + 1]
+        down = v[d < 0].sum()
+        if not np.isnan(d).any() and down > 0:
+            expected[t] = v[d > 0].sum() / down * 100
+    assert_matches(indicators.vr(close, volume, window), expected)
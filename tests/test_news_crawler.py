@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from benchmarks.guba_parse_benchmark import EDGE_CASE_PAGE, soup_frame, stream_frame
+from stock_tools.fake_guba import render_list_page, synthetic_posts
+
+pytest.importorskip('bs4')
+
+
+@pytest.mark.parametrize('html', [
+    render_list_page(synthetic_posts('600000', 1, 80)),
+    render_list_page(synthetic_posts('000001', 3, 5)),
+    EDGE_CASE_PAGE,
+], ids=['page', 'short-page', 'edge-cases'])
+def test_streaming_parser_matches_beautifulsoup(html):
+    expected = soup_frame(html)
+    pd.testing.assert_frame_equal(stream_frame(html), expected)
+
+
+def test_edge_cases_are_parsed():
+    frame = stream_frame(EDGE_CASE_PAGE)
+    # 没有作者、没有链接的行和广告行被跳过，与 BeautifulSoup 实现一致
+    assert frame['title'].tolist() == ['标题 & 加粗', '第二个标题', '图片在前']
+    assert frame['source'].tolist() == ['作者一', '嵌套作者', '作者六']
+
+
+def test_empty_page():
+    assert stream_frame(render_list_page([])).empty
+    assert soup_frame(render_list_page([])).empty
@@ -0,0 +1,19 @@
+import numpy as np
+
+from stock_tools.parameter_sweep import ParameterSweep, group_column
+
+
+def test_group_scores_do_not_overwrite_score_or_parameters():
+    rng = np.random.default_rng(0)
+    close = np.cumprod(1 + rng.normal(0, 0.02, (200, 4)), axis=0) * 10
+    # 分组名与 score 列和参数名相同
+    sweep = ParameterSweep(close, close * 1.01, close * 0.99, close, np.full(close.shape, 1e5),
+                           groups=['score', 'rsi', 'score', 'rsi'], strategy='RSI', workers=1)
+    scores = sweep.run(sweep.grid({'rsi': range(5, 9)}))
+
+    assert list(scores.columns) == ['rsi', 'score', group_column('score'), group_column('rsi')]
+    assert sorted(scores['rsi']) == [5, 6, 7, 8]
+    overall = np.nanmean(sweep.stats[:, :, 1], axis=1)
+    np.testing.assert_allclose(np.sort(scores['score']), np.sort(overall))
+    best = scores.sort_values(group_column('score'), ascending=False)['rsi'].iloc[0]
+    assert sweep.best(group='score') == {'rsi': best}
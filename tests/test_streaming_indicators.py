@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_tools.streaming_indicators import StreamingIndicators
+
+pytest.importorskip('talib')
+from stock_tools.technical_analyzer import TechnicalAnalyzer  # noqa: E402
+
+
+def bars(seed, rows=200):
+    rng = np.random.default_rng(seed)
+    close = 10 * np.cumprod(1 + rng.normal(0, 0.02, rows))
+    # 一段横盘：高低区间为0，没有涨跌
+    close[80:110] = close[80]
+    high = close * (1 + rng.uniform(0, 0.02, rows))
+    low = close * (1 - rng.uniform(0, 0.02, rows))
+    high[80:110] = low[80:110] = close[80:110]
+    volume = rng.integers(1_000, 100_000, rows).astype(np.float64)
+    return pd.DataFrame({'high': high, 'low': low, 'close': close, 'volume': volume})
+
+
+def test_every_bar_matches_technical_analyzer():
+    data = [bars(seed) for seed in range(3)]
+    expected = [TechnicalAnalyzer(frame).calculate_all_indicators() for frame in data]
+    streaming = StreamingIndicators(symbols=len(data))
+    for t in range(len(data[0])):
+        result = streaming.update(*(np.array([frame[column].iloc[t] for frame in data])
+                                    for column in ('high', 'low', 'close', 'volume')))
+        for name in TechnicalAnalyzer.DEFAULT_INDICATORS:
+            np.testing.assert_allclose(
+                result[name], [frame[name].iloc[t] for frame in expected], rtol=1e-7, atol=1e-7,
+                equal_nan=True, err_msg=f'{name} 第 {t} 根K线')
+
+
+def test_warm_up_then_update():
+    data = bars(42)
+    expected = TechnicalAnalyzer(data).calculate_all_indicators().iloc[-1]
+    streaming = StreamingIndicators()
+    streaming.warm_up(data['high'][:-1], data['low'][:-1], data['close'][:-1], data['volume'][:-1])
+    result = streaming.update(*data.iloc[-1][['high', 'low', 'close', 'volume']])
+    for name in TechnicalAnalyzer.DEFAULT_INDICATORS:
+        np.testing.assert_allclose(result[name], expected[name], rtol=1e-7, atol=1e-7, err_msg=name)